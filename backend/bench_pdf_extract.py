@@ -0,0 +1,61 @@
+"""
+PDF extraction benchmark: PDFium vs. pdfplumber.
+
+Extracts each file with both engines and reports pages per second, along
+with the engine that automatic selection would pick. Run it from the
+backend directory:
+
+    python bench_pdf_extract.py handout.pdf paper.pdf
+    BENCH_RUNS=5 python bench_pdf_extract.py handout.pdf
+"""
+import os
+import sys
+import time
+
+from services.document_service import (
+    PDF_ENGINES,
+    _pdfium_pages,
+    _pdfplumber_pages,
+    select_pdf_engine,
+)
+
+RUNS = int(os.getenv("BENCH_RUNS", "3"))
+
+EXTRACTORS = {"pdfium": _pdfium_pages, "pdfplumber": _pdfplumber_pages}
+
+def best_time(func, *args) -> tuple:
+    """Fastest of RUNS calls, in seconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_file(file_path: str):
+    print(f"{os.path.basename(file_path)}")
+
+    seconds, selected = best_time(select_pdf_engine, file_path)
+    print(f"  auto selects {selected} ({seconds * 1000:.1f}ms)")
+
+    rates = {}
+    for engine in PDF_ENGINES:
+        seconds, pages = best_time(EXTRACTORS[engine], file_path)
+        chars = sum(len(page) for page in pages)
+        rates[engine] = len(pages) / seconds if seconds else float("inf")
+        print(f"  {engine:<10} {len(pages):5d} pages  {seconds * 1000:9.1f}ms  "
+              f"{rates[engine]:8.1f} pages/s  {chars:8d} chars")
+
+    if rates["pdfplumber"]:
+        print(f"  pdfium speed-up: {rates['pdfium'] / rates['pdfplumber']:.1f}x")
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for file_path in sys.argv[1:]:
+        bench_file(file_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Import-time budget check for the API process.
+
+Fails (exit code 1) when `import main` is slower than the budget or when
+it eagerly imports one of the heavy libraries that the services load on
+first use. Run it from the backend directory, e.g. in CI:
+
+    python check_import_time.py
+    IMPORT_BUDGET_MS=800 python check_import_time.py
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+RUNS = int(os.getenv("IMPORT_RUNS", "3"))
+
+# Must not be imported just by starting the app
+HEAVY_MODULES = ["pdfplumber", "pdfminer", "pypdfium2", "docx", "edge_tts", "groq", "gtts", "numpy", "lxml"]
+
+LOADED_SCRIPT = """
+import json, sys, types
+import main
+loaded = [name for name in {modules}
+          if type(sys.modules.get(name)) is types.ModuleType]
+print(json.dumps(loaded))
+"""
+
+def measure_import_ms() -> tuple:
+    """Cumulative import time of `main` and the slowest modules, in ms"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env={**os.environ, "WARMUP_ON_START": "false"}
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        sys.exit(1)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)) / 1000, match.group(4), len(match.group(3))))
+
+    total = next(ms for ms, name, _ in reversed(rows) if name == "main")
+    top_level = sorted(((ms, name) for ms, name, depth in rows if depth <= 3), reverse=True)
+    return total, top_level[:8]
+
+def eagerly_loaded() -> list:
+    """Heavy modules that are really executed by `import main`"""
+    proc = subprocess.run(
+        [sys.executable, "-c", LOADED_SCRIPT.format(modules=HEAVY_MODULES)],
+        capture_output=True, text=True, env={**os.environ, "WARMUP_ON_START": "false"}
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        sys.exit(1)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    failed = False
+
+    timings = []
+    slowest = []
+    for _ in range(RUNS):
+        total, slowest = measure_import_ms()
+        timings.append(total)
+    median = statistics.median(timings)
+
+    print(f"import main: {median:.0f}ms (median of {RUNS}, budget {BUDGET_MS:.0f}ms)")
+    for ms, name in slowest:
+        print(f"  {ms:8.1f}ms  {name}")
+    if median > BUDGET_MS:
+        print("FAILED: import time is over budget")
+        failed = True
+
+    loaded = eagerly_loaded()
+    if loaded:
+        print(f"FAILED: heavy modules imported at start-up: {', '.join(loaded)}")
+        failed = True
+    else:
+        print("No heavy modules imported at start-up")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,171 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 project_root = backend_dir.parent
 UPLOAD_DIR = str(project_root / "uploads")
 AUDIO_DIR = str(project_root / "audio")
+DATA_DIR = str(project_root / "data")
 
 # Ensure directories exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Audio decoder used for word alignment (optional; MP3 frame analysis is used without it)
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+# PDF text extraction: "auto" samples pages to choose, or force "pdfium" / "pdfplumber"
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto")
+PDF_SAMPLE_PAGES = int(os.getenv("PDF_SAMPLE_PAGES", "3"))
+
+# Plain-text files at least this large are memory-mapped instead of read whole
+TXT_MMAP_MIN_BYTES = int(os.getenv("TXT_MMAP_MIN_BYTES", str(1024 * 1024)))
+
+# Bulk upload: extraction worker processes and limits per request (ZIP contents count uncompressed)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "100"))
+BULK_UPLOAD_MAX_MB = int(os.getenv("BULK_UPLOAD_MAX_MB", "200"))
+
+# Admission control: concurrent calls per upstream, queued calls before 503,
+# and the text length above which document requests count as bulk work
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "4"))
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_BULK_CHARS = int(os.getenv("ADMISSION_BULK_CHARS", "4000"))
+
+# LLM model tiers: per operation "small", "large" or "auto" (small model for
+# inputs up to LLM_SMALL_MAX_CHARS, or up to LLM_SLO_SMALL_MAX_CHARS while the
+# large model's average latency is over LLM_LATENCY_SLO_MS)
+LLM_MODEL_SMALL = os.getenv("LLM_MODEL_SMALL", "llama-3.1-8b-instant")
+LLM_MODEL_LARGE = os.getenv("LLM_MODEL_LARGE", "llama-3.3-70b-versatile")
+LLM_TIER_POLICY = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("LLM_TIER_POLICY", "simplify=auto,summarize=auto,chat_simplify=auto,answer=auto,chat_summary=small,digest=small").split(",")
+    if "=" in item
+)
+LLM_SMALL_MAX_CHARS = int(os.getenv("LLM_SMALL_MAX_CHARS", "1200"))
+LLM_SLO_SMALL_MAX_CHARS = int(os.getenv("LLM_SLO_SMALL_MAX_CHARS", "4000"))
+LLM_LATENCY_SLO_MS = float(os.getenv("LLM_LATENCY_SLO_MS", "6000"))
+
+# Hedged LLM calls (opt-in): a completion for one of LLM_HEDGE_OPERATIONS that
+# takes longer than the LLM_HEDGE_PERCENTILE latency of its model (at least
+# LLM_HEDGE_MIN_DELAY_MS; LLM_HEDGE_DEFAULT_DELAY_MS until there are enough
+# samples) is sent again and the first answer wins. At most LLM_HEDGE_BUDGET
+# of calls are hedged.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_OPERATIONS = [o.strip() for o in os.getenv("LLM_HEDGE_OPERATIONS", "answer").split(",") if o.strip()]
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "300"))
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "3000"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))
+
+# Simplification: long texts are split at paragraph boundaries into chunks of
+# at most this many characters (the output of one call is token-limited),
+# and this many chunks of one text are simplified at once
+SIMPLIFY_CHUNK_CHARS = int(os.getenv("SIMPLIFY_CHUNK_CHARS", "4000"))
+SIMPLIFY_CONCURRENCY = int(os.getenv("SIMPLIFY_CONCURRENCY", "4"))
+
+# Paragraphs that already meet the readability limits for the reader are not
+# sent to the model (syllable counting is tuned for English)
+SIMPLIFY_PREFILTER = os.getenv("SIMPLIFY_PREFILTER", "true").lower() in ("1", "true", "yes")
+SIMPLIFY_PREFILTER_LANGUAGES = [l.strip() for l in os.getenv("SIMPLIFY_PREFILTER_LANGUAGES", "en").split(",") if l.strip()]
+
+# Chat memory per session: recent turns are kept verbatim and older ones rolled
+# into a summary of up to CHAT_SUMMARY_TOKENS once the memory is over
+# CHAT_MEMORY_TOKENS (estimated at 4 characters per token)
+CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "1000"))
+CHAT_MEMORY_RECENT_TURNS = int(os.getenv("CHAT_MEMORY_RECENT_TURNS", "3"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))
+
+# Answers to similar questions about the same document are reused (word and
+# character trigram similarity from 0 to 1; entries kept per document)
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "200"))
+
+# Chat document digests: for documents over DIGEST_MIN_CHARS, /set-context builds
+# an outline, section summaries and a keyword index in the background, and
+# questions are answered from the outline plus matching sections (up to
+# DIGEST_CONTEXT_CHARS) instead of the whole text
+DOCUMENT_DIGEST = os.getenv("DOCUMENT_DIGEST", "true").lower() in ("1", "true", "yes")
+DIGEST_MIN_CHARS = int(os.getenv("DIGEST_MIN_CHARS", "8000"))
+DIGEST_SECTION_CHARS = int(os.getenv("DIGEST_SECTION_CHARS", "3000"))
+DIGEST_CONTEXT_CHARS = int(os.getenv("DIGEST_CONTEXT_CHARS", "6000"))
+DIGEST_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "2"))
+
+# Streamed answers are spoken sentence by sentence; shorter pieces are joined with the next
+SPEECH_STREAM_MIN_SENTENCE_CHARS = int(os.getenv("SPEECH_STREAM_MIN_SENTENCE_CHARS", "24"))
+
+# TTS providers in order of preference: edge, gtts, offline (espeak-ng)
+TTS_PROVIDERS = [p.strip() for p in os.getenv("TTS_PROVIDERS", "edge,gtts,offline").split(",") if p.strip()]
+TTS_TIMEOUT_BASE_S = float(os.getenv("TTS_TIMEOUT_BASE_S", "8"))
+TTS_TIMEOUT_PER_CHAR_S = float(os.getenv("TTS_TIMEOUT_PER_CHAR_S", "0.01"))
+TTS_LATENCY_SLO_MS_PER_CHAR = float(os.getenv("TTS_LATENCY_SLO_MS_PER_CHAR", "40"))
+# Fixed cost of one call (connection, first byte), left out of the per-character
+# latency; texts shorter than TTS_LATENCY_MIN_CHARS are not measured
+TTS_LATENCY_OVERHEAD_MS = float(os.getenv("TTS_LATENCY_OVERHEAD_MS", "500"))
+TTS_LATENCY_MIN_CHARS = int(os.getenv("TTS_LATENCY_MIN_CHARS", "40"))
+TTS_FAILURE_THRESHOLD = int(os.getenv("TTS_FAILURE_THRESHOLD", "3"))
+TTS_COOLDOWN_S = float(os.getenv("TTS_COOLDOWN_S", "30"))
+ESPEAK_BINARY = os.getenv("ESPEAK_BINARY", "espeak-ng")
+
+# Speech is synthesized once at normal speed; other speeds are applied by the
+# player ("client": playbackRate hint) or rendered with ffmpeg ("server")
+TTS_SPEED_MODE = os.getenv("TTS_SPEED_MODE", "client")
+
+# Build audio for texts of several sentences from cached per-sentence clips,
+# so an edited text only synthesizes the sentences that changed. Off by
+# default: a text heard for the first time costs one TTS call per sentence
+SPEECH_CLIP_CACHE = os.getenv("SPEECH_CLIP_CACHE", "false").lower() in ("1", "true", "yes")
+
+# Segmented speech playlists: longest segment (long paragraphs are split
+# between sentences) and segments synthesized ahead of the one requested
+SPEECH_SEGMENT_MAX_CHARS = int(os.getenv("SPEECH_SEGMENT_MAX_CHARS", "2000"))
+SPEECH_PLAYLIST_LOOKAHEAD = int(os.getenv("SPEECH_PLAYLIST_LOOKAHEAD", "1"))
+
+# Audio cache size limit (least recently used entries are evicted; 0 disables)
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "500"))
+
+# Background TTS pre-synthesis after upload/simplify (opt-in)
+PREWARM_TTS = os.getenv("PREWARM_TTS", "false").lower() in ("1", "true", "yes")
+PREWARM_PARAGRAPHS = int(os.getenv("PREWARM_PARAGRAPHS", "3"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+PREWARM_MAX_CHARS = int(os.getenv("PREWARM_MAX_CHARS", "5000"))
+
+# Shared state for profiles and chat sessions ("sqlite" works across workers, "memory" does not)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(DATA_DIR, "state.db"))
+STATE_CACHE_SIZE = int(os.getenv("STATE_CACHE_SIZE", "256"))
+
+# Shared state expiry per namespace: entries not written for this many hours
+# are removed, and the oldest beyond STATE_MAX_ENTRIES (namespaces not listed
+# are kept). Document texts are removed once no document or chat session
+# refers to them, and digests with their text. Runs every STATE_PRUNE_INTERVAL_S (0 disables)
+STATE_TTL_HOURS = {
+    namespace.strip(): float(hours)
+    for namespace, hours in (
+        item.split("=", 1)
+        for item in os.getenv(
+            "STATE_TTL_HOURS",
+            "documents=168,generated_documents=24,document_context=72,chat_memory=72,answer_cache=168,"
+            "document_digests=168,simplified_paragraphs=168,simplify_versions=168,speech_playlists=72"
+        ).split(",")
+        if "=" in item
+    )
+}
+STATE_MAX_ENTRIES = {
+    namespace.strip(): int(count)
+    for namespace, count in (
+        item.split("=", 1)
+        for item in os.getenv(
+            "STATE_MAX_ENTRIES",
+            "answer_cache=10000,simplified_paragraphs=100000,simplify_versions=10000,speech_playlists=10000"
+        ).split(",")
+        if "=" in item
+    )
+}
+STATE_PRUNE_INTERVAL_S = float(os.getenv("STATE_PRUNE_INTERVAL_S", "3600"))
+
+# Document text kept decompressed in memory; colder documents stay zlib-compressed
+DOCUMENT_HOT_CACHE_MB = int(os.getenv("DOCUMENT_HOT_CACHE_MB", "16"))
+DOCUMENT_COLD_CACHE_MB = int(os.getenv("DOCUMENT_COLD_CACHE_MB", "64"))
+
+# Import heavy libraries (PDF/DOCX parsers, groq, edge-tts, numpy) in the background after start-up
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() in ("1", "true", "yes")
@@ -1,15 +1,69 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
 from routers import documents, speech, profile, chat
-from config import AUDIO_DIR
+from services.warmup_service import warm_up, warmup_status
+from services import ingest_service
+from services.admission import Overloaded, set_request_class, get_admission_status
+from services.paragraph_simplify import simplify_stats
+from services.model_router import get_model_status
+from services.hedging import get_hedge_status
+from services.answer_cache import answer_cache_stats
+from services import state_store
+from services.document_store import DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE, prune_blobs
+from services.document_digest import prune_digests
+from services.chat_service import DOCUMENT_CONTEXT_NAMESPACE
+from config import AUDIO_DIR, WARMUP_ON_START, STATE_TTL_HOURS, STATE_MAX_ENTRIES, STATE_PRUNE_INTERVAL_S
+
+def prune_state() -> dict:
+    """Expire shared state, then drop document texts (and digests) nothing refers to"""
+    removed = {}
+    for namespace in set(STATE_TTL_HOURS) | set(STATE_MAX_ENTRIES):
+        hours = STATE_TTL_HOURS.get(namespace)
+        removed[namespace] = state_store.prune(
+            namespace, hours * 3600 if hours else None, STATE_MAX_ENTRIES.get(namespace)
+        )
+    removed["document_blobs"] = prune_blobs(
+        [DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE, DOCUMENT_CONTEXT_NAMESPACE]
+    )
+    removed["document_digests"] = removed.get("document_digests", 0) + prune_digests()
+    return {namespace: count for namespace, count in removed.items() if count}
+
+async def prune_state_periodically():
+    while True:
+        try:
+            removed = await asyncio.to_thread(prune_state)
+            if removed:
+                print(f"✓ Pruned state: {removed}")
+        except Exception as e:
+            print(f"✗ State pruning failed: {str(e)}")
+        await asyncio.sleep(STATE_PRUNE_INTERVAL_S)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy libraries are imported on first use; optionally load them in the
+    # background once the server is already accepting requests
+    warmup_task = None
+    if WARMUP_ON_START:
+        warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    prune_task = asyncio.create_task(prune_state_periodically()) if STATE_PRUNE_INTERVAL_S > 0 else None
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if prune_task:
+        prune_task.cancel()
+    ingest_service.shutdown()
 
 app = FastAPI(
     title="DyslexiFlow API",
     description="AI-powered accessibility platform for people with dyslexia",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS for frontend
@@ -21,6 +75,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def admission_session(request: Request, call_next):
+    # Upstream capacity is shared fairly per session (client address unless
+    # the client sends X-Session-Id; chat requests use their session_id)
+    client = request.client.host if request.client else None
+    set_request_class(session=request.headers.get("X-Session-Id") or client)
+    return await call_next(request)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc), "retry_after": exc.retry_after, "success": False},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Mount audio directory for serving TTS files
 if os.path.exists(AUDIO_DIR):
     app.mount("/audio", StaticFiles(directory=AUDIO_DIR), name="audio")
@@ -37,4 +107,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "warmup": warmup_status["state"],
+        "admission": get_admission_status(),
+        "simplify": simplify_stats,
+        "models": get_model_status(),
+        "hedging": get_hedge_status(),
+        "answer_cache": answer_cache_stats
+    }
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Form, BackgroundTasks
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
 import uuid
 
-from services.chat_service import answer_question, simplify_text, store_document_context, clear_document_context
+from services.chat_service import (
+    answer_question, simplify_text, store_document_context, clear_document_context, get_document_context_hash
+)
+from services.document_digest import build_digest
+from config import DOCUMENT_DIGEST, DIGEST_MIN_CHARS
+from services.document_store import get_document
+from routers.documents import DocumentSource
+from services.admission import set_request_class
 
 router = APIRouter()
 
@@ -11,21 +20,27 @@ class QuestionRequest(BaseModel):
     session_id: str
     language: str = "en"
     dyslexia_type: str = "general"
+    document_id: Optional[str] = None  # ask about a stored document directly
 
-class SimplifyTextRequest(BaseModel):
-    text: str
+class SimplifyTextRequest(DocumentSource):
     language: str = "en"
     dyslexia_type: str = "general"
 
 class DocumentContextRequest(BaseModel):
-    document_text: str
     session_id: str
+    document_text: Optional[str] = None
+    document_id: Optional[str] = None  # use a stored document instead of posting its text
+    digest: Optional[bool] = None  # build a document digest (default: DOCUMENT_DIGEST)
 
 @router.post("/simplify")
 async def simplify_user_text(request: SimplifyTextRequest):
     """Simplify text for dyslexic users"""
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
     result = await simplify_text(
-        text=request.text,
+        text=text,
         dyslexia_type=request.dyslexia_type,
         language=request.language
     )
@@ -34,28 +49,53 @@ async def simplify_user_text(request: SimplifyTextRequest):
 @router.post("/ask")
 async def ask_question(request: QuestionRequest):
     """Ask a question about an uploaded document"""
+    set_request_class(session=request.session_id)
     result = await answer_question(
         question=request.question,
         session_id=request.session_id,
         dyslexia_type=request.dyslexia_type,
-        language=request.language
+        language=request.language,
+        document_id=request.document_id
     )
     return result
 
 @router.post("/set-context")
-async def set_document_context(request: DocumentContextRequest):
-    """Store document context for a chat session"""
-    store_document_context(request.session_id, request.document_text)
+async def set_document_context(request: DocumentContextRequest, background_tasks: BackgroundTasks):
+    """
+    Store document context for a chat session.
+    
+    For long documents a digest (outline, section summaries, keyword index)
+    is built in the background, so questions can be answered from the
+    relevant sections.
+    """
+    if request.document_id:
+        document_text = await asyncio.to_thread(get_document, request.document_id)
+        if document_text is None:
+            return {"error": "Document not found. Please upload it again.", "success": False}
+    elif request.document_text is None:
+        return {"error": "Please provide document_text or a document_id.", "success": False}
+    else:
+        document_text = request.document_text
+    
+    await asyncio.to_thread(
+        store_document_context, request.session_id, request.document_text, request.document_id
+    )
+    digest_queued = False
+    if (DOCUMENT_DIGEST if request.digest is None else request.digest) and len(document_text) > DIGEST_MIN_CHARS:
+        digest = await asyncio.to_thread(get_document_context_hash, request.session_id)
+        background_tasks.add_task(build_digest, digest)
+        digest_queued = True
     return {
         "message": "Document context stored successfully",
         "session_id": request.session_id,
+        "digest_queued": digest_queued,
         "success": True
     }
 
 @router.delete("/clear-context/{session_id}")
 async def clear_chat_context(session_id: str):
     """Clear document context for a session"""
-    clear_document_context(session_id)
+    await asyncio.to_thread(clear_document_context, session_id)
     return {
         "message": "Document context cleared",
         "session_id": session_id,
@@ -1,21 +1,106 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import json
 import os
+import shutil
 import uuid
 
 from services.document_service import extract_text
-from services.groq_service import simplify_text, summarize_text, get_dyslexia_types
-from config import UPLOAD_DIR
+from services.groq_service import summarize_text, get_dyslexia_types
+from services.paragraph_simplify import (
+    simplify_chunked, simplify_incremental, split_chunks, iter_simplified, count_sources
+)
+from services.prewarm_service import prewarm_speech
+from services.ingest_service import stage_uploads, ingest_files
+from services.document_store import (
+    DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE, save_document, resolve_text, delete_document, storage_stats
+)
+from services.chat_service import DOCUMENT_CONTEXT_NAMESPACE
+from services.admission import BULK, INTERACTIVE, Overloaded, set_request_class
+from routers.profile import get_user_profile
+from config import UPLOAD_DIR, PREWARM_TTS, ADMISSION_BULK_CHARS
 
 router = APIRouter()
 
-class TextRequest(BaseModel):
-    text: str
+class DocumentSource(BaseModel):
+    """
+    Input text for an operation: raw `text`, or the `document_id` returned
+    by /upload, optionally narrowed to a paragraph range (slice indices) or
+    a UTF-8 byte range.
+    """
+    text: Optional[str] = None
+    document_id: Optional[str] = None
+    paragraph_start: Optional[int] = None
+    paragraph_end: Optional[int] = None
+    byte_start: Optional[int] = None
+    byte_end: Optional[int] = None
+
+    async def resolve(self):
+        """
+        Return (text, error).
+
+        Also classifies the request for admission control: long texts
+        are bulk work and queue behind interactive requests.
+        """
+        text, error = await asyncio.to_thread(
+            resolve_text,
+            self.text, self.document_id,
+            self.paragraph_start, self.paragraph_end,
+            self.byte_start, self.byte_end
+        )
+        if text is not None:
+            set_request_class(BULK if len(text) > ADMISSION_BULK_CHARS else INTERACTIVE)
+        return text, error
+
+class TextRequest(DocumentSource):
     language: str = "en"
     dyslexia_type: str = "general"
+    prewarm: Optional[bool] = None  # pre-synthesize speech for the result
+    speed: Optional[float] = None  # speech speed for pre-synthesis
+
+class SimplifyRequest(TextRequest):
+    """
+    With `incremental`, only paragraphs changed since the last version
+    simplified under `version_key` (default: the document_id) are sent to
+    the model
+    """
+    incremental: bool = False
+    version_key: Optional[str] = None
+
+async def _queue_prewarm(background_tasks: BackgroundTasks, text: str, prewarm: Optional[bool],
+                         language: Optional[str], speed: Optional[float]) -> bool:
+    """Queue background TTS of the document opening; defaults come from the profile"""
+    if not (PREWARM_TTS if prewarm is None else prewarm):
+        return False
+    # Services report failures as text starting with "Error"
+    if not text or text.startswith("Error"):
+        return False
+    user_profile = await asyncio.to_thread(get_user_profile)
+    background_tasks.add_task(
+        prewarm_speech,
+        text,
+        language or user_profile["language"],
+        speed or user_profile["speech_speed"]
+    )
+    return True
+
+def _save_result(text: str):
+    """Store a generated text so it can be read aloud by ID (expires sooner than uploads)"""
+    if not text or text.startswith("Error"):
+        return None
+    return save_document(text, generated=True)
 
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    prewarm: Optional[bool] = Form(None),
+    language: Optional[str] = Form(None),
+    speed: Optional[float] = Form(None)
+):
     """Upload a document and extract text"""
     # Validate file type
     allowed_types = ['.pdf', '.docx', '.txt']
@@ -29,42 +114,178 @@ async def upload_document(file: UploadFile = File(...)):
     file_path = os.path.join(UPLOAD_DIR, f"{file_id}{file_ext}")
     
     try:
+        # Copy the spooled upload to disk without reading it into memory
         with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+            await asyncio.to_thread(shutil.copyfileobj, file.file, f)
         
         # Extract text
-        extracted_text = extract_text(file_path)
+        extracted_text = await asyncio.to_thread(extract_text, file_path)
         
         # Clean up file
         os.remove(file_path)
         
+        # Keep the text server-side so later calls can send the ID instead
+        document_id = None
+        if extracted_text and not extracted_text.startswith("Error"):
+            document_id = await asyncio.to_thread(save_document, extracted_text, file.filename)
+        
         return {
             "filename": file.filename,
+            "document_id": document_id,
             "text": extracted_text,
+            "prewarm_queued": await _queue_prewarm(background_tasks, extracted_text, prewarm, language, speed),
             "success": True
         }
     except Exception as e:
         return {"error": str(e), "success": False}
 
+@router.post("/upload-bulk")
+async def upload_documents_bulk(files: List[UploadFile] = File(...)):
+    """
+    Upload many documents, or ZIP archives of them, in one request.
+
+    Files are extracted in parallel and the response streams one JSON line
+    per file (newline-delimited JSON): "queued" lines first, then "done",
+    "failed" or "rejected" as each file finishes, and a final summary line.
+    """
+    staged, rejected = await asyncio.to_thread(
+        stage_uploads, [(file.filename, file.file) for file in files]
+    )
+
+    async def stream():
+        for item in staged:
+            yield json.dumps({"filename": item["filename"], "status": "queued"}) + "\n"
+        for item in rejected:
+            yield json.dumps(item) + "\n"
+
+        succeeded = 0
+        async for result in ingest_files(staged):
+            succeeded += result["success"]
+            yield json.dumps(result) + "\n"
+
+        total = len(staged) + len(rejected)
+        yield json.dumps({
+            "status": "complete",
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.post("/simplify")
-async def simplify_document(request: TextRequest):
-    """Simplify text for easier reading based on dyslexia type"""
-    simplified = await simplify_text(request.text, request.language, request.dyslexia_type)
-    return {
-        "original_length": len(request.text),
+async def simplify_document(request: SimplifyRequest, background_tasks: BackgroundTasks):
+    """
+    Simplify text for easier reading based on dyslexia type.
+    
+    Long texts are simplified in chunks, concurrently (see
+    /simplify-stream to receive them as they finish). Paragraphs that are
+    readable enough already are kept as they are; "stats" counts the parts
+    that were simplified, reused from the cache or left unchanged.
+    
+    In incremental mode the text is simplified paragraph by paragraph and
+    the response has an "incremental" object with the same counts plus the
+    number of paragraphs and the indices changed since the previous version.
+    """
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
+    incremental = None
+    if request.incremental:
+        simplified, incremental = await simplify_incremental(
+            text, request.language, request.dyslexia_type,
+            request.version_key or request.document_id
+        )
+    else:
+        simplified, stats = await simplify_chunked(text, request.language, request.dyslexia_type)
+    prewarm_queued = await _queue_prewarm(
+        background_tasks, simplified, request.prewarm, request.language, request.speed
+    )
+    result = {
+        "original_length": len(text),
         "simplified_text": simplified,
+        "result_document_id": await asyncio.to_thread(_save_result, simplified),
         "dyslexia_type": request.dyslexia_type,
+        "prewarm_queued": prewarm_queued,
         "success": True
     }
+    if incremental is not None:
+        result["incremental"] = incremental
+    else:
+        result["stats"] = stats
+    return result
+
+@router.post("/simplify-stream")
+async def simplify_document_stream(request: TextRequest, background_tasks: BackgroundTasks):
+    """
+    Simplify a long text chunk by chunk, streaming the result in order.
+    
+    Returns NDJSON: one {"status": "chunk", "index", "total", "text",
+    "source"} line per chunk as soon as it and the chunks before it are
+    done, then {"status": "complete", "simplified_text",
+    "result_document_id", "stats"} or {"status": "failed", "error"}.
+    """
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
+    chunks = split_chunks(text, language=request.language, dyslexia_type=request.dyslexia_type)
+    
+    async def stream():
+        outputs = []
+        sources = []
+        try:
+            async for index, output, source in iter_simplified(chunks, request.language, request.dyslexia_type):
+                if output.startswith("Error"):
+                    yield json.dumps({"status": "failed", "error": output, "success": False}) + "\n"
+                    return
+                outputs.append(output)
+                sources.append(source)
+                yield json.dumps({
+                    "status": "chunk",
+                    "index": index,
+                    "total": len(chunks),
+                    "text": output,
+                    "source": source
+                }) + "\n"
+        except Overloaded as e:
+            yield json.dumps({
+                "status": "failed", "error": str(e), "retry_after": e.retry_after, "success": False
+            }) + "\n"
+            return
+        
+        simplified = "\n\n".join(outputs)
+        # Runs after the stream ends (the response picks up tasks added while streaming)
+        prewarm_queued = await _queue_prewarm(
+            background_tasks, simplified, request.prewarm, request.language, request.speed
+        )
+        yield json.dumps({
+            "status": "complete",
+            "total": len(chunks),
+            "original_length": len(text),
+            "simplified_text": simplified,
+            "result_document_id": await asyncio.to_thread(_save_result, simplified),
+            "dyslexia_type": request.dyslexia_type,
+            "prewarm_queued": prewarm_queued,
+            "stats": count_sources(sources),
+            "success": True
+        }) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @router.post("/summarize")
 async def summarize_document(request: TextRequest):
     """Summarize text into key points based on dyslexia type"""
-    summary = await summarize_text(request.text, request.language, request.dyslexia_type)
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
+    summary = await summarize_text(text, request.language, request.dyslexia_type)
     return {
-        "original_length": len(request.text),
+        "original_length": len(text),
         "summary": summary,
+        "result_document_id": await asyncio.to_thread(_save_result, summary),
         "dyslexia_type": request.dyslexia_type,
         "success": True
     }
@@ -74,3 +295,35 @@ async def list_dyslexia_types():
     """Get list of supported dyslexia types"""
     return {"types": get_dyslexia_types()}
 
+@router.get("/storage-stats")
+async def get_storage_stats():
+    """Memory used by stored document text (resident vs. logical bytes)"""
+    return await asyncio.to_thread(
+        storage_stats, [DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE, DOCUMENT_CONTEXT_NAMESPACE]
+    )
+
+@router.get("/{document_id}")
+async def get_stored_document(
+    document_id: str,
+    paragraph_start: Optional[int] = None,
+    paragraph_end: Optional[int] = None,
+    byte_start: Optional[int] = None,
+    byte_end: Optional[int] = None
+):
+    """Get the text of a stored document, or part of it"""
+    source = DocumentSource(
+        document_id=document_id,
+        paragraph_start=paragraph_start, paragraph_end=paragraph_end,
+        byte_start=byte_start, byte_end=byte_end
+    )
+    text, error = await source.resolve()
+    if error:
+        return {"error": error, "success": False}
+    return {"document_id": document_id, "text": text, "success": True}
+
+@router.delete("/{document_id}")
+async def delete_stored_document(document_id: str):
+    """Delete a stored document"""
+    await asyncio.to_thread(delete_document, document_id)
+    return {"message": "Document deleted", "document_id": document_id, "success": True}
+
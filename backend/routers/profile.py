@@ -1,11 +1,15 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
+
+from services import state_store
 
 router = APIRouter()
 
-# In-memory storage for demo (use database in production)
-user_profile = {
+# Defaults for a new profile; the profile itself lives in the shared state store
+# so every worker process sees the same settings
+DEFAULT_PROFILE = {
     "dyslexia_type": "visual",
     "font_family": "OpenDyslexic",
     "font_size": 18,
@@ -24,27 +28,33 @@ class ProfileUpdate(BaseModel):
     speech_speed: Optional[float] = None
     language: Optional[str] = None
 
+def get_user_profile() -> dict:
+    """Current profile settings, falling back to the defaults"""
+    return {**DEFAULT_PROFILE, **state_store.get("profile", "default", {})}
+
 @router.get("/")
 async def get_profile():
     """Get current user profile settings"""
-    return user_profile
+    return await asyncio.to_thread(get_user_profile)
 
 @router.post("/")
 async def update_profile(profile: ProfileUpdate):
     """Update user profile settings"""
+    changes = {}
     if profile.dyslexia_type:
-        user_profile["dyslexia_type"] = profile.dyslexia_type
+        changes["dyslexia_type"] = profile.dyslexia_type
     if profile.font_family:
-        user_profile["font_family"] = profile.font_family
+        changes["font_family"] = profile.font_family
     if profile.font_size:
-        user_profile["font_size"] = profile.font_size
+        changes["font_size"] = profile.font_size
     if profile.background_color:
-        user_profile["background_color"] = profile.background_color
+        changes["background_color"] = profile.background_color
     if profile.text_color:
-        user_profile["text_color"] = profile.text_color
+        changes["text_color"] = profile.text_color
     if profile.speech_speed:
-        user_profile["speech_speed"] = profile.speech_speed
+        changes["speech_speed"] = profile.speech_speed
     if profile.language:
-        user_profile["language"] = profile.language
+        changes["language"] = profile.language
     
+    user_profile = await asyncio.to_thread(state_store.update, "profile", "default", changes, DEFAULT_PROFILE)
     return {"message": "Profile updated", "profile": user_profile}
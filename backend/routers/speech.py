@@ -1,21 +1,74 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+from typing import Optional
+import asyncio
+import os
 
-from services.speech_service import text_to_speech, get_available_languages
+from config import AUDIO_DIR
+from services.speech_service import (
+    text_to_speech, retime_audio, load_timing_sidecar, get_available_languages, get_tts_providers,
+    SPEED_MODES
+)
+from services.timing_format import TIMING_FORMATS
+from services.chat_service import build_answer_request, build_simplify_request, find_cached_answer
+from services import answer_cache
+from services.chat_memory import add_turn
+from services.speech_stream import stream_speech
+from services.speech_playlist import (
+    create_playlist, get_playlist, get_segment, render_m3u8, synthesize_unlisted
+)
+from services.admission import Overloaded, set_request_class
+from routers.documents import DocumentSource
 
 router = APIRouter()
 
-class TTSRequest(BaseModel):
-    text: str
+class TTSRequest(DocumentSource):
+    """Text (or a stored document / part of one) to speak"""
     language: str = "en"
     speed: float = 1.0
+    timing_format: str = "objects"  # objects, columnar, binary
+    speed_mode: Optional[str] = None  # client (playbackRate hint), server (ffmpeg)
 
-class HighlightWordRequest(BaseModel):
+class HighlightWordRequest(DocumentSource):
     """Request for word-level highlighting during TTS playback"""
+    language: str = "en"
+    speed: float = 1.0
+    timing_format: str = "objects"  # objects, columnar, binary
+    speed_mode: Optional[str] = None  # client (playbackRate hint), server (ffmpeg)
+
+class RetimeRequest(BaseModel):
+    """Request to re-align word timings for previously generated audio"""
+    audio_id: str
     text: str
+    speed: float = 1.0
+    timing_format: str = "objects"
+
+class PlaylistRequest(DocumentSource):
+    """Text (or a stored document) to speak as a segmented playlist"""
+    language: str = "en"
+    speed: float = 1.0
+
+class SpeechStreamRequest(DocumentSource):
+    """
+    First message on /stream: "answer" a question about the session's
+    document, or "simplify" the given text / document, and speak it
+    """
+    mode: str = "answer"  # answer, simplify
+    question: Optional[str] = None
+    session_id: Optional[str] = None
     language: str = "en"
+    dyslexia_type: str = "general"
     speed: float = 1.0
 
+def _check_format(timing_format: str) -> str:
+    """Fall back to the default object list for unknown formats"""
+    return timing_format if timing_format in TIMING_FORMATS else "objects"
+
+def _check_speed_mode(speed_mode: Optional[str]) -> Optional[str]:
+    """Unknown speed modes use the configured default"""
+    return speed_mode if speed_mode in SPEED_MODES else None
+
 @router.post("/tts")
 async def generate_speech(request: TTSRequest):
     """
@@ -23,13 +76,24 @@ async def generate_speech(request: TTSRequest):
     
     Response includes:
     - audio_url: URL to the generated MP3 file
+    - playback_rate: Rate to play the audio at to get the requested speed
     - word_timings: Array of word timing data with millisecond precision
     - total_words: Number of words in the text
+    
+    Set timing_format to "columnar" or "binary" for a compact timing payload.
+    Changing speed never re-synthesizes: set speed_mode to "server" for audio
+    rendered at the speed instead of a playback_rate hint.
     """
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
     result = await text_to_speech(
-        text=request.text,
+        text=text,
         language=request.language,
-        speed=request.speed
+        speed=request.speed,
+        timing_format=_check_format(request.timing_format),
+        speed_mode=_check_speed_mode(request.speed_mode)
     )
     return result
 
@@ -45,19 +109,29 @@ async def generate_speech_with_highlight(request: HighlightWordRequest):
     
     Returns:
     - audio_url: URL to MP3 file
-    - word_timings: Array of {word, start_ms, duration_ms, end_ms}
+    - playback_rate: Rate to set on the audio element
+    - word_timings: Array of {word, start_ms, duration_ms, end_ms}, or a
+      compact {start_ms[], duration_ms[], offsets[], lengths[]} object when
+      timing_format is "columnar" / "binary"
     - total_words: Count of words
     """
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
     result = await text_to_speech(
-        text=request.text,
+        text=text,
         language=request.language,
-        speed=request.speed
+        speed=request.speed,
+        timing_format=_check_format(request.timing_format),
+        speed_mode=_check_speed_mode(request.speed_mode)
     )
     
     if result["success"]:
         return {
             "audio_url": result["audio_url"],
             "audio_id": result["audio_id"],
+            "playback_rate": result["playback_rate"],
             "word_timings": result["word_timings"],
             "language": result["language"],
             "total_words": result["total_words"],
@@ -65,6 +139,26 @@ async def generate_speech_with_highlight(request: HighlightWordRequest):
         }
     return result
 
+@router.post("/retime")
+async def retime_speech(request: RetimeRequest):
+    """
+    Re-align word timings for an existing audio file.
+    
+    Useful for cached audio generated without WordBoundary events.
+    """
+    return await asyncio.to_thread(
+        retime_audio,
+        request.audio_id,
+        request.text,
+        request.speed,
+        _check_format(request.timing_format)
+    )
+
+@router.get("/timings/{audio_id}")
+async def get_timings(audio_id: str, timing_format: str = "objects"):
+    """Get the stored word timings for previously generated audio"""
+    return await asyncio.to_thread(load_timing_sidecar, audio_id, _check_format(timing_format))
+
 @router.get("/languages")
 async def list_languages():
     """
@@ -76,3 +170,165 @@ async def list_languages():
         "languages": get_available_languages(),
         "total": len(get_available_languages())
     }
+
+@router.get("/providers")
+async def list_providers():
+    """
+    Get the configured TTS providers and their health.
+    
+    Providers are tried in order; failing or slow ones are moved to the back.
+    """
+    return {"providers": get_tts_providers()}
+
+@router.post("/playlist")
+async def create_speech_playlist(request: PlaylistRequest):
+    """
+    Speak a long text as a playlist of paragraph-aligned segments.
+    
+    Nothing is synthesized up front: each segment is synthesized when it is
+    first fetched, with the next one synthesized ahead. Returns the playlist
+    (see GET /playlist/{playlist_id}); the same text always gets the same
+    playlist_id, and segments are shared with any other text containing the
+    same paragraphs.
+    """
+    text, error = await request.resolve()
+    if error:
+        return {"error": error, "success": False}
+    
+    playlist_id = await asyncio.to_thread(create_playlist, text, request.language)
+    return await asyncio.to_thread(get_playlist, playlist_id, request.speed)
+
+@router.get("/playlist/{playlist_id}")
+async def get_speech_playlist(playlist_id: str, speed: float = 1.0):
+    """
+    Get a playlist as JSON.
+    
+    Returns:
+    - segments: {index, char_offset, chars, start_ms, duration_ms, estimated,
+      cached, audio_url, timings_url} per segment; durations of segments not
+      synthesized yet are estimates
+    - playback_rate: Rate to play the segments at for the given speed
+    - m3u8_url: The same playlist in HLS format
+    """
+    return await asyncio.to_thread(get_playlist, playlist_id, speed)
+
+@router.get("/playlist/{playlist_id}/index.m3u8")
+async def get_speech_playlist_m3u8(playlist_id: str):
+    """
+    Get a playlist as an HLS EVENT playlist of segment audio.
+    
+    Lists the segments synthesized so far and starts synthesizing the next
+    ones; the player picks them up when it reloads the playlist.
+    """
+    manifest = await asyncio.to_thread(get_playlist, playlist_id)
+    if not manifest["success"]:
+        return JSONResponse(status_code=404, content=manifest)
+    await synthesize_unlisted(playlist_id, manifest)
+    return Response(render_m3u8(manifest), media_type="application/vnd.apple.mpegurl")
+
+@router.get("/playlist/{playlist_id}/segments/{index}/timings")
+async def get_playlist_segment_timings(playlist_id: str, index: int, speed: float = 1.0,
+                                       timing_format: str = "objects"):
+    """
+    Get one segment's audio URL and word timings, synthesizing it if needed.
+    
+    Word timings are relative to the segment; char_offset is its position in
+    the full text.
+    """
+    return await get_segment(playlist_id, index, speed, _check_format(timing_format))
+
+@router.get("/playlist/{playlist_id}/segments/{index}")
+async def get_playlist_segment_audio(playlist_id: str, index: int):
+    """Get one segment's audio, synthesizing it if needed"""
+    result = await get_segment(playlist_id, index)
+    if not result["success"]:
+        status_code = 500 if result["error"].startswith("TTS Error") else 404
+        return JSONResponse(status_code=status_code, content=result)
+    audio_filename = result["audio_url"].rsplit("/", 1)[1]
+    return FileResponse(
+        os.path.join(AUDIO_DIR, audio_filename),
+        media_type="audio/mpeg" if audio_filename.endswith(".mp3") else "audio/wav"
+    )
+
+@router.websocket("/stream")
+async def stream_spoken_text(websocket: WebSocket):
+    """
+    Stream an answer or simplification as text and speech while it is
+    being generated.
+    
+    The client sends one SpeechStreamRequest as JSON. The server replies with
+    JSON messages: {"type": "text"} deltas as the model writes, and for each
+    sentence a {"type": "sentence"} message (columnar word timings relative
+    to the sentence, plus its char_offset in the full text) immediately
+    followed by a binary message with the sentence audio. The stream ends
+    with {"type": "done"} or {"type": "error"}.
+    
+    Answers to standalone questions come from the answer cache when a
+    similar question was asked about the same document; the cached text is
+    streamed the same way, and the "done" message says whether it was
+    ("cached", plus "similarity" for cached answers).
+    """
+    await websocket.accept()
+    try:
+        request = SpeechStreamRequest(**await websocket.receive_json())
+    except (ValidationError, ValueError, TypeError) as e:
+        await websocket.send_json({"type": "error", "error": f"Invalid request: {e}", "success": False})
+        await websocket.close()
+        return
+    
+    cached = None
+    if request.mode == "answer":
+        set_request_class(session=request.session_id)
+        question = request.question or ""
+        # The cache is checked before the document, memory and prompt are built
+        document_hash, shareable, cached = await asyncio.to_thread(
+            find_cached_answer, question, request.session_id or "",
+            request.dyslexia_type, request.language, request.document_id
+        )
+        completion, error = None, None
+        if not cached:
+            completion, error = await asyncio.to_thread(
+                build_answer_request, question, request.session_id or "",
+                request.dyslexia_type, request.language, request.document_id
+            )
+            if not (error or shareable):
+                answer_cache.answer_cache_stats["skipped"] += 1
+    else:
+        text, error = await request.resolve()
+        if not error:
+            completion, error = build_simplify_request(text, request.dyslexia_type, request.language)
+    if error:
+        await websocket.send_json({"type": "error", "error": error, "success": False})
+        await websocket.close()
+        return
+    
+    try:
+        async for event in stream_speech(
+            completion, request.language, request.speed, text=cached[0] if cached else None
+        ):
+            audio = event.pop("audio", None)
+            answered = event["type"] == "done" and request.mode == "answer"
+            if answered:
+                event["cached"] = bool(cached)
+                if cached:
+                    event["similarity"] = cached[1]
+            await websocket.send_json(event)
+            if audio is not None:
+                await websocket.send_bytes(audio)
+            if answered and request.session_id:
+                await add_turn(request.session_id, question, event["text"])
+            if answered and shareable and not cached:
+                await asyncio.to_thread(
+                    answer_cache.store, document_hash, request.dyslexia_type, request.language,
+                    question, event["text"]
+                )
+    except WebSocketDisconnect:
+        return
+    except Overloaded as e:
+        await websocket.send_json({
+            "type": "error", "error": str(e), "retry_after": e.retry_after, "success": False
+        })
+    except Exception as e:
+        print(f"✗ Speech stream error: {str(e)}")
+        await websocket.send_json({"type": "error", "error": str(e), "success": False})
+    await websocket.close()
@@ -0,0 +1,185 @@
+"""
+Admission control for upstream calls.
+
+Each upstream (Groq, each network TTS voice service) gets its own bulkhead:
+a concurrency limit with a wait queue, so a burst against one service
+cannot tie up the others. When a slot frees up it goes to the next
+interactive request before any bulk one, and within a class the sessions
+take turns (round robin), so one user's 200-paragraph job cannot starve
+everyone else.
+
+When the queue is full the call fails fast with Overloaded, which the API
+turns into "503 Service Unavailable" with a Retry-After estimate. Bulk
+requests are shed once the queue is half full, keeping the rest of it
+for interactive traffic.
+
+Routers classify a request with set_request_class(); the class and
+session are carried in context variables down to the upstream call.
+"""
+import asyncio
+import contextvars
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Weight of the newest sample in the slot hold-time moving average
+_EWMA_ALPHA = 0.2
+
+_priority = contextvars.ContextVar("admission_priority", default=INTERACTIVE)
+_session = contextvars.ContextVar("admission_session", default=None)
+
+_bulkheads = {}
+
+
+class Overloaded(Exception):
+    """An upstream queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(f"The {upstream} service is busy. Please try again in {retry_after}s.")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def set_request_class(priority: str = None, session: str = None):
+    """Set the priority and/or session for upstream calls made by this request"""
+    if priority is not None:
+        _priority.set(priority)
+    if session is not None:
+        _session.set(session)
+
+
+class Bulkhead:
+    """Concurrency limit with a priority- and session-fair wait queue"""
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = max(limit, 1)
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        # priority -> session -> waiting futures; the first session is served next
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._hold_s = None
+        self.stats = {
+            priority: {"admitted": 0, "rejected": 0, "wait_ms": None}
+            for priority in PRIORITIES
+        }
+
+    def _retry_after(self) -> int:
+        hold_s = self._hold_s or 1.0
+        return max(1, math.ceil(self.waiting * hold_s / self.limit))
+
+    def _next_waiter(self):
+        for priority in PRIORITIES:
+            sessions = self._queues[priority]
+            while sessions:
+                session, waiters = next(iter(sessions.items()))
+                future = waiters.popleft()
+                if waiters:
+                    sessions.move_to_end(session)
+                else:
+                    del sessions[session]
+                self.waiting -= 1
+                # Skip callers that gave up while queued
+                if not future.done():
+                    return future
+        return None
+
+    def _discard(self, priority: str, session, future):
+        sessions = self._queues[priority]
+        waiters = sessions.get(session)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self.waiting -= 1
+            if not waiters:
+                del sessions[session]
+
+    async def acquire(self, priority: str, session):
+        stats = self.stats[priority]
+        if self.active < self.limit and self.waiting == 0:
+            self.active += 1
+            stats["admitted"] += 1
+            return
+
+        depth_limit = self.max_queue if priority == INTERACTIVE else self.max_queue // 2
+        if self.waiting >= depth_limit:
+            stats["rejected"] += 1
+            raise Overloaded(self.name, self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(session, deque()).append(future)
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._discard(priority, session, future)
+            else:
+                # The slot was handed over just before cancellation
+                self.release()
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        previous = stats["wait_ms"]
+        stats["wait_ms"] = wait_ms if previous is None else (
+            _EWMA_ALPHA * wait_ms + (1 - _EWMA_ALPHA) * previous
+        )
+        stats["admitted"] += 1
+
+    def release(self):
+        future = self._next_waiter()
+        if future is not None:
+            # Hand the slot straight to the next caller
+            future.set_result(None)
+        else:
+            self.active -= 1
+
+    def has_free_slot(self) -> bool:
+        """Whether a call would be admitted without queueing"""
+        return self.active < self.limit and self.waiting == 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the current request's priority and session"""
+        await self.acquire(_priority.get(), _session.get())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self._hold_s = held if self._hold_s is None else (
+                _EWMA_ALPHA * held + (1 - _EWMA_ALPHA) * self._hold_s
+            )
+            self.release()
+
+    def status(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "stats": {
+                priority: {
+                    **stats,
+                    "wait_ms": round(stats["wait_ms"], 1) if stats["wait_ms"] is not None else None
+                }
+                for priority, stats in self.stats.items()
+            }
+        }
+
+
+def get_bulkhead(name: str, limit: int, max_queue: int) -> Bulkhead:
+    """The bulkhead for an upstream, created on first use"""
+    if name not in _bulkheads:
+        _bulkheads[name] = Bulkhead(name, limit, max_queue)
+    return _bulkheads[name]
+
+
+def get_admission_status() -> dict:
+    return {name: bulkhead.status() for name, bulkhead in _bulkheads.items()}
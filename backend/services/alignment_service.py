@@ -0,0 +1,373 @@
+"""
+Word timing alignment for generated speech audio.
+
+Used when the TTS engine does not send WordBoundary events (or when we only
+have an audio file on disk). The audio is reduced to a coarse energy
+envelope, silence gaps are detected on it, and word boundaries are placed
+on the voiced parts of the timeline and snapped to the nearest pause.
+Everything after envelope extraction is vectorized with NumPy.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import wave
+
+from config import FFMPEG_BINARY
+from services.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+# Envelope resolution for decoded PCM audio
+PCM_SAMPLE_RATE = 16000
+PCM_FRAME_MS = 10.0
+
+# Silence detection defaults
+MIN_SILENCE_MS = 80.0
+SILENCE_THRESHOLD = 0.2  # fraction of the floor-to-peak envelope range
+
+# Fallback speaking rate used when the audio cannot be read at all
+ESTIMATED_MS_PER_CHAR = 80.0
+
+# MPEG audio header tables (kbps), indexed by [version][layer][bitrate_index]
+_MPEG1_BITRATES = {
+    1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+}
+_MPEG2_BITRATES = {
+    1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def _skip_id3(data: bytes) -> int:
+    """Return the offset of the first byte after a leading ID3v2 tag"""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+
+def _parse_mp3_header(header: int):
+    """Decode a 32-bit MPEG audio frame header.
+
+    Returns (frame_size, samples_per_frame, sample_rate, side_info) or None
+    when the header is not a valid Layer III frame.
+    """
+    if (header >> 21) & 0x7FF != 0x7FF:
+        return None
+    version = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    if version == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits  # always 3 here
+    bitrate = (_MPEG1_BITRATES if version == 3 else _MPEG2_BITRATES)[layer][bitrate_index] * 1000
+    sample_rate = _MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 0x1
+    has_crc = not ((header >> 16) & 0x1)
+    mono = ((header >> 6) & 0x3) == 3
+
+    if version == 3:
+        samples = 1152
+        frame_size = 144 * bitrate // sample_rate + padding
+        side_info = (17 if mono else 32, 2)  # (bytes, granules)
+    else:
+        samples = 576
+        frame_size = 72 * bitrate // sample_rate + padding
+        side_info = (9 if mono else 17, 1)
+
+    return frame_size, samples, sample_rate, (side_info, version, mono, has_crc)
+
+
+def iter_mp3_frames(data: bytes):
+    """Yield (offset, parsed header) for each Layer III frame in MP3 data.
+
+    The parsed header is the tuple returned by _parse_mp3_header.
+    """
+    pos = _skip_id3(data)
+    while pos + 4 <= len(data):
+        parsed = _parse_mp3_header(int.from_bytes(data[pos:pos + 4], "big"))
+        if parsed is None:
+            # Resync on the next frame sync word
+            pos = data.find(b"\xff", pos + 1)
+            if pos < 0:
+                break
+            continue
+        yield pos, parsed
+        pos += max(parsed[0], 1)
+
+
+def read_mp3_frames(audio_path: str):
+    """Walk the MP3 frame headers of a file without decoding audio.
+
+    Returns (big_values, granule_ms): one `big_values` count per granule (the
+    number of non-zero spectral pairs the encoder kept, which drops to zero
+    during silence) and the granule length in milliseconds.
+    """
+    with open(audio_path, "rb") as f:
+        data = f.read()
+
+    granule_values = []
+    granule_ms = 0.0
+
+    for pos, parsed in iter_mp3_frames(data):
+        frame_size, samples, sample_rate, ((side_bytes, granules), version, mono, has_crc) = parsed
+        side_start = pos + 4 + (2 if has_crc else 0)
+        side = int.from_bytes(data[side_start:side_start + side_bytes], "big")
+        side_bits = side_bytes * 8
+
+        # Bit offset of the first granule (channel 0) inside the side info
+        if version == 3:
+            header_bits = 9 + (5 + 4 if mono else 3 + 8)
+            granule_bits = 59 * (1 if mono else 2)
+        else:
+            header_bits = 8 + (1 if mono else 2)
+            granule_bits = 63 * (1 if mono else 2)
+
+        for g in range(granules):
+            # part2_3_length (12 bits) precedes big_values (9 bits)
+            shift = side_bits - (header_bits + g * granule_bits + 12 + 9)
+            granule_values.append((side >> shift) & 0x1FF if shift >= 0 else 0)
+
+        granule_ms = 1000.0 * (samples / granules) / sample_rate
+
+    return np.asarray(granule_values, dtype=np.float64), granule_ms
+
+
+def _decode_pcm(audio_path: str):
+    """Decode audio to mono 16-bit PCM. Returns (samples, sample_rate) or None."""
+    if audio_path.lower().endswith(".wav"):
+        with wave.open(audio_path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            raw = wav.readframes(wav.getnframes())
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+            channels = wav.getnchannels()
+            if channels > 1:
+                samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+            return samples, wav.getframerate()
+
+    ffmpeg = shutil.which(FFMPEG_BINARY)
+    if not ffmpeg:
+        return None
+    proc = subprocess.run(
+        [ffmpeg, "-v", "quiet", "-i", audio_path, "-f", "s16le", "-ac", "1",
+         "-ar", str(PCM_SAMPLE_RATE), "-"],
+        stdout=subprocess.PIPE,
+        check=False,
+    )
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32), PCM_SAMPLE_RATE
+
+
+def load_envelope(audio_path: str):
+    """
+    Reduce an audio file to a normalized energy envelope.
+
+    PCM audio (WAV, or anything ffmpeg can decode) gives a 10 ms RMS envelope
+    in dB. Without a decoder, MP3 files fall back to the per-granule
+    `big_values` count read from the frame side info.
+
+    Returns:
+        (envelope, frame_ms) with envelope values in [0, 1], or (None, 0.0)
+    """
+    if not os.path.exists(audio_path):
+        return None, 0.0
+
+    try:
+        decoded = _decode_pcm(audio_path)
+    except (OSError, wave.Error, EOFError) as e:
+        print(f"  ! PCM decode failed: {e}")
+        decoded = None
+
+    if decoded is not None:
+        samples, sample_rate = decoded
+        frame_len = max(1, int(sample_rate * PCM_FRAME_MS / 1000))
+        n_frames = len(samples) // frame_len
+        if n_frames:
+            frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+            rms = np.sqrt(np.mean(frames * frames, axis=1))
+            envelope = 20.0 * np.log10(rms + 1.0)
+            frame_ms = 1000.0 * frame_len / sample_rate
+            return _normalize(envelope), frame_ms
+
+    if audio_path.lower().endswith(".mp3"):
+        envelope, frame_ms = read_mp3_frames(audio_path)
+        if len(envelope):
+            return _normalize(envelope), frame_ms
+
+    return None, 0.0
+
+
+def _normalize(envelope: np.ndarray) -> np.ndarray:
+    """Scale an envelope to [0, 1] between its floor and its peak"""
+    floor = np.percentile(envelope, 5)
+    peak = np.percentile(envelope, 98)
+    if peak <= floor:
+        return np.zeros_like(envelope)
+    return np.clip((envelope - floor) / (peak - floor), 0.0, 1.0)
+
+
+def get_audio_duration_ms(audio_path: str) -> float:
+    """Exact duration of an MP3/WAV file in milliseconds (0 if unknown)"""
+    try:
+        if audio_path.lower().endswith(".wav"):
+            with wave.open(audio_path, "rb") as wav:
+                return 1000.0 * wav.getnframes() / wav.getframerate()
+        values, granule_ms = read_mp3_frames(audio_path)
+        return len(values) * granule_ms
+    except (OSError, wave.Error, EOFError):
+        return 0.0
+
+
+def detect_silences(envelope: np.ndarray, frame_ms: float,
+                    min_silence_ms: float = MIN_SILENCE_MS,
+                    threshold: float = SILENCE_THRESHOLD) -> np.ndarray:
+    """
+    Find silence gaps in a normalized envelope.
+
+    Returns:
+        int array of shape (n, 2) with [start_frame, end_frame) per gap
+    """
+    silent = envelope < threshold
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) * frame_ms >= min_silence_ms
+    return np.stack([starts[keep], ends[keep]], axis=1)
+
+
+def _word_weights(words: list) -> np.ndarray:
+    """Relative speaking time per word, proportional to its character count"""
+    return np.fromiter((len(w) + 1 for w in words), dtype=np.float64, count=len(words))
+
+
+def _timings_from_bounds(words: list, starts_ms: np.ndarray, ends_ms: np.ndarray) -> list:
+    starts_ms = np.round(starts_ms, 2)
+    ends_ms = np.round(ends_ms, 2)
+    durations = np.round(ends_ms - starts_ms, 2)
+    return [
+        {"word": w, "start_ms": s, "duration_ms": d, "end_ms": e}
+        for w, s, d, e in zip(words, starts_ms.tolist(), durations.tolist(), ends_ms.tolist())
+    ]
+
+
+def estimate_word_timings(words: list, total_duration_ms: float = 0.0, speed: float = 1.0) -> list:
+    """
+    Character-weighted timings when no envelope is available.
+
+    Spreads `total_duration_ms` over the words, or estimates the duration
+    from the text length and speed when it is unknown.
+    """
+    if not words:
+        return []
+    weights = _word_weights(words)
+    if total_duration_ms <= 0:
+        total_duration_ms = weights.sum() * ESTIMATED_MS_PER_CHAR / max(speed, 0.1)
+    bounds = np.concatenate(([0.0], np.cumsum(weights))) * (total_duration_ms / weights.sum())
+    return _timings_from_bounds(words, bounds[:-1], bounds[1:])
+
+
+def align_words(words: list, envelope: np.ndarray, frame_ms: float,
+                silences: np.ndarray = None) -> list:
+    """
+    Align words to an energy envelope.
+
+    Words are laid out on the voiced timeline (silences removed) in
+    proportion to their length. Each internal silence gap then pulls the
+    nearest word boundary onto itself, and the words between two anchored
+    boundaries are re-spread linearly.
+    """
+    if not words:
+        return []
+    n_frames = len(envelope)
+    if silences is None:
+        silences = detect_silences(envelope, frame_ms)
+
+    # Voiced mask from the silence ranges
+    delta = np.zeros(n_frames + 1, dtype=np.int32)
+    np.add.at(delta, silences[:, 0], 1)
+    np.add.at(delta, silences[:, 1], -1)
+    voiced = np.cumsum(delta[:-1]) == 0
+    if not voiced.any():
+        return estimate_word_timings(words, n_frames * frame_ms)
+
+    # cum_voiced[k] = voiced frames before frame k
+    cum_voiced = np.concatenate(([0], np.cumsum(voiced))).astype(np.float64)
+    total_voiced = cum_voiced[-1]
+
+    cum_weight = np.concatenate(([0.0], np.cumsum(_word_weights(words))))
+    targets = cum_weight * (total_voiced / cum_weight[-1])
+
+    # Snap internal gaps (not leading/trailing silence) to word boundaries
+    internal = silences[(silences[:, 0] > 0) & (silences[:, 1] < n_frames)]
+    if len(internal) and len(words) > 1:
+        gap_pos = cum_voiced[internal[:, 0]]  # voiced time at which the gap sits
+        inner = targets[1:-1]  # boundary i sits between word i and word i+1
+        idx = np.searchsorted(inner, gap_pos)
+        left = np.clip(idx - 1, 0, len(inner) - 1)
+        right = np.clip(idx, 0, len(inner) - 1)
+        idx = np.where(np.abs(gap_pos - inner[left]) <= np.abs(gap_pos - inner[right]), left, right)
+        distance = np.abs(gap_pos - inner[idx])
+
+        # Only snap when the gap is within one average word of the estimate,
+        # and give each boundary at most one gap (the closest one)
+        tolerance = total_voiced / len(words)
+        order = np.lexsort((distance, idx))
+        idx, gap_pos, distance = idx[order], gap_pos[order], distance[order]
+        first = np.concatenate(([True], idx[1:] != idx[:-1]))
+        ok = first & (distance <= tolerance)
+        anchor_w = cum_weight[1:-1][idx[ok]]
+        anchor_t = gap_pos[ok]
+
+        # Anchors must be monotonic to interpolate between them
+        monotonic = np.concatenate(([True], np.diff(anchor_t) > 0))
+        anchor_w = np.concatenate(([0.0], anchor_w[monotonic], [cum_weight[-1]]))
+        anchor_t = np.concatenate(([0.0], anchor_t[monotonic], [total_voiced]))
+        targets = np.interp(cum_weight, anchor_w, anchor_t)
+
+    # Map voiced time back to wall-clock time. Word starts land after any
+    # preceding silence, word ends before any following silence.
+    start_t = targets[:-1]
+    end_t = targets[1:]
+    start_frame = np.clip(np.searchsorted(cum_voiced, start_t, side="right") - 1, 0, n_frames)
+    start_pos = start_frame + (start_t - cum_voiced[start_frame])
+    end_frame = np.clip(np.searchsorted(cum_voiced, end_t, side="left"), 0, n_frames)
+    end_pos = end_frame - (cum_voiced[end_frame] - end_t)
+    end_pos = np.maximum(end_pos, start_pos)
+
+    return _timings_from_bounds(words, start_pos * frame_ms, end_pos * frame_ms)
+
+
+def align_audio(audio_path: str, text: str, speed: float = 1.0) -> list:
+    """
+    Produce word timings for `text` spoken in `audio_path`.
+
+    Reusable entry point for both freshly generated and cached audio.
+    Falls back to character-weighted estimation when the file cannot be
+    analysed.
+    """
+    words = text.split()
+    if not words:
+        return []
+
+    envelope, frame_ms = load_envelope(audio_path)
+    if envelope is not None and len(envelope):
+        silences = detect_silences(envelope, frame_ms)
+        print(f"  - Envelope: {len(envelope)} frames @ {frame_ms:.1f}ms, {len(silences)} silences")
+        return align_words(words, envelope, frame_ms, silences)
+
+    print("  ! Could not read audio envelope. Using estimation fallback.")
+    return estimate_word_timings(words, get_audio_duration_ms(audio_path), speed)
@@ -0,0 +1,148 @@
+"""
+Answer cache for repeated questions about the same document.
+
+When many readers ask near-identical questions about one handout, only
+the first one goes to the model. Answers are stored per (document content
+hash, dyslexia type, language); a new question is normalized (lowercase,
+no punctuation or filler words, crude plural stripping) and compared with
+the cached questions by word overlap and character trigram similarity.
+At ANSWER_CACHE_THRESHOLD or above, the cached answer is returned.
+"What is" and "explain" count as the same request; who, when, where, why
+and how do not.
+
+Questions that differ in a number ("chapter 2" / "chapter 3") or in
+negation never match. A hit does not rewrite the stored record: hit counts
+and last-use times are collected in the process and written with the
+next store() for the same document. Follow-up questions that refer back into a
+conversation ("what about that one?") are not looked up or stored, since
+their answer depends on the session's history.
+"""
+import re
+import time
+
+from config import ANSWER_CACHE, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES
+from services import state_store
+
+ANSWERS_NAMESPACE = "answer_cache"
+
+_WORD = re.compile(r"\w+")
+
+_STOPWORDS = frozenset("""
+a an the is are was were be been being do does did can could would should will
+shall may might must of in on at to for from by with about as into than then
+what which please tell me us explain describe give i you we my your our and or
+so just also there here s re ve ll d m
+""".split())
+
+_NEGATIONS = frozenset(["not", "no", "never", "none", "nothing", "without", "cannot"])
+
+# Words that point back into the conversation
+_REFERRING = frozenset("""
+it its they them their theirs this that these those he him his she her one ones
+""".split())
+
+answer_cache_stats = {"hits": 0, "misses": 0, "skipped": 0}
+
+# Cache key -> {question: (hits, last used)} not yet written to the record
+_pending_hits = {}
+_MAX_PENDING_KEYS = 1024
+
+
+def _cache_key(document_hash: str, dyslexia_type: str, language: str) -> str:
+    return f"{document_hash}|{dyslexia_type}|{language}"
+
+
+def normalize(question: str) -> list:
+    """Content words of a question, in order"""
+    words = []
+    for word in _WORD.findall(question.lower().replace("’", "'").replace("n't", " not")):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _trigrams(words: list) -> set:
+    text = f" {' '.join(words)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(words_a: list, words_b: list) -> float:
+    """Similarity of two normalized questions, 0 to 1"""
+    set_a, set_b = set(words_a), set(words_b)
+    if not set_a or not set_b:
+        return 0.0
+    # A different number or a negation changes the question
+    if {w for w in set_a if w.isdigit()} != {w for w in set_b if w.isdigit()}:
+        return 0.0
+    if bool(set_a & _NEGATIONS) != bool(set_b & _NEGATIONS):
+        return 0.0
+
+    jaccard = len(set_a & set_b) / len(set_a | set_b)
+    trigrams_a, trigrams_b = _trigrams(words_a), _trigrams(words_b)
+    dice = 2 * len(trigrams_a & trigrams_b) / (len(trigrams_a) + len(trigrams_b))
+    return (jaccard + dice) / 2
+
+
+def is_standalone(question: str, has_history: bool) -> bool:
+    """Whether the answer can be shared: no earlier turns, or nothing refers back to them"""
+    if not has_history:
+        return True
+    return not any(word in _REFERRING for word in _WORD.findall(question.lower()))
+
+
+def lookup(document_hash: str, dyslexia_type: str, language: str, question: str):
+    """
+    Find a cached answer for a similar question.
+
+    Returns (answer, score), or None.
+    """
+    if not (ANSWER_CACHE and document_hash):
+        return None
+    key = _cache_key(document_hash, dyslexia_type, language)
+    record = state_store.get(ANSWERS_NAMESPACE, key)
+    words = normalize(question)
+    best, best_score = None, 0.0
+    for entry in (record or {}).get("entries", []):
+        score = similarity(words, entry["words"])
+        if score > best_score:
+            best, best_score = entry, score
+
+    if best is None or best_score < ANSWER_CACHE_THRESHOLD:
+        answer_cache_stats["misses"] += 1
+        return None
+    answer_cache_stats["hits"] += 1
+    pending = _pending_hits.setdefault(key, {})
+    hits, _ = pending.get(best["question"], (0, 0))
+    pending[best["question"]] = (hits + 1, time.time())
+    while len(_pending_hits) > _MAX_PENDING_KEYS:
+        _pending_hits.pop(next(iter(_pending_hits)))
+    return best["answer"], round(best_score, 3)
+
+
+def store(document_hash: str, dyslexia_type: str, language: str, question: str, answer: str):
+    """Cache an answer, evicting the least recently used ones over ANSWER_CACHE_MAX_ENTRIES"""
+    if not (ANSWER_CACHE and document_hash):
+        return
+    key = _cache_key(document_hash, dyslexia_type, language)
+    record = state_store.get(ANSWERS_NAMESPACE, key) or {"entries": []}
+    entries = record["entries"]
+    pending = _pending_hits.pop(key, {})
+    for entry in entries:
+        if entry["question"] in pending:
+            hits, used = pending[entry["question"]]
+            entry["hits"] += hits
+            entry["used"] = max(entry["used"], used)
+    entries.append({
+        "question": question,
+        "words": normalize(question),
+        "answer": answer,
+        "hits": 0,
+        "used": time.time()
+    })
+    if len(entries) > ANSWER_CACHE_MAX_ENTRIES:
+        entries.sort(key=lambda entry: entry["used"])
+        del entries[:len(entries) - ANSWER_CACHE_MAX_ENTRIES]
+    state_store.put(ANSWERS_NAMESPACE, key, record)
@@ -0,0 +1,101 @@
+"""
+Content-addressed cache for generated speech.
+
+Audio is stored in AUDIO_DIR under an ID derived from (text, voice, speed),
+next to its timing sidecar, so the same request is only synthesized once.
+Concurrent requests for the same key share one synthesis, and the least
+recently used entries are evicted once the directory passes
+AUDIO_CACHE_MAX_MB.
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+from config import AUDIO_DIR, AUDIO_CACHE_MAX_MB
+
+# Synthesis currently running, keyed by audio ID
+_inflight = {}
+
+# Only scan the directory for eviction every so often
+_EVICT_INTERVAL_S = 60.0
+_last_evict = 0.0
+
+
+def cache_key(text: str, voice: str, speed: float) -> str:
+    """Deterministic audio ID for a synthesis request"""
+    payload = f"{voice}|{speed:.2f}|{text.strip()}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def touch(paths: list):
+    """Mark cache files as recently used"""
+    now = time.time()
+    for path in paths:
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+
+async def get_or_create(key: str, factory):
+    """
+    Run `factory()` for `key` unless the same key is already being built.
+
+    Callers that arrive while a synthesis is running await the same result.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def is_inflight(key: str) -> bool:
+    return key in _inflight
+
+
+def evict(max_bytes: int = None, force: bool = False):
+    """Delete least recently used cache entries above the size limit"""
+    global _last_evict
+    now = time.monotonic()
+    if not force and now - _last_evict < _EVICT_INTERVAL_S:
+        return
+    _last_evict = now
+
+    if max_bytes is None:
+        max_bytes = AUDIO_CACHE_MAX_MB * 1024 * 1024
+    if max_bytes <= 0:
+        return
+
+    # Group files by audio ID so audio and sidecar are evicted together
+    entries = {}
+    for entry in os.scandir(AUDIO_DIR):
+        if not entry.is_file():
+            continue
+        audio_id = entry.name.split(".", 1)[0]
+        stat = entry.stat()
+        group = entries.setdefault(audio_id, {"size": 0, "mtime": 0.0, "paths": []})
+        group["size"] += stat.st_size
+        group["mtime"] = max(group["mtime"], stat.st_mtime)
+        group["paths"].append(entry.path)
+
+    total = sum(group["size"] for group in entries.values())
+    if total <= max_bytes:
+        return
+
+    removed = 0
+    for audio_id, group in sorted(entries.items(), key=lambda item: item[1]["mtime"]):
+        if total <= max_bytes:
+            break
+        if audio_id in _inflight:
+            continue
+        for path in group["paths"]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= group["size"]
+        removed += 1
+    print(f"  - Audio cache: evicted {removed} entries")
@@ -0,0 +1,97 @@
+"""
+Joining speech clips into one audio file without re-encoding.
+
+MP3 clips are joined frame by frame: ID3 tags and Xing/Info header frames
+are dropped and the audio frames are copied as they are, which works when
+every clip has the same sample rate and channel mode (true for clips from
+one voice). WAV clips are joined when their parameters match. The start
+of every clip in the joined file is returned so word timings can be
+shifted to match.
+"""
+import wave
+
+from services.alignment_service import iter_mp3_frames
+
+
+def _mp3_audio(path: str):
+    """Return (frame bytes, duration_ms, (sample_rate, mono)) for an MP3 file"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    frames = []
+    samples_total = 0
+    signature = None
+    for pos, (frame_size, samples, sample_rate, (_, _, mono, _)) in iter_mp3_frames(data):
+        frame = data[pos:pos + frame_size]
+        if len(frame) < frame_size:
+            break  # truncated last frame
+        if b"Xing" in frame[:64] or b"Info" in frame[:64]:
+            continue  # encoder header frame, not audio
+        if signature is None:
+            signature = (sample_rate, mono)
+        elif signature != (sample_rate, mono):
+            return None
+        frames.append(frame)
+        samples_total += samples
+
+    if signature is None:
+        return None
+    return b"".join(frames), 1000.0 * samples_total / signature[0], signature
+
+
+def _concat_mp3(paths: list, out_path: str):
+    parts = [_mp3_audio(path) for path in paths]
+    if any(part is None for part in parts) or len({part[2] for part in parts}) > 1:
+        return None
+
+    offsets = []
+    position_ms = 0.0
+    with open(out_path, "wb") as out:
+        for audio, duration_ms, _ in parts:
+            offsets.append(position_ms)
+            out.write(audio)
+            position_ms += duration_ms
+    return offsets
+
+
+def _concat_wav(paths: list, out_path: str):
+    clips = []
+    for path in paths:
+        with wave.open(path, "rb") as wav:
+            params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+            clips.append((params, wav.readframes(wav.getnframes())))
+    if len({params for params, _ in clips}) > 1:
+        return None
+
+    channels, sample_width, frame_rate = clips[0][0]
+    offsets = []
+    position_ms = 0.0
+    with wave.open(out_path, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(sample_width)
+        out.setframerate(frame_rate)
+        for _, frames in clips:
+            offsets.append(position_ms)
+            out.writeframes(frames)
+            position_ms += 1000.0 * len(frames) / (channels * sample_width * frame_rate)
+    return offsets
+
+
+def concat_audio(paths: list, out_path: str):
+    """
+    Join audio clips into `out_path`.
+
+    Returns the start of each clip in milliseconds, or None when the clips
+    cannot be joined losslessly (mixed formats or sample rates).
+    """
+    if not paths:
+        return None
+    extensions = {path.rsplit(".", 1)[-1].lower() for path in paths}
+    if extensions == {"mp3"} and out_path.endswith(".mp3"):
+        return _concat_mp3(paths, out_path)
+    if extensions == {"wav"} and out_path.endswith(".wav"):
+        try:
+            return _concat_wav(paths, out_path)
+        except (wave.Error, EOFError):
+            return None
+    return None
@@ -0,0 +1,135 @@
+"""
+Bounded conversation memory for document Q&A.
+
+Each chat session keeps its recent questions and answers verbatim, so a
+follow-up like "what about the second one?" can be resolved. Once the
+memory is over CHAT_MEMORY_TOKENS, the older turns are folded into a
+running summary by the small model in the background, keeping the last
+CHAT_MEMORY_RECENT_TURNS turns as they are. The prompt therefore stays
+about the same size however long the conversation gets.
+
+Memory lives in the shared state store next to the session's document
+context and is cleared when the document changes.
+"""
+import asyncio
+
+from config import CHAT_MEMORY_TOKENS, CHAT_MEMORY_RECENT_TURNS, CHAT_SUMMARY_TOKENS
+from services import state_store
+from services.admission import BULK, Overloaded, set_request_class
+from services.groq_client import chat_completion
+
+MEMORY_NAMESPACE = "chat_memory"
+
+# Rough size of a token, for budgeting without a tokenizer
+_CHARS_PER_TOKEN = 4
+
+# Summaries being written, by session (kept so tasks are not garbage collected)
+_compactions = {}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def _memory_tokens(memory: dict) -> int:
+    return estimate_tokens(memory["summary"]) + sum(
+        estimate_tokens(turn["question"]) + estimate_tokens(turn["answer"])
+        for turn in memory["turns"]
+    )
+
+
+def get_memory(session_id: str) -> dict:
+    """The session's memory: {"summary", "turns": [{"question", "answer"}]}"""
+    return state_store.get(MEMORY_NAMESPACE, session_id) or {"summary": "", "turns": []}
+
+
+def clear_memory(session_id: str):
+    state_store.delete(MEMORY_NAMESPACE, session_id)
+
+
+def format_memory(memory: dict) -> str:
+    """The memory as prompt text ("" when there is none)"""
+    lines = []
+    if memory["summary"]:
+        lines.append(f"Summary of earlier questions: {memory['summary']}")
+    for turn in memory["turns"]:
+        lines.append(f"User: {turn['question']}")
+        lines.append(f"Assistant: {turn['answer']}")
+    return "\n".join(lines)
+
+
+def _append_turn(session_id: str, question: str, answer: str) -> dict:
+    memory = get_memory(session_id)
+    memory["turns"].append({"question": question, "answer": answer})
+    # Hard bound in case summaries fail or fall behind
+    while len(memory["turns"]) > 1 and _memory_tokens(memory) > 2 * CHAT_MEMORY_TOKENS:
+        memory["turns"].pop(0)
+    state_store.put(MEMORY_NAMESPACE, session_id, memory)
+    return memory
+
+
+async def add_turn(session_id: str, question: str, answer: str):
+    """
+    Remember a question and its answer.
+
+    When the memory goes over budget a background task rolls the older
+    turns into the summary.
+    """
+    memory = await asyncio.to_thread(_append_turn, session_id, question, answer)
+
+    if (_memory_tokens(memory) > CHAT_MEMORY_TOKENS
+            and len(memory["turns"]) > CHAT_MEMORY_RECENT_TURNS
+            and session_id not in _compactions):
+        task = asyncio.create_task(_compact(session_id))
+        _compactions[session_id] = task
+        task.add_done_callback(lambda _: _compactions.pop(session_id, None))
+
+
+async def _summarize(summary: str, turns: list):
+    conversation = "\n".join(
+        f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns
+    )
+    prompt = f"""Update the summary of a conversation about a document.
+
+CURRENT SUMMARY:
+{summary or "(none)"}
+
+NEW PART OF THE CONVERSATION:
+{conversation}
+
+Write the updated summary in at most {CHAT_SUMMARY_TOKENS * 3 // 4} words. Keep the topics asked
+about, names, numbers, and any lists in the answers with their order, so
+that follow-up questions ("the second one", "that person") can be understood.
+Reply with the summary only."""
+    response = await chat_completion(
+        operation="chat_summary",
+        input_chars=len(prompt),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+        max_tokens=CHAT_SUMMARY_TOKENS
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _compact(session_id: str):
+    """Fold all but the recent turns into the summary"""
+    set_request_class(BULK, session_id)
+    memory = await asyncio.to_thread(get_memory, session_id)
+    old_turns = memory["turns"][:-CHAT_MEMORY_RECENT_TURNS]
+    if not old_turns:
+        return
+    try:
+        summary = await _summarize(memory["summary"], old_turns)
+    except Overloaded:
+        return
+    except Exception as e:
+        print(f"  ! Chat memory summary failed: {str(e)}")
+        return
+
+    # Turns may have been added meanwhile, or the memory cleared
+    current = await asyncio.to_thread(get_memory, session_id)
+    if current["turns"][:len(old_turns)] != old_turns:
+        return
+    current["summary"] = summary
+    current["turns"] = current["turns"][len(old_turns):]
+    await asyncio.to_thread(state_store.put, MEMORY_NAMESPACE, session_id, current)
@@ -1,23 +1,50 @@
-from groq import AsyncGroq
-from config import GROQ_API_KEY
-
-client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-
-# Store document context per session (in production, use database or Redis)
-document_context = {}
-
-def store_document_context(session_id: str, document_text: str):
-    """Store document text for a session"""
-    document_context[session_id] = document_text
+import asyncio
+from services.groq_client import get_client, chat_completion
+from services.admission import Overloaded
+from services import state_store
+from services.document_store import get_document, get_document_hash, get_text, intern_text
+from services.chat_memory import get_memory, format_memory, add_turn, clear_memory
+from services import answer_cache
+from services.document_digest import build_context
+
+# Document context per session lives in the shared state store, so any
+# worker process can answer questions for any session. A session only holds
+# the content hash of its document; the text itself is interned once in the
+# document store and shared by every session that loaded it. Loading or
+# clearing a document also starts a new conversation (services/chat_memory.py).
+DOCUMENT_CONTEXT_NAMESPACE = "document_context"
+
+def store_document_context(session_id: str, document_text: str = None, document_id: str = None):
+    """Store document text (or a stored document reference) for a session"""
+    if document_id:
+        digest = get_document_hash(document_id)
+        if digest is None:
+            return
+    else:
+        digest = intern_text(document_text)
+    clear_document_context(session_id)
+    state_store.put(DOCUMENT_CONTEXT_NAMESPACE, session_id, {"content_hash": digest})
 
 def get_document_context(session_id: str) -> str:
     """Retrieve stored document text for a session"""
-    return document_context.get(session_id, "")
+    context = state_store.get(DOCUMENT_CONTEXT_NAMESPACE, session_id)
+    return (get_text(context["content_hash"]) or "") if context else ""
+
+def get_document_context_hash(session_id: str):
+    """Content hash of a session's document, or None"""
+    context = state_store.get(DOCUMENT_CONTEXT_NAMESPACE, session_id)
+    return context["content_hash"] if context else None
+
+def _document_hash(session_id: str, document_id: str = None):
+    """Content hash of the document a question is about, or None"""
+    if document_id:
+        return get_document_hash(document_id)
+    return get_document_context_hash(session_id)
 
 def clear_document_context(session_id: str):
-    """Clear stored document for a session"""
-    if session_id in document_context:
-        del document_context[session_id]
+    """Clear stored document (and conversation memory) for a session"""
+    state_store.delete(DOCUMENT_CONTEXT_NAMESPACE, session_id)
+    clear_memory(session_id)
 
 def _get_simplification_prompt(text: str, dyslexia_type: str, lang_name: str) -> str:
     """Generate dyslexia-type-specific text simplification prompts with grounding and few-shot examples"""
@@ -208,9 +235,18 @@ SIMPLIFIED TEXT:"""
     prompt = prompts_by_type.get(dyslexia_type, prompts_by_type["general"])
     return prompt
 
-def _get_qa_prompt(question: str, document_text: str, dyslexia_type: str, lang_name: str) -> str:
+def _get_qa_prompt(question: str, document_text: str, dyslexia_type: str, lang_name: str,
+                   conversation: str = "") -> str:
     """Generate dyslexia-type-specific Q&A prompts with grounding and few-shot examples"""
     
+    # Earlier turns, so follow-up questions can refer back to them
+    history = ""
+    if conversation:
+        history = (
+            "\nCONVERSATION SO FAR (use it only to understand what the question refers to):\n"
+            f"{conversation}\n"
+        )
+    
     qa_prompts_by_type = {
         "phonological": f"""You are a helpful assistant answering questions for people with PHONOLOGICAL DYSLEXIA.
 
@@ -228,7 +264,7 @@ YOUR TASK:
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -260,7 +296,7 @@ YOUR TASK:
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -294,7 +330,7 @@ YOUR TASK:
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -331,7 +367,7 @@ YOUR TASK:
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -366,7 +402,7 @@ YOUR TASK:
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -391,7 +427,7 @@ ANSWER:"""
 
 DOCUMENT CONTEXT:
 {document_text}
-
+{history}
 QUESTION:
 {question}
 
@@ -414,38 +450,87 @@ ANSWER:"""
     prompt = qa_prompts_by_type.get(dyslexia_type, qa_prompts_by_type["general"])
     return prompt
 
-async def simplify_text(text: str, dyslexia_type: str = "general", language: str = "en") -> dict:
-    """Simplify text for dyslexic users"""
+LANGUAGE_NAMES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German",
+    "it": "Italian", "pt": "Portuguese", "hi": "Hindi", "ar": "Arabic",
+    "zh": "Chinese", "ja": "Japanese", "ko": "Korean", "ru": "Russian"
+}
+
+def build_simplify_request(text: str, dyslexia_type: str = "general", language: str = "en") -> tuple:
+    """
+    Build the completion request for simplify_text().
     
-    if not client:
-        return {
-            "error": "Groq API key not configured.",
-            "success": False
-        }
+    Returns:
+        (completion kwargs, error) where exactly one is None
+    """
+    if not get_client():
+        return None, "Groq API key not configured."
     
     if not text.strip():
-        return {
-            "error": "Please provide text to simplify.",
-            "success": False
-        }
+        return None, "Please provide text to simplify."
     
-    language_names = {
-        "en": "English", "es": "Spanish", "fr": "French", "de": "German",
-        "it": "Italian", "pt": "Portuguese", "hi": "Hindi", "ar": "Arabic",
-        "zh": "Chinese", "ja": "Japanese", "ko": "Korean", "ru": "Russian"
-    }
-    lang_name = language_names.get(language, "English")
+    lang_name = LANGUAGE_NAMES.get(language, "English")
     
     # Generate type-specific prompt for simplification
     prompt = _get_simplification_prompt(text, dyslexia_type, lang_name)
+    return {
+        "operation": "chat_simplify",
+        "input_chars": len(text),
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.2,
+        "max_tokens": 1024
+    }, None
+
+def build_answer_request(question: str, session_id: str, dyslexia_type: str = "general",
+                         language: str = "en", document_id: str = None) -> tuple:
+    """
+    Build the completion request for answer_question().
+    
+    Returns:
+        (completion kwargs, error) where exactly one is None
+    """
+    if not get_client():
+        return None, "Groq API key not configured."
+    
+    # Retrieve document context
+    if document_id:
+        document_text = get_document(document_id) or ""
+    else:
+        document_text = get_document_context(session_id)
+    
+    if not document_text:
+        return None, "No document uploaded for this session. Please upload a document first."
+    
+    if not question.strip():
+        return None, "Please enter a question."
+    
+    lang_name = LANGUAGE_NAMES.get(language, "English")
+    conversation = format_memory(get_memory(session_id)) if session_id else ""
+    # Long documents with a digest are narrowed to the relevant sections
+    context, _ = build_context(document_text, _document_hash(session_id, document_id), question)
+    
+    # Generate type-specific prompt
+    prompt = _get_qa_prompt(question, context, dyslexia_type, lang_name, conversation)
+    return {
+        "operation": "answer",
+        "input_chars": len(context) + len(conversation) + len(question),
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.2,
+        "max_tokens": 1024
+    }, None
+
+async def simplify_text(text: str, dyslexia_type: str = "general", language: str = "en") -> dict:
+    """Simplify text for dyslexic users"""
+    
+    request, error = build_simplify_request(text, dyslexia_type, language)
+    if error:
+        return {
+            "error": error,
+            "success": False
+        }
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=1024
-        )
+        response = await chat_completion(**request)
         
         simplified = response.choices[0].message.content.strip()
         
@@ -456,61 +541,77 @@ async def simplify_text(text: str, dyslexia_type: str = "general", language: str
             "language": language,
             "success": True
         }
+    except Overloaded:
+        raise
     except Exception as e:
         return {
             "error": f"Error simplifying text: {str(e)}",
             "success": False
         }
 
-async def answer_question(question: str, session_id: str, dyslexia_type: str = "general", language: str = "en") -> dict:
-    """Answer a question based on uploaded document context"""
+def find_cached_answer(question: str, session_id: str, dyslexia_type: str, language: str,
+                       document_id: str = None) -> tuple:
+    """
+    Returns (document_hash, shareable, cached): questions that do not depend
+    on the session's conversation share answers; cached is (answer, score)
+    or None
+    """
+    document_hash = _document_hash(session_id, document_id)
+    has_history = bool(session_id) and bool(get_memory(session_id)["turns"])
+    shareable = answer_cache.is_standalone(question, has_history)
+    cached = None
+    if shareable and question.strip():
+        cached = answer_cache.lookup(document_hash, dyslexia_type, language, question)
+    return document_hash, shareable, cached
+
+async def answer_question(question: str, session_id: str, dyslexia_type: str = "general", language: str = "en",
+                          document_id: str = None) -> dict:
+    """Answer a question based on uploaded document context (or a stored document)"""
     
-    if not client:
+    # The cache is checked before the document, memory and prompt are built
+    document_hash, shareable, cached = await asyncio.to_thread(
+        find_cached_answer, question, session_id, dyslexia_type, language, document_id
+    )
+    if cached:
+        answer, score = cached
+        if session_id:
+            await add_turn(session_id, question, answer)
         return {
-            "error": "Groq API key not configured.",
-            "success": False
-        }
-    
-    # Retrieve document context
-    document_text = get_document_context(session_id)
-    
-    if not document_text:
-        return {
-            "error": "No document uploaded for this session. Please upload a document first.",
-            "success": False
+            "question": question,
+            "answer": answer,
+            "cached": True,
+            "similarity": score,
+            "success": True
         }
     
-    if not question.strip():
+    request, error = await asyncio.to_thread(
+        build_answer_request, question, session_id, dyslexia_type, language, document_id
+    )
+    if error:
         return {
-            "error": "Please enter a question.",
+            "error": error,
             "success": False
         }
-    
-    language_names = {
-        "en": "English", "es": "Spanish", "fr": "French", "de": "German",
-        "it": "Italian", "pt": "Portuguese", "hi": "Hindi", "ar": "Arabic",
-        "zh": "Chinese", "ja": "Japanese", "ko": "Korean", "ru": "Russian"
-    }
-    lang_name = language_names.get(language, "English")
-    
-    # Generate type-specific prompt
-    prompt = _get_qa_prompt(question, document_text, dyslexia_type, lang_name)
+    if not shareable:
+        answer_cache.answer_cache_stats["skipped"] += 1
     
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=1024
-        )
+        response = await chat_completion(**request)
         
         answer = response.choices[0].message.content.strip()
+        if session_id:
+            await add_turn(session_id, question, answer)
+        if shareable:
+            await asyncio.to_thread(answer_cache.store, document_hash, dyslexia_type, language, question, answer)
         
         return {
             "question": question,
             "answer": answer,
+            "cached": False,
             "success": True
         }
+    except Overloaded:
+        raise
     except Exception as e:
         return {
             "error": f"Error processing question: {str(e)}",
@@ -0,0 +1,291 @@
+"""
+Precomputed digests of long chat documents.
+
+When a document is set as a session's context, a digest can be built in
+the background: the text is cut into sections (at heading-like lines, or
+every DIGEST_SECTION_CHARS), each section gets a short summary from the
+small model, and a keyword index maps normalized words to the sections
+they occur in. Digests are stored by content hash, so every session on
+the same handout shares one.
+
+For documents over DIGEST_MIN_CHARS, questions are then answered from a
+smaller context instead of the whole text: overview questions ("what is
+this about?") from the outline and section summaries, other questions
+from the outline plus the best-matching sections, up to
+DIGEST_CONTEXT_CHARS. When no section matches the question, or the
+digest is not ready yet, the whole document is used as before.
+
+A digest whose section summaries failed (or were shed under load) is
+stored as partial and completed the next time the document is set.
+Digests are removed with their document text (prune_digests()).
+"""
+import asyncio
+import math
+import re
+from collections import Counter, OrderedDict
+
+from config import (
+    DIGEST_MIN_CHARS, DIGEST_SECTION_CHARS, DIGEST_CONTEXT_CHARS, DIGEST_CONCURRENCY
+)
+from services import state_store
+from services.admission import BULK, Overloaded, set_request_class
+from services.answer_cache import normalize
+from services.document_store import BLOBS_NAMESPACE, split_paragraphs, get_text
+from services.groq_client import get_client, chat_completion
+
+DIGESTS_NAMESPACE = "document_digests"
+
+# Content hashes with a digest being built in this process
+_building = set()
+
+# Parsed digests kept in this process, least recently used first
+_cache = OrderedDict()
+_CACHE_SIZE = 8
+
+# Keywords listed per section in the outline
+_OUTLINE_KEYWORDS = 6
+
+_OVERVIEW = re.compile(
+    r"\b(summar\w*|overview|gist|tl;?dr|main (idea|point|topic|theme)s?|key (idea|point)s?"
+    r"|what (is|are) (this|the) (document|text|article|chapter|handout|file)s? about)\b",
+    re.IGNORECASE
+)
+
+# Words an overview question may have (normalized like the question); any
+# other word narrows it to a topic
+_OVERVIEW_WORDS = frozenset(normalize("""
+summary summarize summarise overview gist tl dr tldr main key idea point topic theme
+document text article chapter handout file whole entire all this it short brief quick
+"""))
+
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+")
+
+
+def _is_heading(paragraph: str) -> bool:
+    """A short single line without closing punctuation, or a Markdown heading"""
+    if _MARKDOWN_HEADING.match(paragraph):
+        return True
+    return (
+        len(paragraph) <= 80
+        and "\n" not in paragraph
+        and paragraph[-1] not in ".!?:;,"
+        and any(c.isalpha() for c in paragraph)
+    )
+
+
+def split_sections(text: str) -> list:
+    """Sections as {"title", "text"}: new ones start at headings and after DIGEST_SECTION_CHARS"""
+    sections = []
+    title, parts, size = None, [], 0
+
+    def close_section():
+        if parts:
+            sections.append({
+                "title": title or " ".join(parts[0].split()[:8]),
+                "text": "\n\n".join(parts)
+            })
+
+    for paragraph in split_paragraphs(text, DIGEST_SECTION_CHARS):
+        if _is_heading(paragraph):
+            close_section()
+            title, parts, size = _MARKDOWN_HEADING.sub("", paragraph), [], 0
+            continue
+        if parts and size + len(paragraph) > DIGEST_SECTION_CHARS:
+            close_section()
+            title, parts, size = None, [], 0
+        parts.append(paragraph)
+        size += len(paragraph)
+    close_section()
+    return sections
+
+
+def build_index(sections: list) -> dict:
+    """Keyword index: word -> {section index (as str): occurrences}"""
+    index = {}
+    for number, section in enumerate(sections):
+        for word, count in Counter(normalize(section["text"])).items():
+            index.setdefault(word, {})[str(number)] = count
+    return index
+
+
+def _keywords(index: dict, number: int, total: int) -> list:
+    """The section's most distinctive words (tf-idf)"""
+    key = str(number)
+    scored = [
+        (count[key] * math.log(1 + total / len(count)), word)
+        for word, count in index.items()
+        if key in count and len(word) > 2 and not word.isdigit() and len(count) < total
+    ]
+    return [word for _, word in sorted(scored, reverse=True)[:_OUTLINE_KEYWORDS]]
+
+
+async def _summarize_section(section: dict, semaphore: asyncio.Semaphore):
+    prompt = f"""Summarize this section of a document in 2 short sentences.
+Use plain words. Reply with the summary only.
+
+SECTION: {section["title"]}
+{section["text"]}"""
+    async with semaphore:
+        try:
+            response = await chat_completion(
+                operation="digest",
+                input_chars=len(section["text"]),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1,
+                max_tokens=120
+            )
+        except Overloaded:
+            return None
+        except Exception as e:
+            print(f"  ! Digest summary failed: {str(e)}")
+            return None
+    return response.choices[0].message.content.strip()
+
+
+async def build_digest(digest: str):
+    """Build and store the digest for a stored text (by content hash), or complete a partial one"""
+    if digest in _building:
+        return
+    _building.add(digest)
+    try:
+        previous = await asyncio.to_thread(get_digest, digest)
+        if previous and not previous.get("partial"):
+            # Still in use: keep it from expiring
+            await asyncio.to_thread(state_store.touch, DIGESTS_NAMESPACE, digest)
+            return
+        set_request_class(BULK)
+        text = await asyncio.to_thread(get_text, digest)
+        if not text or len(text) <= DIGEST_MIN_CHARS:
+            return
+        sections = await asyncio.to_thread(split_sections, text)
+        index = await asyncio.to_thread(build_index, sections)
+
+        # Summaries from a partial digest are kept (sections are deterministic)
+        summaries = [section.get("summary") for section in previous["sections"]] if previous else [None] * len(sections)
+        missing = [number for number, summary in enumerate(summaries) if not summary]
+        # Without the model the outline lists keywords instead of summaries
+        if missing and get_client():
+            semaphore = asyncio.Semaphore(DIGEST_CONCURRENCY)
+            results = await asyncio.gather(*(
+                _summarize_section(sections[number], semaphore) for number in missing
+            ))
+            for number, summary in zip(missing, results):
+                summaries[number] = summary
+        for number, (section, summary) in enumerate(zip(sections, summaries)):
+            section["summary"] = summary
+            section["keywords"] = _keywords(index, number, len(sections))
+
+        record = {
+            "sections": sections,
+            "index": index,
+            "partial": not all(summaries)
+        }
+        await asyncio.to_thread(state_store.put, DIGESTS_NAMESPACE, digest, record, cache=False)
+        _remember(digest, record)
+        print(f"  ✓ Digest built: {len(sections)} sections, "
+              f"{sum(1 for s in summaries if s)} summarized")
+    finally:
+        _building.discard(digest)
+
+
+def _remember(digest: str, record: dict):
+    _cache[digest] = record
+    _cache.move_to_end(digest)
+    while len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def get_digest(digest: str):
+    """The parsed digest for a content hash, or None when there is none yet"""
+    if not digest:
+        return None
+    record = _cache.get(digest)
+    if record is not None:
+        _cache.move_to_end(digest)
+        return record
+    record = state_store.get(DIGESTS_NAMESPACE, digest, cache=False)
+    if record is not None:
+        _remember(digest, record)
+    return record
+
+
+def prune_digests() -> int:
+    """Remove digests whose document text is no longer stored; returns the number removed"""
+    removed = 0
+    for digest in state_store.keys(DIGESTS_NAMESPACE):
+        if not state_store.exists(BLOBS_NAMESPACE, digest):
+            state_store.delete(DIGESTS_NAMESPACE, digest)
+            _cache.pop(digest, None)
+            removed += 1
+    return removed
+
+
+def is_overview(question: str) -> bool:
+    """Whether a question is about the whole document ("summarize this", "main points")"""
+    if not _OVERVIEW.search(question):
+        return False
+    return all(word in _OVERVIEW_WORDS for word in normalize(question))
+
+
+def format_outline(digest: dict) -> str:
+    lines = []
+    for number, section in enumerate(digest["sections"], start=1):
+        line = f"{number}. {section['title']}"
+        if section.get("summary"):
+            line += f": {section['summary']}"
+        elif section.get("keywords"):
+            line += f" ({', '.join(section['keywords'])})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def select_sections(digest: dict, question: str) -> list:
+    """Section indices that best match the question, best first"""
+    index = digest["index"]
+    total = len(digest["sections"])
+    scores = Counter()
+    for word in set(normalize(question)):
+        postings = index.get(word)
+        # Words in every section do not tell them apart
+        if not postings or (total > 1 and len(postings) == total):
+            continue
+        idf = math.log(1 + total / len(postings))
+        for number, count in postings.items():
+            scores[int(number)] += idf * (1 + math.log(count))
+    return [number for number, _ in scores.most_common()]
+
+
+def build_context(document_text: str, digest_hash: str, question: str) -> tuple:
+    """
+    The document context for a question.
+
+    Returns (context, mode): mode is "full" (the whole text), "overview"
+    (outline with section summaries) or "sections" (outline plus the
+    matching sections).
+    """
+    if len(document_text) <= DIGEST_MIN_CHARS:
+        return document_text, "full"
+    digest = get_digest(digest_hash)
+    if not digest:
+        return document_text, "full"
+
+    outline = format_outline(digest)
+    if is_overview(question):
+        return f"OUTLINE AND SECTION SUMMARIES:\n{outline}", "overview"
+
+    chosen = []
+    size = len(outline)
+    for number in select_sections(digest, question):
+        section = digest["sections"][number]
+        if chosen and size + len(section["text"]) > DIGEST_CONTEXT_CHARS:
+            break
+        chosen.append(number)
+        size += len(section["text"])
+    if not chosen:
+        return document_text, "full"
+
+    parts = [f"OUTLINE:\n{outline}"]
+    for number in sorted(chosen):
+        section = digest["sections"][number]
+        parts.append(f"SECTION {number + 1}: {section['title']}\n{section['text']}")
+    return "\n\n".join(parts), "sections"
@@ -1,37 +1,284 @@
-import pdfplumber
-from docx import Document
+import codecs
+import io
+import mmap
 import os
+import threading
+import zipfile
 
-def extract_from_pdf(file_path: str) -> str:
+from config import PDF_ENGINE, PDF_SAMPLE_PAGES, TXT_MMAP_MIN_BYTES
+
+PDF_ENGINES = ("pdfium", "pdfplumber")
+
+# PDFium is not thread-safe, so calls into it are serialized per process
+_pdfium_lock = threading.Lock()
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one)
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_TXT_SAMPLE_BYTES = 32 * 1024
+_TXT_CHUNK_BYTES = 256 * 1024
+
+# WordprocessingML namespace, in lxml's "{uri}tag" form
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# A page with this many vector paths (ruling lines, cell borders) is treated as a table
+_TABLE_MIN_PATHS = 20
+
+def _pdfium_pages(file_path: str) -> list:
+    """Page texts from PDFium, in content order without layout analysis"""
+    import pypdfium2 as pdfium
+
+    pages = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_bounded().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    return pages
+
+def _pdfplumber_pages(file_path: str) -> list:
+    """Page texts from pdfplumber, ordered by its layout analysis"""
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+def _page_needs_layout(page) -> bool:
+    """True for pages that look like ruled tables"""
+    import pypdfium2.raw as pdfium_c
+
+    paths = sum(1 for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,), max_depth=2))
+    return paths >= _TABLE_MIN_PATHS
+
+def select_pdf_engine(file_path: str, sample_pages: int = PDF_SAMPLE_PAGES) -> str:
+    """
+    Pick the extraction engine for a PDF by sampling a few pages.
+
+    Running text (including multi-column pages, which PDFium returns in
+    content order) goes through PDFium, which is many times faster.
+    pdfplumber is only used when a sampled page has ruled tables, where
+    its line grouping keeps each table row together.
+    """
+    import pypdfium2 as pdfium
+
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            count = len(pdf)
+            samples = min(max(sample_pages, 1), count)
+            # Evenly spaced, including the first and last page
+            indices = sorted({round(i * (count - 1) / max(samples - 1, 1)) for i in range(samples)})
+            for index in indices:
+                page = pdf[index]
+                try:
+                    if _page_needs_layout(page):
+                        return "pdfplumber"
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+    return "pdfium"
+
+def extract_from_pdf(file_path: str, engine: str = None) -> str:
     """Extract text from PDF file"""
-    text = ""
+    engine = engine or PDF_ENGINE
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
+        if engine == "auto":
+            try:
+                engine = select_pdf_engine(file_path)
+            except Exception as e:
+                # Fall back to pdfplumber for files PDFium cannot open
+                print(f"  ! PDF engine selection failed, using pdfplumber: {e}")
+                engine = "pdfplumber"
+        if engine == "pdfium":
+            pages = _pdfium_pages(file_path)
+        else:
+            pages = _pdfplumber_pages(file_path)
     except Exception as e:
         return f"Error extracting PDF: {str(e)}"
-    return text.strip()
+    return "\n\n".join(page.strip() for page in pages if page.strip())
+
+def _docx_paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter(_W + "t", _W + "tab", _W + "br", _W + "cr"):
+        if node.tag == _W + "t":
+            parts.append(node.text or "")
+        elif node.tag == _W + "tab":
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts).strip()
+
+def _docx_table_text(table) -> str:
+    """Rows on separate lines, cells joined by " | " (nested tables are flattened)"""
+    rows = []
+    for row in table.iterchildren(_W + "tr"):
+        cells = []
+        for cell in row.iterchildren(_W + "tc"):
+            texts = (_docx_paragraph_text(p) for p in cell.iter(_W + "p"))
+            cells.append(" ".join(text for text in texts if text))
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+def iter_docx_blocks(file_path: str):
+    """
+    Yield the text blocks of a DOCX in document order: one per non-empty
+    paragraph and one per table.
+
+    `word/document.xml` is streamed from the archive with iterparse and each
+    block is freed once its text is taken, so memory stays bounded by the
+    largest table rather than the whole document; embedded media is never
+    read.
+    """
+    from lxml import etree
+
+    block_parents = (_W + "body", _W + "sdtContent")
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        for _, elem in etree.iterparse(
+            xml, events=("end",), tag=(_W + "p", _W + "tbl"), resolve_entities=False
+        ):
+            parent = elem.getparent()
+            # Paragraphs inside tables and text boxes are read with their block
+            if parent is None or parent.tag not in block_parents:
+                continue
+
+            if elem.tag == _W + "p":
+                text = _docx_paragraph_text(elem)
+            else:
+                text = _docx_table_text(elem)
+            if text:
+                yield text
+
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del parent[0]
 
 def extract_from_docx(file_path: str) -> str:
-    """Extract text from DOCX file"""
-    text = ""
+    """Extract text from DOCX file, including tables"""
     try:
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            if para.text.strip():
-                text += para.text + "\n\n"
+        return "\n\n".join(iter_docx_blocks(file_path))
     except Exception as e:
         return f"Error extracting DOCX: {str(e)}"
-    return text.strip()
+
+def _utf8_valid(sample: bytes, at_start: bool, at_end: bool) -> bool:
+    """Whether a sample taken from anywhere in a file is valid UTF-8"""
+    if not at_start:
+        # Skip continuation bytes of a character cut by the sample start
+        skip = 0
+        while skip < 3 and skip < len(sample) and 0x80 <= sample[skip] <= 0xBF:
+            skip += 1
+        sample = sample[skip:]
+    try:
+        # A character may be cut by the sample end, but not by the file end
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=at_end)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def detect_encoding(data) -> tuple:
+    """
+    Guess the encoding of raw text from samples of its head, middle and tail.
+
+    Checks a byte order mark first, then UTF-16 without BOM (NUL bytes in
+    every other position; NUL is valid UTF-8, so this must come first), then
+    strict UTF-8, then charset_normalizer, and falls back to Windows-1252,
+    which accepts any byte.
+
+    Args:
+        data: bytes or an mmap of the file
+
+    Returns:
+        (encoding, bom_length)
+    """
+    head = data[:_TXT_SAMPLE_BYTES]
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+
+    even_nuls = head[0::2].count(0)
+    odd_nuls = head[1::2].count(0)
+    if len(head) >= 4:
+        if odd_nuls > len(head) * 0.3 and even_nuls < len(head) * 0.05:
+            return "utf-16-le", 0
+        if even_nuls > len(head) * 0.3 and odd_nuls < len(head) * 0.05:
+            return "utf-16-be", 0
+
+    size = len(data)
+    samples = [(head, True, size <= _TXT_SAMPLE_BYTES)]
+    if size > 2 * _TXT_SAMPLE_BYTES:
+        middle = size // 2
+        samples.append((data[middle:middle + _TXT_SAMPLE_BYTES], False, False))
+    if size > _TXT_SAMPLE_BYTES:
+        samples.append((data[-_TXT_SAMPLE_BYTES:], False, True))
+    if all(_utf8_valid(*sample) for sample in samples):
+        return "utf-8", 0
+
+    try:
+        from charset_normalizer import from_bytes
+
+        matches = from_bytes(b"".join(sample for sample, _, _ in samples))
+        best = matches.best()
+        if best is not None:
+            # Short samples often fit several Latin code pages equally well;
+            # Windows-1252 is by far the most common of them
+            for match in matches:
+                if match.chaos <= best.chaos and "cp1252" in match.could_be_from_charset:
+                    return "cp1252", 0
+            return best.encoding, 0
+    except ImportError:
+        pass
+    return "cp1252", 0
+
+def iter_txt_chunks(file_path: str, chunk_bytes: int = _TXT_CHUNK_BYTES):
+    """
+    Decode a text file chunk by chunk, yielding str chunks.
+
+    Files of TXT_MMAP_MIN_BYTES or more are memory-mapped rather than read,
+    so the raw bytes of a large file are never held in memory next to its
+    decoded text; only the pages being decoded are resident. Line endings are normalized to "\n"
+    (also across chunk edges) and undecodable bytes become U+FFFD.
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        if size >= TXT_MMAP_MIN_BYTES:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+
+        try:
+            encoding, offset = detect_encoding(data)
+            decoder = io.IncrementalNewlineDecoder(
+                codecs.getincrementaldecoder(encoding)(errors="replace"), translate=True
+            )
+            for start in range(offset, size, chunk_bytes):
+                chunk = decoder.decode(data[start:start + chunk_bytes])
+                if chunk:
+                    yield chunk
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
 
 def extract_from_txt(file_path: str) -> str:
-    """Extract text from TXT file"""
+    """Extract the whole text of a TXT file in any common encoding"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+        return "".join(iter_txt_chunks(file_path)).strip()
     except Exception as e:
         return f"Error reading TXT: {str(e)}"
 
@@ -0,0 +1,277 @@
+"""
+Server-side document store.
+
+Uploaded documents are kept under a `document_id`, so clients can refer to
+them in later calls (simplify, summarize, ask, TTS) instead of posting the
+full text again. Documents live in the shared state store, so any worker
+can resolve any ID. A request can also select part of a document with a
+paragraph range or a UTF-8 byte range.
+
+Document text is interned by content hash: every document ID and chat
+session that holds the same text points at one zlib-compressed blob. In
+memory, recently used texts are kept decompressed in a small LRU (hot) and
+the rest only as compressed bytes (cold), so thirty students loading the
+same handout cost one compressed copy instead of thirty plain ones.
+
+Texts the server generates (simplifications, summaries) are stored the same
+way under their own namespace, so they can expire sooner than uploads (see
+STATE_TTL_HOURS).
+"""
+import base64
+import hashlib
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+
+from config import DOCUMENT_HOT_CACHE_MB, DOCUMENT_COLD_CACHE_MB
+from services import state_store
+
+DOCUMENTS_NAMESPACE = "documents"
+GENERATED_NAMESPACE = "generated_documents"
+BLOBS_NAMESPACE = "document_blobs"
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。！？।])\s+")
+
+_lock = threading.Lock()
+
+# content hash -> decompressed text, least recently used first
+_hot = OrderedDict()
+_hot_bytes = 0
+
+# content hash -> zlib-compressed UTF-8 text, least recently used first
+_cold = OrderedDict()
+_cold_bytes = 0
+
+# content hash -> size of the text as a Python string
+_sizes = {}
+
+# Age before an unreferenced blob may be pruned
+_BLOB_GRACE_S = 3600
+
+
+def split_paragraphs(text: str, max_chars: int = None) -> list:
+    """
+    Split text on blank lines, dropping empty paragraphs.
+
+    With `max_chars`, longer paragraphs are cut between sentences into
+    pieces of at most that length (a single longer sentence is kept whole).
+    """
+    paragraphs = [p.strip() for p in _PARAGRAPH_SPLIT.split(text) if p.strip()]
+    if not max_chars:
+        return paragraphs
+
+    pieces = []
+    for paragraph in paragraphs:
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_BREAK.split(paragraph):
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                pieces.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            pieces.append(current)
+    return pieces
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def _cache_cold(digest: str, blob: bytes):
+    global _cold_bytes
+    with _lock:
+        if digest not in _cold:
+            _cold[digest] = blob
+            _cold_bytes += len(blob)
+        _cold.move_to_end(digest)
+        limit = DOCUMENT_COLD_CACHE_MB * 1024 * 1024
+        while _cold_bytes > limit and len(_cold) > 1:
+            # Still in the state store; reloaded on the next access
+            _, dropped = _cold.popitem(last=False)
+            _cold_bytes -= len(dropped)
+
+
+def _cache_hot(digest: str, text: str):
+    global _hot_bytes
+    with _lock:
+        _sizes[digest] = sys.getsizeof(text)
+        if digest not in _hot:
+            _hot[digest] = text
+            _hot_bytes += _sizes[digest]
+        _hot.move_to_end(digest)
+        limit = DOCUMENT_HOT_CACHE_MB * 1024 * 1024
+        while _hot_bytes > limit and len(_hot) > 1:
+            # The compressed copy stays in the cold tier
+            dropped, _ = _hot.popitem(last=False)
+            _hot_bytes -= _sizes[dropped]
+
+
+def intern_text(text: str) -> str:
+    """
+    Store text once per distinct content and return its content hash.
+
+    The stored text is kept as long as some entry refers to it by
+    "content_hash" (see prune_blobs()).
+    """
+    digest = content_hash(text)
+    with _lock:
+        blob = _cold.get(digest)
+    if blob is None:
+        blob = zlib.compress(text.encode("utf-8"))
+        _cache_cold(digest, blob)
+    # Refreshing the write time keeps prune_blobs() from removing a blob in use
+    if not state_store.touch(BLOBS_NAMESPACE, digest):
+        state_store.put(BLOBS_NAMESPACE, digest, {
+            "zlib": base64.b64encode(blob).decode("ascii"),
+            "length": len(text)
+        }, cache=False)
+    _cache_hot(digest, text)
+    return digest
+
+
+def get_text(digest: str):
+    """Return the interned text for a content hash, or None"""
+    with _lock:
+        text = _hot.get(digest)
+        if text is not None:
+            _hot.move_to_end(digest)
+            return text
+        blob = _cold.get(digest)
+
+    if blob is None:
+        stored = state_store.get(BLOBS_NAMESPACE, digest, cache=False)
+        if stored is None:
+            return None
+        blob = base64.b64decode(stored["zlib"])
+    _cache_cold(digest, blob)
+    text = zlib.decompress(blob).decode("utf-8")
+    _cache_hot(digest, text)
+    return text
+
+
+def save_document(text: str, filename: str = None, generated: bool = False) -> str:
+    """Store a document (or, with `generated`, a generated text) and return its ID"""
+    document_id = uuid.uuid4().hex[:12]
+    namespace = GENERATED_NAMESPACE if generated else DOCUMENTS_NAMESPACE
+    state_store.put(namespace, document_id, {
+        "content_hash": intern_text(text),
+        "filename": filename,
+        "created_at": time.time()
+    })
+    return document_id
+
+
+def get_document_hash(document_id: str):
+    """Return the content hash of a stored document, or None"""
+    document = (
+        state_store.get(DOCUMENTS_NAMESPACE, document_id)
+        or state_store.get(GENERATED_NAMESPACE, document_id)
+    )
+    return document["content_hash"] if document else None
+
+
+def get_document(document_id: str):
+    """Return the stored text for `document_id`, or None"""
+    digest = get_document_hash(document_id)
+    return get_text(digest) if digest else None
+
+
+def delete_document(document_id: str):
+    """Delete a document; its text goes once nothing else refers to it (see prune_blobs())"""
+    state_store.delete(DOCUMENTS_NAMESPACE, document_id)
+    state_store.delete(GENERATED_NAMESPACE, document_id)
+
+
+def prune_blobs(holder_namespaces: list) -> int:
+    """
+    Remove stored texts that no entry in `holder_namespaces` refers to by
+    "content_hash". Returns the number removed.
+
+    Blobs interned in the last _BLOB_GRACE_S are kept, since their holder
+    may not be stored yet.
+    """
+    held = set()
+    for namespace in holder_namespaces:
+        held.update(value["content_hash"] for value in state_store.values(namespace))
+    removed = 0
+    for digest in state_store.keys(BLOBS_NAMESPACE, written_before=time.time() - _BLOB_GRACE_S):
+        if digest not in held:
+            state_store.delete(BLOBS_NAMESPACE, digest)
+            removed += 1
+    return removed
+
+
+def storage_stats(holder_namespaces: list) -> dict:
+    """
+    Memory used by document text in this process.
+
+    `documents` and `references` count the distinct stored texts and the
+    entries in `holder_namespaces` that refer to them, across all workers.
+    `resident_bytes` is what this process's hot and cold tiers hold;
+    `logical_bytes` is what those texts would cost if every holder kept its
+    own plain copy.
+    """
+    refs = Counter()
+    for namespace in holder_namespaces:
+        refs.update(value["content_hash"] for value in state_store.values(namespace))
+    with _lock:
+        logical = sum(
+            _sizes.get(digest, 0) * refs[digest]
+            for digest in set(_hot) | set(_cold)
+        )
+        resident = _hot_bytes + _cold_bytes
+        return {
+            "documents": len(refs),
+            "references": sum(refs.values()),
+            "hot_documents": len(_hot),
+            "cold_documents": len(_cold),
+            "hot_bytes": _hot_bytes,
+            "cold_bytes": _cold_bytes,
+            "resident_bytes": resident,
+            "logical_bytes": logical,
+            "savings_ratio": round(logical / resident, 2) if resident else None
+        }
+
+
+def select_range(text: str, paragraph_start: int = None, paragraph_end: int = None,
+                 byte_start: int = None, byte_end: int = None) -> str:
+    """
+    Select part of a document.
+
+    Paragraph ranges index split_paragraphs() like a Python slice. Byte
+    ranges index the UTF-8 encoding; characters cut by the range edges are
+    dropped rather than decoded as garbage.
+    """
+    if paragraph_start is not None or paragraph_end is not None:
+        text = "\n\n".join(split_paragraphs(text)[paragraph_start:paragraph_end])
+    if byte_start is not None or byte_end is not None:
+        text = text.encode("utf-8")[byte_start:byte_end].decode("utf-8", errors="ignore")
+    return text
+
+
+def resolve_text(text: str = None, document_id: str = None, paragraph_start: int = None,
+                 paragraph_end: int = None, byte_start: int = None, byte_end: int = None) -> tuple:
+    """
+    Resolve request input to text.
+
+    Returns:
+        (text, error) where exactly one is None
+    """
+    if document_id:
+        stored = get_document(document_id)
+        if stored is None:
+            return None, "Document not found. Please upload it again."
+        text = stored
+    elif text is None:
+        return None, "Please provide text or a document_id."
+
+    return select_range(text, paragraph_start, paragraph_end, byte_start, byte_end), None
@@ -0,0 +1,101 @@
+"""
+Shared Groq client, created on first use.
+
+Importing the groq SDK and building the client is deferred so the API
+process starts serving without paying for it. All completions go through
+chat_completion() or chat_completion_stream(), which wait for a slot in
+the Groq bulkhead (see services/admission.py). Calls that name their
+operation get their model from the tier router (services/model_router.py)
+and, for LLM_HEDGE_OPERATIONS, are hedged (services/hedging.py).
+"""
+import time
+
+from config import (
+    GROQ_API_KEY, GROQ_CONCURRENCY, ADMISSION_MAX_QUEUE,
+    LLM_HEDGE, LLM_HEDGE_OPERATIONS, LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_DELAY_MS, LLM_HEDGE_DEFAULT_DELAY_MS,
+)
+from services.admission import get_bulkhead
+from services.hedging import hedged
+from services.model_router import (
+    TIER_MODELS, choose_tier, record_success, record_failure, latency_percentile
+)
+
+_client = None
+_bulkhead = get_bulkhead("groq", GROQ_CONCURRENCY, ADMISSION_MAX_QUEUE)
+
+
+def get_client():
+    """Return the AsyncGroq client, or None when no API key is configured"""
+    global _client
+    if _client is None and GROQ_API_KEY:
+        from groq import AsyncGroq
+        _client = AsyncGroq(api_key=GROQ_API_KEY)
+    return _client
+
+
+def _route(operation: str, input_chars: int, kwargs: dict):
+    """Set kwargs["model"] for the operation's tier; returns the tier (None without an operation)"""
+    if operation is None:
+        return None
+    tier = choose_tier(operation, input_chars)
+    kwargs["model"] = TIER_MODELS[tier]
+    return tier
+
+
+def _hedge_delay_s(tier: str) -> float:
+    percentile_ms = latency_percentile(tier, LLM_HEDGE_PERCENTILE)
+    if percentile_ms is None:
+        return LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+    return max(percentile_ms, LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+
+async def chat_completion(operation: str = None, input_chars: int = 0, **kwargs):
+    """
+    client.chat.completions.create() behind the Groq bulkhead.
+
+    With an operation (and the size of the text it works on) the model is
+    chosen by the tier router and the call is recorded in its metrics.
+    """
+    tier = _route(operation, input_chars, kwargs)
+    if LLM_HEDGE and tier and operation in LLM_HEDGE_OPERATIONS:
+        # The duplicate is only sent when it does not have to queue
+        return await hedged(
+            lambda: _complete(tier, operation, kwargs),
+            _hedge_delay_s(tier),
+            _bulkhead.has_free_slot
+        )
+    return await _complete(tier, operation, kwargs)
+
+
+async def _complete(tier: str, operation: str, kwargs: dict):
+    async with _bulkhead.slot():
+        # Queueing time does not count against the model
+        start = time.perf_counter()
+        try:
+            response = await get_client().chat.completions.create(**kwargs)
+        except Exception as e:
+            if tier:
+                record_failure(tier, operation, str(e))
+            raise
+    if tier:
+        record_success(tier, operation, (time.perf_counter() - start) * 1000)
+    return response
+
+
+async def chat_completion_stream(operation: str = None, input_chars: int = 0, **kwargs):
+    """Yield the text of a streamed completion as it arrives, holding one Groq slot"""
+    tier = _route(operation, input_chars, kwargs)
+    async with _bulkhead.slot():
+        start = time.perf_counter()
+        try:
+            stream = await get_client().chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            if tier:
+                record_failure(tier, operation, str(e))
+            raise
+    if tier:
+        record_success(tier, operation, (time.perf_counter() - start) * 1000)
@@ -1,7 +1,5 @@
-from groq import AsyncGroq
-from config import GROQ_API_KEY
-
-client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+from services.groq_client import get_client, chat_completion
+from services.admission import Overloaded
 
 # Dyslexia type specific guidelines
 DYSLEXIA_GUIDELINES = {
@@ -273,6 +271,7 @@ SIMPLIFIED TEXT (PLAIN TEXT ONLY):"""
 
 async def simplify_text(text: str, language: str = "en", dyslexia_type: str = "general") -> str:
     """Simplify complex text for easier reading by people with dyslexia using type-specific prompts"""
+    client = get_client()
     if not client:
         return "Error: Groq API key not configured. Please set GROQ_API_KEY in .env file."
     
@@ -290,13 +289,16 @@ async def simplify_text(text: str, language: str = "en", dyslexia_type: str = "g
     prompt = _get_simplify_prompt(text, language, dyslexia_type, lang_name, dx_info)
 
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = await chat_completion(
+            operation="simplify",
+            input_chars=len(text),
             messages=[{"role": "user", "content": prompt}],
             temperature=0.05,  # Very low for strict rule following
             max_tokens=2048
         )
         return response.choices[0].message.content.strip()
+    except Overloaded:
+        raise
     except Exception as e:
         return f"Error simplifying text: {str(e)}"
 
@@ -483,6 +485,7 @@ SUMMARY (NUMBERED LIST, PLAIN TEXT ONLY):"""
 
 async def summarize_text(text: str, language: str = "en", dyslexia_type: str = "general") -> str:
     """Create a concise summary of the text using type-specific prompts"""
+    client = get_client()
     if not client:
         return "Error: Groq API key not configured. Please set GROQ_API_KEY in .env file."
     
@@ -500,13 +503,16 @@ async def summarize_text(text: str, language: str = "en", dyslexia_type: str = "
     prompt = _get_summarize_prompt(text, language, dyslexia_type, lang_name, dx_info)
 
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = await chat_completion(
+            operation="summarize",
+            input_chars=len(text),
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
             max_tokens=1024
         )
         return response.choices[0].message.content.strip()
+    except Overloaded:
+        raise
     except Exception as e:
         return f"Error summarizing text: {str(e)}"
 
@@ -0,0 +1,82 @@
+"""
+Hedged requests for LLM calls.
+
+A hedged call starts the request and, if it has not returned after a delay
+(a high percentile of recent latencies for the model, see
+services/model_router.py), sends a duplicate. Whichever answer arrives
+first is used and the other request is cancelled, so an occasional slow
+upstream response no longer sets the tail latency.
+
+Hedges are paid for from a budget: every call adds LLM_HEDGE_BUDGET
+tokens (up to a small cap) and a hedge spends one, so at most that share
+of calls is duplicated, even when the upstream is slow for everyone.
+"""
+import asyncio
+
+from config import LLM_HEDGE_BUDGET
+
+# Tokens that can be saved up for a burst of hedges
+_BUDGET_CAP = 10.0
+
+hedge_stats = {
+    "calls": 0,
+    "hedged": 0,
+    "hedge_won": 0,
+    "over_budget": 0,
+    "tokens": _BUDGET_CAP,
+}
+
+
+def _spend_token() -> bool:
+    if hedge_stats["tokens"] < 1.0:
+        hedge_stats["over_budget"] += 1
+        return False
+    hedge_stats["tokens"] -= 1.0
+    return True
+
+
+async def hedged(call, delay_s: float, can_hedge=None):
+    """
+    Await call(), sending a second call() if the first takes over `delay_s`.
+
+    Args:
+        call: Coroutine function making one request
+        delay_s: Time to wait for the first request before hedging
+        can_hedge: Optional check that the duplicate can start right away
+
+    Returns the first successful result; when both requests fail the
+    first error is raised.
+    """
+    hedge_stats["calls"] += 1
+    hedge_stats["tokens"] = min(_BUDGET_CAP, hedge_stats["tokens"] + LLM_HEDGE_BUDGET)
+
+    primary = asyncio.create_task(call())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_s)
+        if done or (can_hedge and not can_hedge()) or not _spend_token():
+            return await primary
+
+        hedge_stats["hedged"] += 1
+        tasks.append(asyncio.create_task(call()))
+        pending = set(tasks)
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is None:
+                    if task is not primary:
+                        hedge_stats["hedge_won"] += 1
+                    return task.result()
+                if first_error is None:
+                    first_error = task.exception()
+        raise first_error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def get_hedge_status() -> dict:
+    return {**hedge_stats, "tokens": round(hedge_stats["tokens"], 2)}
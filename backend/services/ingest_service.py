@@ -0,0 +1,157 @@
+"""
+Bulk document ingestion.
+
+Files from a bulk upload, and the members of any ZIP archive among them,
+are staged in UPLOAD_DIR and extracted in a pool of worker processes, so
+parsing a stack of PDFs uses every core instead of blocking the event
+loop. Results are yielded as each file finishes, not in upload order.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import UPLOAD_DIR, INGEST_WORKERS, BULK_UPLOAD_MAX_FILES, BULK_UPLOAD_MAX_MB
+from services.document_service import extract_text
+from services.document_store import save_document
+
+ALLOWED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned workers do not inherit the server's threads or sockets
+        _executor = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown():
+    """Stop the worker pool (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def stage_uploads(files: list) -> tuple:
+    """
+    Expand ZIP archives and copy supported files into UPLOAD_DIR.
+
+    Args:
+        files: (filename, binary file object) pairs
+
+    Returns:
+        (staged, rejected): staged items have "filename" and "path",
+        rejected items have "filename", "status" and "error"
+    """
+    staged, rejected = [], []
+    budget = BULK_UPLOAD_MAX_MB * 1024 * 1024
+
+    def reject(filename: str, error: str):
+        rejected.append({"filename": filename, "status": "rejected", "error": error, "success": False})
+
+    def stage(filename: str, source, size: int):
+        nonlocal budget
+        ext = os.path.splitext(filename.lower())[1]
+        if ext not in ALLOWED_EXTENSIONS:
+            reject(filename, f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+        elif len(staged) >= BULK_UPLOAD_MAX_FILES:
+            reject(filename, f"Too many files (limit {BULK_UPLOAD_MAX_FILES})")
+        elif size > budget:
+            reject(filename, f"Upload is over the {BULK_UPLOAD_MAX_MB} MB limit")
+        else:
+            path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex[:8]}{ext}")
+            try:
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(source, f)
+            except BaseException:
+                # e.g. a CRC or size mismatch partway through a ZIP member
+                os.remove(path)
+                raise
+            budget -= size
+            staged.append({"filename": filename, "path": path})
+
+    for filename, file in files:
+        filename = filename or "upload"
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+
+        if not filename.lower().endswith(".zip"):
+            stage(filename, file, size)
+            continue
+
+        try:
+            with zipfile.ZipFile(file) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                        continue
+                    # Members are read up to their declared size, so it bounds decompression
+                    try:
+                        with archive.open(info) as member:
+                            stage(f"{filename}/{name}", member, info.file_size)
+                    except NotImplementedError:
+                        reject(f"{filename}/{name}", "Unsupported ZIP compression method")
+                    except RuntimeError:
+                        # zipfile raises RuntimeError for encrypted members
+                        reject(f"{filename}/{name}", "Encrypted ZIP members are not supported")
+                    except (zipfile.BadZipFile, EOFError, zlib.error):
+                        reject(f"{filename}/{name}", "Damaged ZIP member")
+        except zipfile.BadZipFile:
+            reject(filename, "Not a valid ZIP archive")
+
+    return staged, rejected
+
+
+async def _extract_one(item: dict) -> dict:
+    global _executor
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        text = await loop.run_in_executor(executor, extract_text, item["path"])
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        if _executor is executor:
+            _executor = None
+        text = "Error extracting file: the extraction worker crashed"
+    except Exception as e:
+        text = f"Error extracting file: {str(e)}"
+    finally:
+        try:
+            os.remove(item["path"])
+        except OSError:
+            pass
+
+    result = {"filename": item["filename"]}
+    if not text or not text.strip():
+        return {**result, "status": "failed", "error": "No text found in file", "success": False}
+    if text.startswith("Error"):
+        return {**result, "status": "failed", "error": text, "success": False}
+
+    document_id = await asyncio.to_thread(save_document, text, item["filename"])
+    return {
+        **result,
+        "status": "done",
+        "document_id": document_id,
+        "characters": len(text),
+        "preview": text[:200],
+        "success": True
+    }
+
+
+async def ingest_files(staged: list):
+    """Extract staged files in parallel, yielding each result as it finishes"""
+    for next_done in asyncio.as_completed([_extract_one(item) for item in staged]):
+        yield await next_done
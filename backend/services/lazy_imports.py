@@ -0,0 +1,25 @@
+"""
+Deferred imports for heavy third-party modules.
+
+`lazy_import("numpy")` returns a module object whose real import runs on
+first attribute access, so service modules can keep a module-level
+`np = lazy_import("numpy")` without slowing down process start-up.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """Return `name` as a module that is only executed when first used"""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
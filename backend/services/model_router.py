@@ -0,0 +1,117 @@
+"""
+Model tiering for LLM calls.
+
+Each completion names its operation (simplify, summarize, chat_simplify,
+answer) and input size, and runs on one of two tiers: "small", a fast 8B
+model, or "large", the 70B model. LLM_TIER_POLICY sets the tier per
+operation; "auto" sends inputs up to LLM_SMALL_MAX_CHARS to the small
+model and the rest to the large one. While the large model misses its
+latency SLO (a moving average over LLM_LATENCY_SLO_MS), "auto" also moves
+inputs up to LLM_SLO_SMALL_MAX_CHARS to the small model.
+
+Every tier keeps request, error and latency counts, reported by /health.
+"""
+from collections import deque
+
+from config import (
+    LLM_MODEL_SMALL,
+    LLM_MODEL_LARGE,
+    LLM_TIER_POLICY,
+    LLM_SMALL_MAX_CHARS,
+    LLM_SLO_SMALL_MAX_CHARS,
+    LLM_LATENCY_SLO_MS,
+)
+
+SMALL = "small"
+LARGE = "large"
+TIER_MODELS = {SMALL: LLM_MODEL_SMALL, LARGE: LLM_MODEL_LARGE}
+
+# Weight of the newest sample in the latency moving average
+_EWMA_ALPHA = 0.3
+
+# Latencies kept per tier for the percentiles
+_SAMPLES = 200
+
+# Samples needed before latency_percentile() reports a value
+_MIN_SAMPLES = 20
+
+tier_health = {
+    tier: {
+        "requests": 0,
+        "errors": 0,
+        "ms_ewma": None,
+        "latencies": deque(maxlen=_SAMPLES),
+        "operations": {},
+        "last_error": None,
+    }
+    for tier in TIER_MODELS
+}
+
+
+def _over_slo(tier: str) -> bool:
+    latency = tier_health[tier]["ms_ewma"]
+    return latency is not None and latency > LLM_LATENCY_SLO_MS
+
+
+def choose_tier(operation: str, input_chars: int) -> str:
+    """The tier for an operation on an input of `input_chars` characters"""
+    policy = LLM_TIER_POLICY.get(operation, "auto")
+    if policy in TIER_MODELS:
+        return policy
+    if input_chars <= LLM_SMALL_MAX_CHARS:
+        return SMALL
+    if _over_slo(LARGE) and input_chars <= LLM_SLO_SMALL_MAX_CHARS:
+        return SMALL
+    return LARGE
+
+
+def record_success(tier: str, operation: str, elapsed_ms: float):
+    health = tier_health[tier]
+    previous = health["ms_ewma"]
+    health["ms_ewma"] = elapsed_ms if previous is None else (
+        _EWMA_ALPHA * elapsed_ms + (1 - _EWMA_ALPHA) * previous
+    )
+    health["latencies"].append(elapsed_ms)
+    health["requests"] += 1
+    health["operations"][operation] = health["operations"].get(operation, 0) + 1
+
+
+def record_failure(tier: str, operation: str, error: str):
+    health = tier_health[tier]
+    health["requests"] += 1
+    health["errors"] += 1
+    health["last_error"] = error
+    health["operations"][operation] = health["operations"].get(operation, 0) + 1
+
+
+def latency_percentile(tier: str, share: float):
+    """Recent latency percentile in ms for a tier, or None with too few samples"""
+    latencies = tier_health[tier]["latencies"]
+    if len(latencies) < _MIN_SAMPLES:
+        return None
+    return _percentile(sorted(latencies), share)
+
+
+def _percentile(samples: list, share: float):
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(share * len(samples)))])
+
+
+def get_model_status() -> dict:
+    """Latency and error summary for each tier"""
+    status = {}
+    for tier, health in tier_health.items():
+        latencies = sorted(health["latencies"])
+        status[tier] = {
+            "model": TIER_MODELS[tier],
+            "requests": health["requests"],
+            "errors": health["errors"],
+            "ms_ewma": round(health["ms_ewma"]) if health["ms_ewma"] is not None else None,
+            "p50_ms": _percentile(latencies, 0.5),
+            "p95_ms": _percentile(latencies, 0.95),
+            "over_slo": _over_slo(tier),
+            "operations": dict(health["operations"]),
+            "last_error": health["last_error"],
+        }
+    return status
@@ -0,0 +1,236 @@
+"""
+Paragraph-level simplification with reuse of earlier output.
+
+Long texts are simplified in chunks: paragraphs are packed into chunks of
+at most SIMPLIFY_CHUNK_CHARS, which go to the model concurrently (up to
+SIMPLIFY_CONCURRENCY per text) and come back in order, so a long document is
+neither cut off by the completion token limit nor simplified one slow call
+at a time.
+
+In incremental mode a text is simplified paragraph by paragraph. The
+paragraphs and outputs of the last version simplified under a version key
+(a chat session or document ID) are kept, and a new version is diffed
+against it: unchanged paragraphs take their previous output, so an edit to
+one sentence only sends its paragraph to the model.
+
+Every chunk or paragraph output is cached by (text, dyslexia type,
+language), which also covers paragraphs moved around or shared with
+another document. Paragraphs that already meet the readability limits for
+the reader (services/readability.py) are passed through unchanged without
+a model call.
+"""
+import asyncio
+import difflib
+import hashlib
+
+from config import SIMPLIFY_CONCURRENCY, SIMPLIFY_CHUNK_CHARS, SIMPLIFY_PREFILTER
+from services import state_store
+from services.document_store import split_paragraphs
+from services.groq_service import simplify_text
+from services.readability import is_simple_enough
+
+OUTPUTS_NAMESPACE = "simplified_paragraphs"
+VERSIONS_NAMESPACE = "simplify_versions"
+
+# Bump when the simplification prompts change, so old outputs are not reused
+PROMPT_VERSION = "1"
+
+# Where a part's output came from: "simplified" (model call), "reused"
+# (output cache) or "unchanged" (already readable)
+SOURCES = ("simplified", "reused", "unchanged")
+
+# Parts per source since startup (reported by /health)
+simplify_stats = {source: 0 for source in SOURCES}
+
+
+def paragraph_key(paragraph: str, language: str, dyslexia_type: str) -> str:
+    payload = f"{PROMPT_VERSION}|{dyslexia_type}|{language}|{paragraph}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:24]
+
+
+def match_paragraphs(previous_keys: list, keys: list) -> dict:
+    """Index in `previous_keys` of each paragraph in `keys` that is unchanged"""
+    matcher = difflib.SequenceMatcher(None, previous_keys, keys, autojunk=False)
+    matches = {}
+    for tag, previous_start, _, start, end in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(end - start):
+                matches[start + offset] = previous_start + offset
+    return matches
+
+
+def diff_paragraphs(previous_keys: list, keys: list) -> list:
+    """Indices in `keys` of paragraphs that are new or edited since `previous_keys`"""
+    unchanged = match_paragraphs(previous_keys, keys)
+    return [index for index in range(len(keys)) if index not in unchanged]
+
+
+def is_readable(paragraph: str, language: str, dyslexia_type: str) -> bool:
+    """Whether a paragraph can skip the model (see SIMPLIFY_PREFILTER)"""
+    return SIMPLIFY_PREFILTER and is_simple_enough(paragraph, dyslexia_type, language)
+
+
+def count_sources(sources: list) -> dict:
+    """Parts per output source, plus the model calls avoided"""
+    counts = {source: sources.count(source) for source in SOURCES}
+    counts["llm_calls_avoided"] = counts["reused"] + counts["unchanged"]
+    return counts
+
+
+def split_chunks(text: str, max_chars: int = SIMPLIFY_CHUNK_CHARS,
+                 language: str = "en", dyslexia_type: str = "general") -> list:
+    """
+    Pack consecutive paragraphs into chunks of at most `max_chars`.
+
+    Returns (part, readable) pairs. Paragraphs that are readable already
+    are parts of their own, so they are not sent to the model with the rest.
+    """
+    parts = []
+    current = []
+    size = 0
+
+    def close_chunk():
+        nonlocal current, size
+        if current:
+            parts.append(("\n\n".join(current), False))
+            current, size = [], 0
+
+    for paragraph in split_paragraphs(text, max_chars):
+        if is_readable(paragraph, language, dyslexia_type):
+            close_chunk()
+            parts.append((paragraph, True))
+            continue
+        if current and size + 2 + len(paragraph) > max_chars:
+            close_chunk()
+        current.append(paragraph)
+        size += len(paragraph) + (2 if size else 0)
+    close_chunk()
+    return parts
+
+
+async def simplify_cached(part: str, language: str, dyslexia_type: str,
+                          readable: bool = False, semaphore: asyncio.Semaphore = None) -> tuple:
+    """
+    Simplify one chunk or paragraph, using the output cache.
+
+    A readable part is returned as it is. Returns (output, source); failed
+    outputs start with "Error" and are not cached. `semaphore` limits the
+    model calls of one text (SIMPLIFY_CONCURRENCY); ordering between
+    requests is left to the admission bulkhead, which serves interactive
+    requests before bulk ones.
+    """
+    if readable:
+        output, source = part, "unchanged"
+    else:
+        key = paragraph_key(part, language, dyslexia_type)
+        output = await asyncio.to_thread(state_store.get, OUTPUTS_NAMESPACE, key)
+        source = "reused"
+        if output is None:
+            if semaphore is None:
+                output = await simplify_text(part, language, dyslexia_type)
+            else:
+                async with semaphore:
+                    output = await simplify_text(part, language, dyslexia_type)
+            source = "simplified"
+            if not output.startswith("Error"):
+                await asyncio.to_thread(state_store.put, OUTPUTS_NAMESPACE, key, output)
+    simplify_stats[source] += 1
+    return output, source
+
+
+async def iter_simplified(parts: list, language: str = "en", dyslexia_type: str = "general"):
+    """
+    Simplify (part, readable) pairs concurrently, yielding
+    (index, output, source) in order.
+
+    Each part is yielded as soon as it and every part before it are done.
+    Work still running is cancelled if the caller stops early.
+    """
+    semaphore = asyncio.Semaphore(SIMPLIFY_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(simplify_cached(part, language, dyslexia_type, readable, semaphore))
+        for part, readable in parts
+    ]
+    try:
+        for index, task in enumerate(tasks):
+            output, source = await task
+            yield index, output, source
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def simplify_chunked(text: str, language: str = "en", dyslexia_type: str = "general") -> tuple:
+    """
+    Simplify a text of any length.
+
+    Texts up to SIMPLIFY_CHUNK_CHARS are one chunk. Returns (text, stats):
+    the joined output, or the first error (a string starting with "Error"),
+    and count_sources() for the parts.
+    """
+    outputs = []
+    sources = []
+    parts = split_chunks(text, language=language, dyslexia_type=dyslexia_type)
+    async for _, output, source in iter_simplified(parts, language, dyslexia_type):
+        sources.append(source)
+        if output.startswith("Error"):
+            return output, count_sources(sources)
+        outputs.append(output)
+    return "\n\n".join(outputs), count_sources(sources)
+
+
+async def simplify_incremental(text: str, language: str = "en", dyslexia_type: str = "general",
+                               version_key: str = None) -> tuple:
+    """
+    Simplify a text, re-using the output for paragraphs seen before.
+
+    Returns:
+        (simplified_text, stats): on failure the text starts with "Error",
+        like simplify_text(). stats has "paragraphs", "changed_paragraphs"
+        (indices that differ from the previous version under version_key;
+        only these are simplified, the rest reuse its output) and
+        count_sources() for the paragraphs.
+    """
+    paragraphs = split_paragraphs(text, SIMPLIFY_CHUNK_CHARS)
+    keys = [paragraph_key(p, language, dyslexia_type) for p in paragraphs]
+
+    previous = None
+    if version_key:
+        previous = await asyncio.to_thread(state_store.get, VERSIONS_NAMESPACE, version_key)
+    unchanged = {}
+    if previous and "outputs" in previous:
+        unchanged = match_paragraphs(previous["keys"], keys)
+    changed = [index for index in range(len(keys)) if index not in unchanged]
+
+    outputs = [None] * len(paragraphs)
+    sources = [None] * len(paragraphs)
+    for index, previous_index in unchanged.items():
+        outputs[index] = previous["outputs"][previous_index]
+        sources[index] = "reused"
+    simplify_stats["reused"] += len(unchanged)
+
+    semaphore = asyncio.Semaphore(SIMPLIFY_CONCURRENCY)
+    results = await asyncio.gather(*(
+        simplify_cached(paragraphs[index], language, dyslexia_type,
+                        is_readable(paragraphs[index], language, dyslexia_type), semaphore)
+        for index in changed
+    ))
+    for index, (output, source) in zip(changed, results):
+        outputs[index] = output
+        sources[index] = source
+    stats = {
+        "paragraphs": len(paragraphs),
+        "changed_paragraphs": changed,
+        **count_sources(sources)
+    }
+
+    errors = [output for output in outputs if output.startswith("Error")]
+    if errors:
+        # Paragraphs that did succeed are cached for the retry
+        return errors[0], stats
+
+    if version_key:
+        await asyncio.to_thread(
+            state_store.put, VERSIONS_NAMESPACE, version_key, {"keys": keys, "outputs": outputs}
+        )
+    return "\n\n".join(outputs), stats
@@ -0,0 +1,65 @@
+"""
+Background speech pre-synthesis for freshly loaded documents.
+
+After a document is uploaded or simplified, the user usually presses
+"Read Aloud" next. When pre-warming is enabled we synthesize the opening
+of the document into the audio cache while the user is still reading:
+
+- short documents (up to PREWARM_PARAGRAPHS paragraphs) are synthesized
+  whole, so "Read Aloud" on the same text is a cache hit
+- longer documents get their first PREWARM_PARAGRAPHS playlist segments
+  synthesized one by one, ready for segmented playback (see
+  services/speech_playlist.py)
+
+Pre-warming runs as bulk traffic, so it is shed first when the TTS
+services are busy.
+"""
+import asyncio
+
+from config import PREWARM_PARAGRAPHS, PREWARM_CONCURRENCY, PREWARM_MAX_CHARS
+from services.speech_service import text_to_speech, is_speech_cached
+from services.document_store import split_paragraphs
+from services.speech_playlist import split_segments
+from services.admission import BULK, Overloaded, set_request_class
+
+# Limits background synthesis so it does not crowd out interactive requests
+_semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+prewarm_stats = {"queued": 0, "synthesized": 0, "skipped": 0, "shed": 0, "failed": 0}
+
+
+def plan_prewarm(text: str, paragraphs: int = PREWARM_PARAGRAPHS) -> list:
+    """Texts to synthesize ahead of time for a document"""
+    parts = split_paragraphs(text)
+    if not parts:
+        return []
+    if len(parts) <= paragraphs and len(text) <= PREWARM_MAX_CHARS:
+        return [text]
+    return split_segments(text)[:paragraphs]
+
+
+async def _prewarm_one(text: str, language: str, speed: float):
+    if is_speech_cached(text, language, speed):
+        prewarm_stats["skipped"] += 1
+        return
+    try:
+        async with _semaphore:
+            result = await text_to_speech(text, language, speed)
+    except Overloaded:
+        prewarm_stats["shed"] += 1
+        return
+    if result.get("success"):
+        prewarm_stats["synthesized"] += 1
+    else:
+        prewarm_stats["failed"] += 1
+
+
+async def prewarm_speech(text: str, language: str = "en", speed: float = 1.0):
+    """Synthesize the opening of a document into the audio cache"""
+    targets = plan_prewarm(text)
+    if not targets:
+        return
+    set_request_class(BULK)
+    prewarm_stats["queued"] += len(targets)
+    print(f"  - Pre-warming {len(targets)} TTS segment(s) ({language}, {speed}x)")
+    await asyncio.gather(*(_prewarm_one(t, language, speed) for t in targets))
@@ -0,0 +1,162 @@
+"""
+Local readability checks for text that may not need simplifying.
+
+Before a paragraph is sent to the model, it is measured against the
+limits of the reader's dyslexia type (taken from DYSLEXIA_GUIDELINES and
+the simplification prompts): words per sentence, word length, syllables
+per word and, for some types, sentences per paragraph. Paragraphs that
+already meet every limit are passed through unchanged.
+
+The text is handled as one array of code points: word and sentence
+boundaries, letter counts and vowel groups (syllables) are all computed
+with NumPy, so checking a paragraph costs microseconds rather than an LLM
+round trip. The syllable count is an English heuristic, so the check only
+runs for SIMPLIFY_PREFILTER_LANGUAGES and for text in Latin script.
+"""
+from config import SIMPLIFY_PREFILTER_LANGUAGES
+from services.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+# Limits per dyslexia type; None means not checked
+#   max_sentence_words: longest sentence allowed
+#   max_word_letters: longest word allowed
+#   max_mean_syllables: average syllables per word
+#   max_polysyllable_share: share of words with 3+ syllables
+#   max_sentences: sentences per paragraph
+READABILITY_LIMITS = {
+    "phonological": {
+        "max_sentence_words": 15, "max_word_letters": None, "max_mean_syllables": 1.4,
+        "max_polysyllable_share": 0.08, "max_sentences": None
+    },
+    "surface": {
+        "max_sentence_words": 15, "max_word_letters": 10, "max_mean_syllables": 1.5,
+        "max_polysyllable_share": 0.10, "max_sentences": None
+    },
+    "visual": {
+        "max_sentence_words": 10, "max_word_letters": 9, "max_mean_syllables": 1.5,
+        "max_polysyllable_share": 0.10, "max_sentences": 3
+    },
+    "auditory": {
+        "max_sentence_words": 11, "max_word_letters": None, "max_mean_syllables": 1.5,
+        "max_polysyllable_share": 0.10, "max_sentences": None
+    },
+    "mixed": {
+        "max_sentence_words": 8, "max_word_letters": 9, "max_mean_syllables": 1.3,
+        "max_polysyllable_share": 0.05, "max_sentences": 3
+    },
+    "general": {
+        "max_sentence_words": 15, "max_word_letters": None, "max_mean_syllables": 1.5,
+        "max_polysyllable_share": 0.12, "max_sentences": None
+    }
+}
+
+# Characters the simplification output rules forbid (markup, brackets)
+_FORBIDDEN = frozenset("*#•()[]{}")
+
+# Share of non-ASCII characters above which the text is not treated as Latin script
+_MAX_NON_ASCII_SHARE = 0.05
+
+_VOWELS = [ord(c) for c in "aeiouy"]
+# Sentence ends when followed by whitespace or the end of the text, so
+# "2.0.1" and the dots inside "e.g." do not split a sentence
+_TERMINATORS = [ord(c) for c in ".!?"]
+_APOSTROPHES = [ord("'"), ord("’")]
+
+
+def analyze(text: str):
+    """
+    Measure a text.
+
+    Returns a dict of metrics (words, sentences, max_sentence_words,
+    mean_sentence_words, max_word_letters, mean_syllables,
+    polysyllable_share), or None when the text is empty or not in Latin
+    script.
+    """
+    codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype="<u4")
+    visible = codes > 32
+    if not visible.any():
+        return None
+    if (codes > 127).sum() > _MAX_NON_ASCII_SHARE * visible.sum():
+        return None
+
+    letters = (codes >= ord("a")) & (codes <= ord("z"))
+    digits = (codes >= ord("0")) & (codes <= ord("9"))
+    word_chars = letters | digits | np.isin(codes, _APOSTROPHES)
+
+    # Word spans [start, end)
+    padded = np.concatenate(([False], word_chars, [False]))
+    edges = np.diff(padded.astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return None
+
+    def span_sums(mask):
+        cumulative = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+        return cumulative[ends] - cumulative[starts]
+
+    word_letters = span_sums(letters | digits)
+
+    # Syllables: vowel groups, minus a silent final "e" ("make", not "table")
+    vowels = np.isin(codes, _VOWELS)
+    group_starts = vowels & ~np.concatenate(([False], vowels[:-1]))
+    syllables = span_sums(group_starts)
+    last = codes[ends - 1]
+    before_last = codes[np.maximum(ends - 2, 0)]
+    silent_e = (last == ord("e")) & (before_last != ord("l")) & (syllables > 1)
+    syllables = np.maximum(syllables - silent_e, 1)
+
+    # Words per sentence: count the sentence ends before each word
+    before_space = np.concatenate((codes[1:] <= 32, [True]))
+    sentence_ends = (np.isin(codes, _TERMINATORS) & before_space) | (codes == ord("\n"))
+    end_positions = np.flatnonzero(sentence_ends)
+    sentence_of_word = np.searchsorted(end_positions, starts)
+    sentence_words = np.bincount(sentence_of_word)
+    sentence_words = sentence_words[sentence_words > 0]
+
+    return {
+        "words": int(len(starts)),
+        "sentences": int(len(sentence_words)),
+        "max_sentence_words": int(sentence_words.max()),
+        "mean_sentence_words": float(sentence_words.mean()),
+        "max_word_letters": int(word_letters.max()),
+        "mean_syllables": float(syllables.mean()),
+        "polysyllable_share": float((syllables >= 3).mean())
+    }
+
+
+def check_readability(text: str, dyslexia_type: str = "general", language: str = "en") -> tuple:
+    """
+    Check a text against the limits for a dyslexia type.
+
+    Returns (ok, problems, metrics): ok is True only when the text can be
+    used as it is; problems lists the limits it breaks (or why it was not
+    checked).
+    """
+    if language not in SIMPLIFY_PREFILTER_LANGUAGES:
+        return False, ["language not checked"], None
+    if any(c in _FORBIDDEN for c in text):
+        return False, ["contains markup or brackets"], None
+    metrics = analyze(text)
+    if metrics is None:
+        return False, ["not Latin-script text"], None
+
+    limits = READABILITY_LIMITS.get(dyslexia_type, READABILITY_LIMITS["general"])
+    problems = []
+    if metrics["max_sentence_words"] > limits["max_sentence_words"]:
+        problems.append(f"sentence of {metrics['max_sentence_words']} words")
+    if limits["max_word_letters"] and metrics["max_word_letters"] > limits["max_word_letters"]:
+        problems.append(f"word of {metrics['max_word_letters']} letters")
+    if metrics["mean_syllables"] > limits["max_mean_syllables"]:
+        problems.append(f"{metrics['mean_syllables']:.2f} syllables per word")
+    if metrics["polysyllable_share"] > limits["max_polysyllable_share"]:
+        problems.append(f"{metrics['polysyllable_share']:.0%} long words")
+    if limits["max_sentences"] and metrics["sentences"] > limits["max_sentences"]:
+        problems.append(f"{metrics['sentences']} sentences")
+    return not problems, problems, metrics
+
+
+def is_simple_enough(text: str, dyslexia_type: str = "general", language: str = "en") -> bool:
+    """Whether a text already meets the limits and can skip simplification"""
+    return check_readability(text, dyslexia_type, language)[0]
@@ -0,0 +1,60 @@
+"""
+Sentence splitting for speech.
+
+Streamed answers are spoken sentence by sentence (services/speech_stream.py)
+and longer texts are synthesized from per-sentence audio clips
+(services/speech_service.py). Both split text the same way, so a sentence
+heard in one place is a cache hit in the other.
+"""
+import re
+
+from config import SPEECH_STREAM_MIN_SENTENCE_CHARS
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed
+# by whitespace, or a blank line
+_SENTENCE_END = re.compile(r"[.!?。！？।]+[\"'”’)\]]*\s+|\n\s*\n")
+
+
+class SentenceSplitter:
+    """Cut streamed text into sentences, tracking each one's offset in the full text"""
+
+    def __init__(self, min_chars: int = SPEECH_STREAM_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+        self.offset = 0  # position of the buffer start in the full text
+
+    def _take(self, end: int) -> tuple:
+        piece = self.buffer[:end]
+        leading = len(piece) - len(piece.lstrip())
+        sentence = (piece.strip(), self.offset + leading)
+        self.buffer = self.buffer[end:]
+        self.offset += end
+        return sentence
+
+    def feed(self, delta: str) -> list:
+        """Add generated text; return the (sentence, offset) pairs it completes"""
+        self.buffer += delta
+        sentences = []
+        while True:
+            end = None
+            for match in _SENTENCE_END.finditer(self.buffer):
+                # Very short pieces ("Dr.", "1.") are joined with what follows
+                if len(self.buffer[:match.end()].strip()) >= self.min_chars:
+                    end = match.end()
+                    break
+            if end is None:
+                return sentences
+            sentence = self._take(end)
+            if sentence[0]:
+                sentences.append(sentence)
+
+    def flush(self) -> list:
+        """Return whatever text is left at the end of the stream"""
+        sentence = self._take(len(self.buffer))
+        return [sentence] if sentence[0] else []
+
+
+def split_sentences(text: str, min_chars: int = SPEECH_STREAM_MIN_SENTENCE_CHARS) -> list:
+    """Split a whole text into (sentence, offset) pairs"""
+    splitter = SentenceSplitter(min_chars)
+    return splitter.feed(text) + splitter.flush()
@@ -0,0 +1,234 @@
+"""
+Segmented speech for long documents.
+
+Instead of one audio file for a whole document, a playlist cuts the text
+into paragraph-aligned segments, each synthesized into its own cache entry
+with its own timing sidecar. Segments are synthesized when the player
+first asks for them (plus SPEECH_PLAYLIST_LOOKAHEAD ahead), so the player
+only fetches what is near the playhead, seeking or resuming needs just the
+segment at that position, and a failed segment is retried on its own.
+Segments are keyed by their text like any other speech, so a paragraph
+shared by two documents, or pre-warmed after upload, is synthesized once.
+
+Playlists are served as JSON and as an HLS .m3u8 EVENT playlist that
+lists segments as they are synthesized.
+Segment audio is at normal speed; the JSON playlist's playback_rate is the
+rate to play it at (see speech_service.text_to_speech).
+"""
+import asyncio
+import hashlib
+import math
+import os
+
+from config import AUDIO_DIR, SPEECH_SEGMENT_MAX_CHARS, SPEECH_PLAYLIST_LOOKAHEAD
+from services import state_store
+from services.admission import BULK, Overloaded, set_request_class
+from services.alignment_service import ESTIMATED_MS_PER_CHAR, get_audio_duration_ms
+from services.audio_cache import cache_key
+from services.document_store import split_paragraphs
+from services.speech_service import (
+    LANGUAGE_MAP, CANONICAL_SPEED, text_to_speech, is_speech_cached, find_audio_file
+)
+
+PLAYLISTS_NAMESPACE = "speech_playlists"
+
+# Lookahead syntheses in flight (kept so they are not garbage collected)
+_lookahead = set()
+
+
+def split_segments(text: str, max_chars: int = SPEECH_SEGMENT_MAX_CHARS) -> list:
+    """
+    Split text into speech segments: one per paragraph, with paragraphs
+    over `max_chars` cut between sentences.
+    """
+    return split_paragraphs(text, max_chars)
+
+
+def create_playlist(text: str, language: str = "en") -> str:
+    """Split a text into segments and store the playlist; returns its ID"""
+    voice = LANGUAGE_MAP.get(language, LANGUAGE_MAP["en"])["voice"]
+    segments = []
+    cursor = 0
+    for segment in split_segments(text):
+        # Only whitespace separates a segment from the previous one
+        offset = text.find(segment.split(None, 1)[0], cursor)
+        offset = cursor if offset < 0 else offset
+        cursor = offset + len(segment)
+        segments.append({
+            "audio_id": cache_key(segment, voice, CANONICAL_SPEED),
+            "text": segment,
+            "char_offset": offset,
+            "duration_ms": None
+        })
+
+    playlist_id = hashlib.sha256(
+        f"{voice}|{','.join(s['audio_id'] for s in segments)}".encode("utf-8")
+    ).hexdigest()[:16]
+    if not state_store.exists(PLAYLISTS_NAMESPACE, playlist_id):
+        state_store.put(PLAYLISTS_NAMESPACE, playlist_id, {"language": language, "segments": segments})
+    return playlist_id
+
+
+def _refresh_durations(playlist_id: str, playlist: dict) -> dict:
+    """Replace estimated durations with real ones for segments now synthesized"""
+    changed = False
+    for segment in playlist["segments"]:
+        if segment["duration_ms"] is not None:
+            continue
+        audio_filename = find_audio_file(segment["audio_id"])
+        if audio_filename:
+            duration_ms = get_audio_duration_ms(os.path.join(AUDIO_DIR, audio_filename))
+            if duration_ms:
+                segment["duration_ms"] = round(duration_ms)
+                changed = True
+    if changed:
+        state_store.put(PLAYLISTS_NAMESPACE, playlist_id, playlist)
+    return playlist
+
+
+def get_playlist(playlist_id: str, speed: float = 1.0) -> dict:
+    """
+    The playlist as JSON.
+
+    Segments not synthesized yet have an estimated duration
+    ("estimated": true), replaced by the real one once they are.
+    """
+    playlist = state_store.get(PLAYLISTS_NAMESPACE, playlist_id)
+    if playlist is None:
+        return {
+            "error": "Playlist not found",
+            "success": False
+        }
+
+    playlist = _refresh_durations(playlist_id, playlist)
+    language = playlist["language"]
+    base_url = f"/api/speech/playlist/{playlist_id}"
+    segments = []
+    start_ms = 0
+    for index, segment in enumerate(playlist["segments"]):
+        estimated = segment["duration_ms"] is None
+        duration_ms = round(len(segment["text"]) * ESTIMATED_MS_PER_CHAR) if estimated else segment["duration_ms"]
+        segments.append({
+            "index": index,
+            "audio_id": segment["audio_id"],
+            "char_offset": segment["char_offset"],
+            "chars": len(segment["text"]),
+            "start_ms": start_ms,
+            "duration_ms": duration_ms,
+            "estimated": estimated,
+            "cached": not estimated or is_speech_cached(segment["text"], language),
+            "audio_url": f"{base_url}/segments/{index}",
+            "timings_url": f"{base_url}/segments/{index}/timings"
+        })
+        start_ms += duration_ms
+
+    return {
+        "playlist_id": playlist_id,
+        "language": language,
+        "playback_rate": speed,
+        "total_duration_ms": start_ms,
+        "total_segments": len(segments),
+        "segments": segments,
+        "m3u8_url": f"{base_url}/index.m3u8",
+        "success": True
+    }
+
+
+def _synthesized_prefix(manifest: dict) -> list:
+    """The leading segments of a JSON playlist whose real duration is known"""
+    listed = []
+    for segment in manifest["segments"]:
+        if segment["estimated"]:
+            break
+        listed.append(segment)
+    return listed
+
+
+def render_m3u8(manifest: dict) -> str:
+    """
+    HLS EVENT playlist for a JSON playlist (segment URIs are relative).
+
+    Only segments already synthesized are listed, with their measured
+    durations; the player reloads the playlist to pick up the rest, and
+    #EXT-X-ENDLIST is added once every segment is listed. The target
+    duration also covers the estimates of segments still to come, so it
+    does not grow between reloads unless an estimate falls short.
+    """
+    segments = manifest["segments"]
+    listed = _synthesized_prefix(manifest)
+    longest_s = max((s["duration_ms"] for s in segments), default=0) / 1000
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+        f"#EXT-X-TARGETDURATION:{max(1, math.ceil(longest_s))}",
+        "#EXT-X-MEDIA-SEQUENCE:0"
+    ]
+    for segment in listed:
+        lines.append(f"#EXTINF:{segment['duration_ms'] / 1000:.3f},")
+        lines.append(f"segments/{segment['index']}")
+    if len(listed) == len(segments):
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+async def _synthesize_ahead(text: str, language: str):
+    set_request_class(BULK)
+    try:
+        await text_to_speech(text, language)
+    except Overloaded:
+        pass
+
+
+def _queue_ahead(segments: list, language: str):
+    """Start synthesizing segments that are not cached, in the background"""
+    for segment in segments:
+        if not is_speech_cached(segment["text"], language):
+            task = asyncio.create_task(_synthesize_ahead(segment["text"], language))
+            _lookahead.add(task)
+            task.add_done_callback(_lookahead.discard)
+
+
+async def synthesize_unlisted(playlist_id: str, manifest: dict):
+    """
+    Start synthesizing the first segments render_m3u8 cannot list yet
+    (plus SPEECH_PLAYLIST_LOOKAHEAD), so the next reload can list them.
+    """
+    listed = len(_synthesized_prefix(manifest))
+    if listed == len(manifest["segments"]):
+        return
+    playlist = await asyncio.to_thread(state_store.get, PLAYLISTS_NAMESPACE, playlist_id)
+    if playlist is not None:
+        _queue_ahead(playlist["segments"][listed:listed + 1 + SPEECH_PLAYLIST_LOOKAHEAD], playlist["language"])
+
+
+async def get_segment(playlist_id: str, index: int, speed: float = 1.0,
+                      timing_format: str = "objects") -> dict:
+    """
+    Synthesize (or load from the cache) one segment.
+
+    Returns the text_to_speech result for the segment, with its index and
+    char_offset in the document, and starts synthesizing the next
+    SPEECH_PLAYLIST_LOOKAHEAD segments in the background.
+    """
+    playlist = await asyncio.to_thread(state_store.get, PLAYLISTS_NAMESPACE, playlist_id)
+    if playlist is None:
+        return {
+            "error": "Playlist not found",
+            "success": False
+        }
+    segments = playlist["segments"]
+    if not 0 <= index < len(segments):
+        return {
+            "error": f"Segment index out of range (0-{len(segments) - 1})",
+            "success": False
+        }
+
+    language = playlist["language"]
+    _queue_ahead(segments[index + 1:index + 1 + SPEECH_PLAYLIST_LOOKAHEAD], language)
+
+    segment = segments[index]
+    result = await text_to_speech(segment["text"], language, speed, timing_format, speed_mode="client")
+    if result.get("success"):
+        result.update({"index": index, "char_offset": segment["char_offset"]})
+    return result
@@ -1,45 +1,341 @@
-import edge_tts
-import uuid
 import os
 import asyncio
-from config import AUDIO_DIR
+import glob
+import json
+import shutil
+import subprocess
+from config import (
+    AUDIO_DIR, FFMPEG_BINARY, TTS_SPEED_MODE, TTS_CONCURRENCY, SPEECH_CLIP_CACHE, TTS_PROVIDERS
+)
+from services.alignment_service import align_audio
+from services.audio_concat import concat_audio
+from services.sentences import split_sentences
+from services.timing_format import to_binary, from_compact, format_word_timings
+from services.tts_providers import synthesize_with_failover, get_provider_status, preferred_provider
+from services.audio_cache import cache_key, get_or_create, is_inflight, touch, evict
+from services.admission import Overloaded
 
-# Language mappings for Edge TTS
+# Language mappings (voice is the Edge TTS voice, code the gTTS language and
+# espeak the espeak-ng voice)
 LANGUAGE_MAP = {
-    "en": {"code": "en", "description": "English (US)", "voice": "en-US-AriaNeural"},
-    "en-GB": {"code": "en", "description": "English (British)", "voice": "en-GB-SoniaNeural"},
-    "es": {"code": "es", "description": "Spanish (Spain)", "voice": "es-ES-ElviraNeural"},
-    "es-MX": {"code": "es", "description": "Spanish (Mexico)", "voice": "es-MX-DaliaNeural"},
-    "fr": {"code": "fr", "description": "French", "voice": "fr-FR-DeniseNeural"},
-    "de": {"code": "de", "description": "German", "voice": "de-DE-KatjaNeural"},
-    "it": {"code": "it", "description": "Italian", "voice": "it-IT-ElsaNeural"},
-    "pt": {"code": "pt", "description": "Portuguese (Brazil)", "voice": "pt-BR-FranciscaNeural"},
-    "pt-PT": {"code": "pt-PT", "description": "Portuguese (Portugal)", "voice": "pt-PT-RaquelNeural"},
-    "hi": {"code": "hi", "description": "Hindi", "voice": "hi-IN-SwaraNeural"},
-    "ar": {"code": "ar", "description": "Arabic", "voice": "ar-SA-ZariyahNeural"},
-    "zh": {"code": "zh-CN", "description": "Chinese (Simplified)", "voice": "zh-CN-XiaoxiaoNeural"},
-    "zh-TW": {"code": "zh-TW", "description": "Chinese (Traditional)", "voice": "zh-TW-HsiaoChenNeural"},
-    "ja": {"code": "ja", "description": "Japanese", "voice": "ja-JP-NanamiNeural"},
-    "ko": {"code": "ko", "description": "Korean", "voice": "ko-KR-SunHiNeural"},
-    "ru": {"code": "ru", "description": "Russian", "voice": "ru-RU-SvetlanaNeural"}
+    "en": {"code": "en", "description": "English (US)", "voice": "en-US-AriaNeural", "espeak": "en-us"},
+    "en-GB": {"code": "en", "description": "English (British)", "voice": "en-GB-SoniaNeural", "espeak": "en-gb"},
+    "es": {"code": "es", "description": "Spanish (Spain)", "voice": "es-ES-ElviraNeural", "espeak": "es"},
+    "es-MX": {"code": "es", "description": "Spanish (Mexico)", "voice": "es-MX-DaliaNeural", "espeak": "es-419"},
+    "fr": {"code": "fr", "description": "French", "voice": "fr-FR-DeniseNeural", "espeak": "fr"},
+    "de": {"code": "de", "description": "German", "voice": "de-DE-KatjaNeural", "espeak": "de"},
+    "it": {"code": "it", "description": "Italian", "voice": "it-IT-ElsaNeural", "espeak": "it"},
+    "pt": {"code": "pt", "description": "Portuguese (Brazil)", "voice": "pt-BR-FranciscaNeural", "espeak": "pt-br"},
+    "pt-PT": {"code": "pt-PT", "description": "Portuguese (Portugal)", "voice": "pt-PT-RaquelNeural", "espeak": "pt"},
+    "hi": {"code": "hi", "description": "Hindi", "voice": "hi-IN-SwaraNeural", "espeak": "hi"},
+    "ar": {"code": "ar", "description": "Arabic", "voice": "ar-SA-ZariyahNeural", "espeak": "ar"},
+    "zh": {"code": "zh-CN", "description": "Chinese (Simplified)", "voice": "zh-CN-XiaoxiaoNeural", "espeak": "cmn"},
+    "zh-TW": {"code": "zh-TW", "description": "Chinese (Traditional)", "voice": "zh-TW-HsiaoChenNeural", "espeak": "cmn"},
+    "ja": {"code": "ja", "description": "Japanese", "voice": "ja-JP-NanamiNeural", "espeak": "ja"},
+    "ko": {"code": "ko", "description": "Korean", "voice": "ko-KR-SunHiNeural", "espeak": "ko"},
+    "ru": {"code": "ru", "description": "Russian", "voice": "ru-RU-SvetlanaNeural", "espeak": "ru"}
 }
 
-async def text_to_speech(text: str, language: str = "en", speed: float = 1.0) -> dict:
+AUDIO_EXTENSIONS = ("mp3", "wav")
+
+# Audio is synthesized at this rate; other speeds are derived from it
+CANONICAL_SPEED = 1.0
+SPEED_RANGE = (0.5, 2.0)  # also the range of a single ffmpeg atempo filter
+SPEED_MODES = ("client", "server")
+
+# Sentence clips synthesized at once while assembling a text
+_clip_semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+def _sidecar_path(audio_id: str) -> str:
+    return os.path.join(AUDIO_DIR, f"{os.path.basename(audio_id)}.json")
+
+def find_audio_file(audio_id: str):
+    """Return the filename of the audio for `audio_id`, whatever its format"""
+    audio_id = os.path.basename(audio_id)
+    for ext in AUDIO_EXTENSIONS:
+        filename = f"{audio_id}.{ext}"
+        if os.path.exists(os.path.join(AUDIO_DIR, filename)):
+            return filename
+    return None
+
+def save_timing_sidecar(audio_id: str, text: str, word_timings: list, language: str = "en",
+                        audio_filename: str = None, provider: str = None, boundaries: bool = False):
+    """
+    Store word timings next to the audio file in the packed binary format.
+
+    `boundaries` records that the timings came from the provider's
+    WordBoundary events rather than from aligning words to the audio.
+    """
+    sidecar = {
+        "audio_id": audio_id,
+        "audio_file": audio_filename or f"{audio_id}.mp3",
+        "provider": provider,
+        "language": language,
+        "boundaries": boundaries,
+        "text": text,
+        "word_timings": to_binary(word_timings, text)
+    }
+    with open(_sidecar_path(audio_id), "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False, separators=(",", ":"))
+
+def load_timing_sidecar(audio_id: str, timing_format: str = "objects") -> dict:
+    """Load stored word timings for an audio file"""
+    path = _sidecar_path(audio_id)
+    if not os.path.exists(path):
+        return {
+            "error": "No timing data stored for this audio",
+            "success": False
+        }
+    
+    with open(path, "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+    
+    text = sidecar["text"]
+    word_timings = from_compact(sidecar["word_timings"], text)
+    audio_filename = sidecar.get("audio_file", f"{os.path.basename(audio_id)}.mp3")
+    return {
+        "audio_url": f"/audio/{audio_filename}",
+        "audio_id": audio_id,
+        "word_timings": format_word_timings(word_timings, text, timing_format),
+        "language": sidecar.get("language", "en"),
+        "provider": sidecar.get("provider"),
+        "total_words": len(word_timings),
+        "success": True
+    }
+
+def _has_boundaries(sidecar: dict) -> bool:
+    """Whether a sidecar's timings came from provider WordBoundary events"""
+    if "boundaries" in sidecar:
+        return bool(sidecar["boundaries"])
+    # Sidecars written before the flag existed: only Edge TTS reports boundaries
+    return "edge" in (sidecar.get("provider") or "").split("+")
+
+def _read_boundaries(audio_id: str) -> bool:
+    try:
+        with open(_sidecar_path(audio_id), "r", encoding="utf-8") as f:
+            return _has_boundaries(json.load(f))
+    except (OSError, ValueError):
+        return False
+
+def _discard_entry(audio_id: str):
+    """Delete a cache entry: audio in every format, time-stretched copies and sidecar"""
+    for path in glob.glob(os.path.join(AUDIO_DIR, f"{glob.escape(os.path.basename(audio_id))}.*")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _is_fallback(provider: str) -> bool:
+    """
+    Whether audio came from a provider configured after the one preferred now.
+
+    Cache keys do not include the provider, so audio made by a fallback
+    during an outage of the preferred voice (no word boundaries, a
+    different voice) is only reused until that voice is healthy again.
+    """
+    preferred = preferred_provider()
+    if not (provider and preferred in TTS_PROVIDERS):
+        return False
+    rank = TTS_PROVIDERS.index(preferred)
+    return any(
+        name in TTS_PROVIDERS and TTS_PROVIDERS.index(name) > rank
+        for name in provider.split("+")
+    )
+
+def _load_cached(audio_id: str):
+    """Return (audio_filename, provider, word_timings) for a cached entry, or None"""
+    path = _sidecar_path(audio_id)
+    audio_filename = find_audio_file(audio_id)
+    if not (audio_filename and os.path.exists(path)):
+        return None
+    
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        word_timings = from_compact(sidecar["word_timings"], sidecar["text"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"  ! Ignoring unreadable cache entry {audio_id}: {e}")
+        return None
+    
+    if _is_fallback(sidecar.get("provider")) and not is_inflight(audio_id):
+        print(f"  ! Replacing {audio_id} made by fallback provider '{sidecar.get('provider')}'")
+        _discard_entry(audio_id)
+        return None
+    
+    touch([path, os.path.join(AUDIO_DIR, audio_filename)])
+    return audio_filename, sidecar.get("provider"), word_timings
+
+def is_speech_cached(text: str, language: str = "en", speed: float = 1.0) -> bool:
+    """Whether audio for this text is already cached or being synthesized (at any speed)"""
+    lang_config = LANGUAGE_MAP.get(language, LANGUAGE_MAP["en"])
+    audio_id = cache_key(text, lang_config["voice"], CANONICAL_SPEED)
+    return is_inflight(audio_id) or _load_cached(audio_id) is not None
+
+async def _synthesize_text(text: str, language: str, lang_config: dict, speed: float, audio_id: str):
+    """Synthesize the whole text in one provider call"""
+    audio_base_path = os.path.join(AUDIO_DIR, audio_id)
+    provider, audio_path, word_timings = await synthesize_with_failover(
+        text, lang_config, speed, audio_base_path
+    )
+    audio_filename = os.path.basename(audio_path)
+    boundaries = bool(word_timings)
+    
+    # FALLBACK: align words to the audio envelope if no word timings
+    if not boundaries:
+        print(f"! No word timing from '{provider}'. Aligning words to audio.")
+        word_timings = await asyncio.to_thread(align_audio, audio_path, text, speed)
+    
+    await asyncio.to_thread(
+        save_timing_sidecar, audio_id, text, word_timings, language, audio_filename, provider, boundaries
+    )
+    await asyncio.to_thread(evict)
+    
+    print(f"✓ TTS generated: {audio_filename} via {provider} ({len(word_timings)} words with timing)")
+    return audio_filename, provider, word_timings
+
+async def _get_clip(sentence: str, language: str, lang_config: dict) -> tuple:
+    """Return ((audio_filename, provider, word_timings), synthesized) for one sentence"""
+    clip_id = cache_key(sentence, lang_config["voice"], CANONICAL_SPEED)
+    entry = await asyncio.to_thread(_load_cached, clip_id)
+    if entry is not None:
+        return entry, False
+    async with _clip_semaphore:
+        entry = await get_or_create(
+            clip_id,
+            lambda: _synthesize_text(sentence, language, lang_config, CANONICAL_SPEED, clip_id)
+        )
+    return entry, True
+
+async def _assemble(text: str, sentences: list, language: str, lang_config: dict, audio_id: str):
+    """
+    Build the audio for a text from its sentence clips.
+    
+    Clips are ordinary cache entries keyed by the sentence, so sentences
+    already spoken anywhere (another document, a streamed answer, an
+    earlier version of this text) are reused and only the rest are
+    synthesized. Returns None when the clips cannot be joined.
+    """
+    clips = await asyncio.gather(*(
+        _get_clip(sentence, language, lang_config) for sentence, _ in sentences
+    ))
+    ext = clips[0][0][0].rsplit(".", 1)[1]
+    audio_filename = f"{audio_id}.{ext}"
+    offsets = await asyncio.to_thread(
+        concat_audio,
+        [os.path.join(AUDIO_DIR, entry[0]) for entry, _ in clips],
+        os.path.join(AUDIO_DIR, audio_filename)
+    )
+    if offsets is None:
+        return None
+    
+    word_timings = []
+    for ((_, _, clip_timings), _), offset_ms in zip(clips, offsets):
+        word_timings.extend(
+            {**timing, "start_ms": timing["start_ms"] + offset_ms, "end_ms": timing["end_ms"] + offset_ms}
+            for timing in clip_timings
+        )
+    provider = "+".join(sorted({entry[1] for entry, _ in clips if entry[1]}))
+    boundaries = any(await asyncio.gather(*(
+        asyncio.to_thread(_read_boundaries, cache_key(sentence, lang_config["voice"], CANONICAL_SPEED))
+        for sentence, _ in sentences
+    )))
+    
+    await asyncio.to_thread(
+        save_timing_sidecar, audio_id, text, word_timings, language, audio_filename, provider, boundaries
+    )
+    await asyncio.to_thread(evict)
+    
+    synthesized = sum(1 for _, was_synthesized in clips if was_synthesized)
+    print(f"✓ TTS assembled: {audio_filename} from {len(clips)} sentence clips ({synthesized} synthesized)")
+    return audio_filename, provider, word_timings
+
+async def _synthesize(text: str, language: str, lang_config: dict, speed: float, audio_id: str):
+    """Synthesize into the cache and return (audio_filename, provider, word_timings)"""
+    if SPEECH_CLIP_CACHE:
+        sentences = split_sentences(text)
+        if len(sentences) > 1:
+            entry = await _assemble(text, sentences, language, lang_config, audio_id)
+            if entry is not None:
+                return entry
+            print("! Sentence clips could not be joined. Synthesizing the whole text.")
+    return await _synthesize_text(text, language, lang_config, speed, audio_id)
+
+def scale_word_timings(word_timings: list, speed: float) -> list:
+    """Word timings of audio played `speed` times faster"""
+    scaled = []
+    for timing in word_timings:
+        start = round(timing["start_ms"] / speed)
+        duration = round(timing["duration_ms"] / speed)
+        scaled.append({**timing, "start_ms": start, "duration_ms": duration, "end_ms": start + duration})
+    return scaled
+
+def _time_stretch(audio_filename: str, speed: float):
+    """
+    Render a faster/slower copy of cached audio with ffmpeg (pitch is kept).
+
+    The copy is named after the master ("<audio_id>.x1.25.mp3") so it is
+    evicted together with it. Returns the filename, or None without ffmpeg.
+    """
+    base, ext = audio_filename.rsplit(".", 1)
+    filename = f"{base}.x{speed:.2f}.{ext}"
+    path = os.path.join(AUDIO_DIR, filename)
+    if os.path.exists(path):
+        touch([path])
+        return filename
+    
+    ffmpeg = shutil.which(FFMPEG_BINARY)
+    if not ffmpeg:
+        return None
+    partial = f"{path}.part"
+    proc = subprocess.run(
+        [ffmpeg, "-v", "quiet", "-y", "-i", os.path.join(AUDIO_DIR, audio_filename),
+         "-filter:a", f"atempo={speed:.2f}", "-f", ext, partial],
+        check=False,
+    )
+    if proc.returncode != 0 or not os.path.exists(partial):
+        print(f"  ! Time-stretching {audio_filename} to {speed:.2f}x failed")
+        if os.path.exists(partial):
+            os.remove(partial)
+        return None
+    os.replace(partial, path)
+    return filename
+
+async def text_to_speech(text: str, language: str = "en", speed: float = 1.0,
+                         timing_format: str = "objects", speed_mode: str = None) -> dict:
     """
-    Convert text to speech using Edge TTS with accurate timing.
+    Convert text to speech with accurate timing.
+    
+    Uses the first healthy provider (Edge TTS by default) and fails over to
+    the others; see services/tts_providers.py. Audio is synthesized once per
+    (text, voice) at normal speed and cached, so repeated requests, and
+    requests at another speed, return without calling a TTS service.
+    With SPEECH_CLIP_CACHE, texts of several sentences are joined from
+    cached per-sentence clips, so only sentences not heard before are
+    synthesized (at one provider call per new sentence).
+
+    Other speeds are applied without re-synthesis, as set by speed_mode
+    (default TTS_SPEED_MODE):
+    - "client": the normal-speed audio is returned with playback_rate set
+      to the speed; the player applies it (HTMLMediaElement.playbackRate).
+      word_timings stay on the audio's own timeline, which is what the
+      player's currentTime reports at any rate.
+    - "server": a time-stretched copy is rendered with ffmpeg (and cached),
+      word_timings are scaled to it and playback_rate is 1.0. Without
+      ffmpeg this falls back to "client".
     
     Args:
         text: Text to convert to speech
         language: Language code
         speed: Speech speed (0.5 to 2.0)
+        timing_format: "objects" (default), "columnar" or "binary"
+        speed_mode: "client" or "server"
     
     Returns:
-        Dictionary with audio URL and word timing data
+        Dictionary with audio URL, playback rate and word timing data
     """
     
     # Get language config or default to English
     lang_config = LANGUAGE_MAP.get(language, LANGUAGE_MAP["en"])
-    voice = lang_config.get("voice", "en-US-AriaNeural")
     lang_code = lang_config["code"]
     
     # Validate text
@@ -49,122 +345,47 @@ async def text_to_speech(text: str, language: str = "en", speed: float = 1.0) ->
             "success": False
         }
     
-    # Generate unique filename
-    audio_id = str(uuid.uuid4())[:8]
-    audio_filename = f"{audio_id}.mp3"
-    audio_path = os.path.join(AUDIO_DIR, audio_filename)
+    speed = round(min(max(speed or CANONICAL_SPEED, SPEED_RANGE[0]), SPEED_RANGE[1]), 2)
+    audio_id = cache_key(text, lang_config["voice"], CANONICAL_SPEED)
     
     try:
-        # Calculate rate string (e.g. "+50%", "-20%")
-        # map 0.5-2.0 to -50% to +100% (approx)
-        rate_percent = int((speed - 1.0) * 100)
-        rate_str = f"{'+' if rate_percent >= 0 else ''}{rate_percent}%"
-        
-        communicate = edge_tts.Communicate(text, voice, rate=rate_str)
-        
-        word_timings = []
+        entry = await asyncio.to_thread(_load_cached, audio_id)
+        cached = entry is not None
+        if not cached:
+            entry = await get_or_create(
+                audio_id,
+                lambda: _synthesize(text, language, lang_config, CANONICAL_SPEED, audio_id)
+            )
+        audio_filename, provider, word_timings = entry
         
-        # Open file to write audio
-        with open(audio_path, "wb") as file:
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    file.write(chunk["data"])
-                elif chunk["type"] == "WordBoundary":
-                    start_ms = chunk["offset"] / 10000
-                    duration_ms = chunk["duration"] / 10000
-                    word_timings.append({
-                        "word": chunk["text"],
-                        "start_ms": start_ms,
-                        "duration_ms": duration_ms,
-                        "end_ms": start_ms + duration_ms
-                    })
-
-        # Verify file
-        if not (os.path.exists(audio_path) and os.path.getsize(audio_path) > 0):
-             return {
-                "error": "Generated audio file is empty",
-                "success": False
-            }
-            
-        # FALLBACK: Elastic Alignment if no word timings
-        if not word_timings:
-            print("! No accurate timing from Edge TTS. Applying Elastic Alignment.")
-            try:
-                from mutagen.mp3 import MP3
-                audio = MP3(audio_path)
-                total_duration_ms = audio.info.length * 1000
-                print(f"  - Exact Audio Duration: {total_duration_ms:.2f}ms")
-            except Exception as e:
-                print(f"  ! Failed to get duration with mutagen: {e}")
-                total_duration_ms = 0
-            
-            words = text.split()
-            if words and total_duration_ms > 0:
-                # Calculate total character length for weighting
-                total_chars = sum(len(w) for w in words)
-                # Add "virtual chars" for pauses between words (e.g. 1 char equivalent)
-                total_weight = total_chars + (len(words) - 1) * 2  # spacing weight
-                
-                # Calculate duration per weight unit
-                ms_per_unit = total_duration_ms / max(1, total_weight)
-                
-                current_time = 0
-                for i, word in enumerate(words):
-                    # Weight: length of word
-                    weight = len(word)
-                    word_duration = weight * ms_per_unit
-                    
-                    # Ensure minimum duration for visibility (50ms)
-                    # But suppress if we are over budget? No, elastic fits exactly.
-                    # Just basic elastic distribution:
-                    
-                    word_timings.append({
-                        "word": word,
-                        "start_ms": current_time,
-                        "duration_ms": word_duration,
-                        "end_ms": current_time + word_duration
-                    })
-                    
-                    current_time += word_duration
-                    
-                    # Add gap to start time for next word (spacing)
-                    if i < len(words) - 1:
-                         current_time += (2 * ms_per_unit)
-                         
-                # Adjust final end_ms to match total exactly (fix floating point drift)
-                if word_timings:
-                    word_timings[-1]["end_ms"] = total_duration_ms
-
-            elif words:
-                 # Fallback to pure estimation if mutagen failed
-                 print("  ! Using pure estimation fallback.")
-                 avg_word = 400 / speed
-                 curr = 0
-                 for w in words:
-                     dur = avg_word * (len(w)/5.0)
-                     word_timings.append({"word":w, "start_ms":curr, "duration_ms":dur, "end_ms":curr+dur})
-                     curr += dur + 50
-        
-        print(f"✓ TTS generated: {audio_id}.mp3 ({len(word_timings)} words with timing)")
+        playback_rate = speed
+        if speed != CANONICAL_SPEED and (speed_mode or TTS_SPEED_MODE) == "server":
+            stretched = await get_or_create(
+                f"{audio_id}.x{speed:.2f}",
+                lambda: asyncio.to_thread(_time_stretch, audio_filename, speed)
+            )
+            if stretched:
+                audio_filename = stretched
+                word_timings = scale_word_timings(word_timings, speed)
+                playback_rate = CANONICAL_SPEED
         
         return {
             "audio_url": f"/audio/{audio_filename}",
             "audio_id": audio_id,
-            "word_timings": word_timings,
+            "speed": speed,
+            "playback_rate": playback_rate,
+            "word_timings": format_word_timings(word_timings, text, timing_format),
             "language": language,
             "lang_code": lang_code,
+            "provider": provider,
+            "cached": cached,
             "total_words": len(word_timings),
             "success": True
         }
         
+    except Overloaded:
+        raise
     except Exception as e:
-        # Clean up on failure
-        if os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-            except:
-                pass
-        
         print(f"✗ TTS Error: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -174,6 +395,61 @@ async def text_to_speech(text: str, language: str = "en", speed: float = 1.0) ->
             "success": False
         }
 
+def retime_audio(audio_id: str, text: str, speed: float = 1.0,
+                 timing_format: str = "objects") -> dict:
+    """
+    Recompute word timings for an existing audio file.
+
+    Used for cached audio that was generated without WordBoundary events.
+    Audio IDs are shared cache entries, so `text` must be the text the
+    audio was made from; the entry's language and provider are kept.
+    The new timings are only saved for entries whose timings were aligned
+    too; timings from provider word boundaries are more accurate than
+    anything derived from the audio, so for those entries the re-aligned
+    timings are returned without replacing them ("saved" is False).
+    """
+    audio_filename = find_audio_file(audio_id)
+    
+    if not audio_filename:
+        return {
+            "error": "Audio not found",
+            "success": False
+        }
+    
+    if not text or not text.strip():
+        return {
+            "error": "Please provide the text spoken in the audio",
+            "success": False
+        }
+    
+    try:
+        with open(_sidecar_path(audio_id), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        sidecar = None
+    if sidecar is None or sidecar.get("text", "").strip() != text.strip():
+        return {
+            "error": "Text does not match the audio",
+            "success": False
+        }
+    
+    audio_path = os.path.join(AUDIO_DIR, audio_filename)
+    word_timings = align_audio(audio_path, text, speed)
+    saved = not _has_boundaries(sidecar)
+    if saved:
+        save_timing_sidecar(
+            audio_id, sidecar["text"], word_timings, sidecar.get("language", "en"),
+            audio_filename, sidecar.get("provider")
+        )
+    return {
+        "audio_url": f"/audio/{audio_filename}",
+        "audio_id": audio_id,
+        "word_timings": format_word_timings(word_timings, text, timing_format),
+        "total_words": len(word_timings),
+        "saved": saved,
+        "success": True
+    }
+
 async def simplify_text(text: str, dyslexia_type: str = "general", language: str = "en") -> dict:
     """Simplify text for dyslexic users"""
     if not text.strip():
@@ -197,3 +473,7 @@ def get_available_languages():
             "lang_code": config["code"]
         })
     return sorted(languages, key=lambda x: x["code"])
+
+def get_tts_providers():
+    """Return health information for the configured TTS providers"""
+    return get_provider_status()
@@ -0,0 +1,117 @@
+"""
+Sentence-pipelined LLM-to-speech streaming.
+
+Instead of waiting for the whole answer (or simplification) and then for
+the whole audio, the model output is streamed, cut into sentences as they
+complete, and every sentence is sent to TTS straight away. Synthesis runs
+concurrently with generation, and sentences are delivered to the client in
+order, so the first words can play after roughly one sentence of latency.
+"""
+import asyncio
+import os
+
+from config import AUDIO_DIR
+from services.groq_client import chat_completion_stream
+from services.sentences import SentenceSplitter
+from services.speech_service import text_to_speech
+
+
+def _read_audio(audio_url: str) -> bytes:
+    with open(os.path.join(AUDIO_DIR, os.path.basename(audio_url)), "rb") as f:
+        return f.read()
+
+
+async def _known_text(text: str):
+    yield text
+
+
+async def stream_speech(completion: dict, language: str = "en", speed: float = 1.0, text: str = None):
+    """
+    Stream a completion as text and per-sentence speech.
+
+    Args:
+        completion: Completion kwargs (see chat_service.build_*_request)
+        text: Text that is already known (e.g. a cached answer); spoken the
+            same way, in one "text" event, without calling the model
+
+    Yields events in order:
+        {"type": "text", "delta"}: generated text, as soon as it arrives
+        {"type": "sentence", "index", "text", "char_offset", "audio_id",
+         "audio_url", "playback_rate", "word_timings" (columnar), "provider",
+         "audio"}:
+            one per sentence, in order; "audio" holds the file bytes and
+            word timing offsets are relative to the sentence
+        {"type": "done", "text", "sentences"}: at the end
+
+    LLM and TTS errors (including Overloaded) are raised.
+    """
+    events = asyncio.Queue()
+    pending = asyncio.Queue()  # (sentence, offset, TTS task) in text order, None at the end
+    tts_tasks = []
+
+    def speak(sentence: str, offset: int):
+        task = asyncio.create_task(text_to_speech(sentence, language, speed, "columnar"))
+        tts_tasks.append(task)
+        pending.put_nowait((sentence, offset, task))
+
+    async def generate():
+        splitter = SentenceSplitter()
+        parts = []
+        try:
+            source = _known_text(text) if text is not None else chat_completion_stream(**completion)
+            async for delta in source:
+                parts.append(delta)
+                await events.put({"type": "text", "delta": delta})
+                for sentence, offset in splitter.feed(delta):
+                    speak(sentence, offset)
+            for sentence, offset in splitter.flush():
+                speak(sentence, offset)
+            return "".join(parts)
+        finally:
+            pending.put_nowait(None)
+
+    async def deliver():
+        index = 0
+        while (item := await pending.get()) is not None:
+            sentence, offset, task = item
+            result = await task
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "TTS failed"))
+            await events.put({
+                "type": "sentence",
+                "index": index,
+                "text": sentence,
+                "char_offset": offset,
+                "audio_id": result["audio_id"],
+                "audio_url": result["audio_url"],
+                "playback_rate": result["playback_rate"],
+                "word_timings": result["word_timings"],
+                "provider": result["provider"],
+                "audio": await asyncio.to_thread(_read_audio, result["audio_url"]),
+            })
+            index += 1
+        return index
+
+    generator = asyncio.create_task(generate())
+    deliverer = asyncio.create_task(deliver())
+    workers = {generator, deliverer}
+    try:
+        while workers:
+            getter = asyncio.create_task(events.get())
+            done, _ = await asyncio.wait(workers | {getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            for task in done:
+                workers.discard(task)
+                if task.exception() is not None:
+                    raise task.exception()
+
+        # Both workers are finished; pass on anything still queued
+        while not events.empty():
+            yield events.get_nowait()
+        yield {"type": "done", "text": generator.result(), "sentences": deliverer.result()}
+    finally:
+        for task in (generator, deliverer, *tts_tasks):
+            task.cancel()
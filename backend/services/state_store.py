@@ -0,0 +1,271 @@
+"""
+Shared key-value state for profiles and chat sessions.
+
+Module-level dicts only work with a single uvicorn worker. This store keeps
+state in SQLite (WAL mode, on local disk) so every worker process sees the
+same data, with a small in-process read-through cache in front of it.
+
+Each row carries a random version token that changes on every write.
+A cached value is only used after checking its token against the database,
+which is a primary-key lookup that never transfers the (possibly large)
+value itself, so workers never serve stale data. Values are copied in and
+out of the cache, so callers may modify what get() returns.
+
+Calls block on SQLite (up to busy_timeout under write contention); async
+code should run them with asyncio.to_thread. prune() removes entries by age
+and count per namespace (see STATE_TTL_HOURS and STATE_MAX_ENTRIES).
+
+Set STATE_BACKEND=memory to keep everything in-process (single worker).
+"""
+import copy
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import STATE_BACKEND, STATE_DB_PATH, STATE_CACHE_SIZE
+
+_local = threading.local()
+_cache_lock = threading.Lock()
+
+# (namespace, key) -> (version, value), least recently used first
+_cache = OrderedDict()
+
+# Used when STATE_BACKEND is "memory": (namespace, key) -> value, and -> write time
+_memory = {}
+_memory_times = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS kv_updated ON kv (namespace, updated_at)"
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread, created on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(STATE_DB_PATH, timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute(_SCHEMA)
+        conn.execute(_INDEX)
+        _local.conn = conn
+    return conn
+
+
+def _cache_put(namespace: str, key: str, version: str, value):
+    with _cache_lock:
+        _cache[(namespace, key)] = (version, value)
+        _cache.move_to_end((namespace, key))
+        while len(_cache) > STATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cache_drop(namespace: str, key: str):
+    with _cache_lock:
+        _cache.pop((namespace, key), None)
+
+
+def _memory_put(namespace: str, key: str, value):
+    _memory[(namespace, key)] = value
+    _memory_times[(namespace, key)] = time.time()
+
+
+def get(namespace: str, key: str, default=None, cache: bool = True):
+    """
+    Read a JSON value, or `default` when the key is missing.
+
+    Pass cache=False for large values that the caller caches itself.
+    """
+    if STATE_BACKEND == "memory":
+        if (namespace, key) not in _memory:
+            return default
+        return copy.deepcopy(_memory[(namespace, key)])
+
+    conn = _connect()
+    row = conn.execute(
+        "SELECT version FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+    ).fetchone()
+    if row is None:
+        _cache_drop(namespace, key)
+        return default
+
+    with _cache_lock:
+        cached = _cache.get((namespace, key))
+        if cached is not None and cached[0] == row[0]:
+            _cache.move_to_end((namespace, key))
+            value = cached[1]
+        else:
+            value = None
+    if value is not None:
+        return copy.deepcopy(value)
+
+    row = conn.execute(
+        "SELECT version, value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+    ).fetchone()
+    if row is None:
+        return default
+    value = json.loads(row[1])
+    if cache:
+        _cache_put(namespace, key, row[0], copy.deepcopy(value))
+    return value
+
+
+def exists(namespace: str, key: str) -> bool:
+    """Check for a key without reading its value"""
+    if STATE_BACKEND == "memory":
+        return (namespace, key) in _memory
+
+    row = _connect().execute(
+        "SELECT 1 FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+    ).fetchone()
+    return row is not None
+
+
+def touch(namespace: str, key: str) -> bool:
+    """Reset a key's write time (for prune()) without rewriting it; False if it does not exist"""
+    if STATE_BACKEND == "memory":
+        if (namespace, key) not in _memory:
+            return False
+        _memory_times[(namespace, key)] = time.time()
+        return True
+
+    cursor = _connect().execute(
+        "UPDATE kv SET updated_at = ? WHERE namespace = ? AND key = ?",
+        (time.time(), namespace, key)
+    )
+    return cursor.rowcount > 0
+
+
+def put(namespace: str, key: str, value, cache: bool = True):
+    """Write a JSON-serializable value"""
+    if STATE_BACKEND == "memory":
+        _memory_put(namespace, key, copy.deepcopy(value))
+        return
+
+    version = uuid.uuid4().hex
+    _connect().execute(
+        "INSERT INTO kv (namespace, key, value, version, updated_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (namespace, key) DO UPDATE SET "
+        "value = excluded.value, version = excluded.version, updated_at = excluded.updated_at",
+        (namespace, key, json.dumps(value, ensure_ascii=False), version, time.time()),
+    )
+    if cache:
+        _cache_put(namespace, key, version, copy.deepcopy(value))
+    else:
+        _cache_drop(namespace, key)
+
+
+def update(namespace: str, key: str, changes: dict, default: dict = None) -> dict:
+    """
+    Merge `changes` into a stored dict atomically and return the result.
+
+    The read-modify-write runs in one IMMEDIATE transaction, so concurrent
+    updates from other workers are not lost.
+    """
+    if STATE_BACKEND == "memory":
+        current = copy.deepcopy(_memory.get((namespace, key), default or {}))
+        current.update(changes)
+        _memory_put(namespace, key, copy.deepcopy(current))
+        return current
+
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        current = json.loads(row[0]) if row else copy.deepcopy(default or {})
+        current.update(changes)
+        version = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO kv (namespace, key, value, version, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET "
+            "value = excluded.value, version = excluded.version, updated_at = excluded.updated_at",
+            (namespace, key, json.dumps(current, ensure_ascii=False), version, time.time()),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    _cache_put(namespace, key, version, copy.deepcopy(current))
+    return current
+
+
+def delete(namespace: str, key: str):
+    """Remove a key (no error if it does not exist)"""
+    if STATE_BACKEND == "memory":
+        _memory.pop((namespace, key), None)
+        _memory_times.pop((namespace, key), None)
+        return
+
+    _connect().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+    _cache_drop(namespace, key)
+
+
+def keys(namespace: str, written_before: float = None) -> list:
+    """Keys in a namespace, optionally only those last written before a timestamp"""
+    if STATE_BACKEND == "memory":
+        return [
+            key for (space, key), written_at in list(_memory_times.items())
+            if space == namespace and (written_before is None or written_at < written_before)
+        ]
+
+    if written_before is None:
+        rows = _connect().execute("SELECT key FROM kv WHERE namespace = ?", (namespace,))
+    else:
+        rows = _connect().execute(
+            "SELECT key FROM kv WHERE namespace = ? AND updated_at < ?", (namespace, written_before)
+        )
+    return [row[0] for row in rows]
+
+
+def values(namespace: str) -> list:
+    """Every value in a namespace (not cached; meant for small values)"""
+    if STATE_BACKEND == "memory":
+        return [
+            copy.deepcopy(value) for (space, _), value in list(_memory.items()) if space == namespace
+        ]
+
+    rows = _connect().execute("SELECT value FROM kv WHERE namespace = ?", (namespace,))
+    return [json.loads(row[0]) for row in rows]
+
+
+def prune(namespace: str, max_age_s: float = None, max_entries: int = None) -> int:
+    """
+    Remove entries last written more than `max_age_s` ago, then the oldest
+    ones beyond `max_entries`. Returns the number removed.
+    """
+    removed = 0
+    if max_age_s:
+        for key in keys(namespace, written_before=time.time() - max_age_s):
+            delete(namespace, key)
+            removed += 1
+    if max_entries:
+        if STATE_BACKEND == "memory":
+            written = sorted(
+                (written_at, key) for (space, key), written_at in _memory_times.items()
+                if space == namespace
+            )
+            oldest = [key for _, key in written[:max(len(written) - max_entries, 0)]]
+        else:
+            oldest = [row[0] for row in _connect().execute(
+                "SELECT key FROM kv WHERE namespace = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+                (namespace, max_entries)
+            )]
+        for key in oldest:
+            delete(namespace, key)
+            removed += 1
+    return removed
@@ -0,0 +1,117 @@
+"""
+Compact encodings for word timing data.
+
+The default `word_timings` payload is a list of
+{word, start_ms, duration_ms, end_ms} objects. For long documents the
+repeated keys and word strings dominate the response, so two opt-in
+formats are offered:
+
+- "columnar": parallel integer arrays (start_ms, duration_ms) plus the
+  offset and length of each word in the source text (in code points)
+- "binary": the same four columns packed as little-endian int32 and
+  base64-encoded
+"""
+import base64
+
+from services.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+TIMING_FORMATS = ("objects", "columnar", "binary")
+
+_COLUMNS = ("start_ms", "duration_ms", "offsets", "lengths")
+
+
+def locate_words(words: list, text: str):
+    """
+    Find each word in `text`, scanning forward.
+
+    Returns (offsets, lengths, missing) where `missing` maps the index of
+    any word that does not appear verbatim in the text to the word itself.
+    """
+    offsets = []
+    lengths = []
+    missing = {}
+    cursor = 0
+    for i, word in enumerate(words):
+        pos = text.find(word, cursor) if word else -1
+        if pos < 0:
+            offsets.append(-1)
+            lengths.append(0)
+            missing[str(i)] = word
+            continue
+        offsets.append(pos)
+        lengths.append(len(word))
+        cursor = pos + len(word)
+    return offsets, lengths, missing
+
+
+def to_columnar(word_timings: list, text: str) -> dict:
+    """Convert timing objects into the columnar format"""
+    offsets, lengths, missing = locate_words([w["word"] for w in word_timings], text)
+    starts = np.rint([w["start_ms"] for w in word_timings]).astype(np.int64)
+    durations = np.rint([w["duration_ms"] for w in word_timings]).astype(np.int64)
+
+    payload = {
+        "format": "columnar",
+        "count": len(word_timings),
+        "start_ms": starts.tolist(),
+        "duration_ms": durations.tolist(),
+        "offsets": offsets,
+        "lengths": lengths,
+    }
+    if missing:
+        payload["missing_words"] = missing
+    return payload
+
+
+def to_binary(word_timings: list, text: str) -> dict:
+    """Convert timing objects into the base64 packed format"""
+    columnar = to_columnar(word_timings, text)
+    packed = np.array([columnar[c] for c in _COLUMNS], dtype="<i4").reshape(len(_COLUMNS), -1)
+
+    payload = {
+        "format": "binary",
+        "count": columnar["count"],
+        "columns": list(_COLUMNS),
+        "dtype": "int32le",
+        "data": base64.b64encode(packed.tobytes()).decode("ascii"),
+    }
+    if "missing_words" in columnar:
+        payload["missing_words"] = columnar["missing_words"]
+    return payload
+
+
+def from_compact(payload: dict, text: str) -> list:
+    """Expand a columnar or binary payload back into timing objects"""
+    if payload.get("format") == "binary":
+        count = payload["count"]
+        if not count:
+            return []
+        raw = np.frombuffer(base64.b64decode(payload["data"]), dtype="<i4")
+        columns = dict(zip(payload.get("columns", _COLUMNS), raw.reshape(-1, count).tolist()))
+    else:
+        columns = payload
+
+    missing = payload.get("missing_words", {})
+    word_timings = []
+    for i, (start, duration, offset, length) in enumerate(
+        zip(*(columns[c] for c in _COLUMNS))
+    ):
+        word = missing.get(str(i)) if offset < 0 else text[offset:offset + length]
+        word_timings.append({
+            "word": word,
+            "start_ms": start,
+            "duration_ms": duration,
+            "end_ms": start + duration,
+        })
+    return word_timings
+
+
+def format_word_timings(word_timings: list, text: str, timing_format: str = "objects"):
+    """Encode timings in the requested format (objects are returned as-is)"""
+    if timing_format == "columnar":
+        return to_columnar(word_timings, text)
+    if timing_format == "binary":
+        return to_binary(word_timings, text)
+    return word_timings
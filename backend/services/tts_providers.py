@@ -0,0 +1,291 @@
+"""
+TTS provider abstraction with health-tracked failover.
+
+Providers are tried in the configured order (TTS_PROVIDERS). Each one keeps
+a small health record: a moving average of its latency per character and
+a circuit breaker that opens after repeated failures. Providers that are
+failing or slower than the latency SLO are moved behind the healthy ones,
+so a slow or unreachable network voice does not hold up every request.
+Both last TTS_COOLDOWN_S: after that the provider is tried first again,
+and a slow provider's average restarts from the new measurement.
+Latency is measured per character after TTS_LATENCY_OVERHEAD_MS of fixed
+cost per call, and only on texts of TTS_LATENCY_MIN_CHARS or more, so
+short sentence clips do not make a provider look slow.
+
+- edge: Microsoft Edge neural voices (network), with WordBoundary timings
+- gtts: Google Translate TTS (network), no timings
+- offline: local espeak-ng / espeak synthesizer, WAV output, no network
+
+Providers that do not return timings are aligned by the caller. Network
+providers each have their own admission bulkhead (TTS_CONCURRENCY); when
+one is saturated the next provider is tried without counting a failure.
+"""
+import asyncio
+import contextlib
+import os
+import shutil
+import subprocess
+import time
+
+from config import (
+    TTS_PROVIDERS,
+    TTS_TIMEOUT_BASE_S,
+    TTS_TIMEOUT_PER_CHAR_S,
+    TTS_LATENCY_SLO_MS_PER_CHAR,
+    TTS_LATENCY_OVERHEAD_MS,
+    TTS_LATENCY_MIN_CHARS,
+    TTS_FAILURE_THRESHOLD,
+    TTS_COOLDOWN_S,
+    ESPEAK_BINARY,
+    TTS_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+)
+from services.admission import Overloaded, get_bulkhead
+
+# Weight of the newest sample in the latency moving average
+_EWMA_ALPHA = 0.3
+
+
+class TTSProvider:
+    """Base class for speech synthesizers"""
+    name = "base"
+    audio_ext = "mp3"
+    network = True
+
+    def is_available(self) -> bool:
+        return True
+
+    async def synthesize(self, text: str, lang_config: dict, speed: float, audio_path: str) -> list:
+        """Write audio to `audio_path` and return word timings (may be empty)"""
+        raise NotImplementedError
+
+
+class EdgeTTSProvider(TTSProvider):
+    name = "edge"
+    audio_ext = "mp3"
+
+    async def synthesize(self, text: str, lang_config: dict, speed: float, audio_path: str) -> list:
+        import edge_tts
+
+        # Calculate rate string (e.g. "+50%", "-20%")
+        # map 0.5-2.0 to -50% to +100% (approx)
+        rate_percent = int((speed - 1.0) * 100)
+        rate_str = f"{'+' if rate_percent >= 0 else ''}{rate_percent}%"
+
+        voice = lang_config.get("voice", "en-US-AriaNeural")
+        communicate = edge_tts.Communicate(text, voice, rate=rate_str)
+
+        word_timings = []
+        with open(audio_path, "wb") as file:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    file.write(chunk["data"])
+                elif chunk["type"] == "WordBoundary":
+                    start_ms = chunk["offset"] / 10000
+                    duration_ms = chunk["duration"] / 10000
+                    word_timings.append({
+                        "word": chunk["text"],
+                        "start_ms": start_ms,
+                        "duration_ms": duration_ms,
+                        "end_ms": start_ms + duration_ms
+                    })
+        return word_timings
+
+
+class GTTSProvider(TTSProvider):
+    name = "gtts"
+    audio_ext = "mp3"
+
+    async def synthesize(self, text: str, lang_config: dict, speed: float, audio_path: str) -> list:
+        from gtts import gTTS
+
+        # gTTS only has a normal and a slow rate
+        tts = gTTS(text=text, lang=lang_config["code"], slow=speed < 0.8)
+        await asyncio.to_thread(tts.save, audio_path)
+        return []
+
+
+class OfflineTTSProvider(TTSProvider):
+    """Local espeak-ng synthesizer; works without any network access"""
+    name = "offline"
+    audio_ext = "wav"
+    network = False
+
+    def _binary(self):
+        return shutil.which(ESPEAK_BINARY) or shutil.which("espeak")
+
+    def is_available(self) -> bool:
+        return self._binary() is not None
+
+    async def synthesize(self, text: str, lang_config: dict, speed: float, audio_path: str) -> list:
+        binary = self._binary()
+        if not binary:
+            raise RuntimeError("espeak-ng is not installed")
+
+        # espeak speaks ~175 words per minute at its default rate
+        words_per_minute = str(int(175 * max(0.5, min(speed, 2.0))))
+        proc = await asyncio.create_subprocess_exec(
+            binary, "-v", lang_config["espeak"], "-s", words_per_minute,
+            "-w", audio_path, "--stdin",
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate(text.encode("utf-8"))
+        if proc.returncode != 0:
+            raise RuntimeError(f"espeak failed: {stderr.decode(errors='replace').strip()}")
+        return []
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (EdgeTTSProvider(), GTTSProvider(), OfflineTTSProvider())
+}
+
+# Concurrency limits for providers that call a remote service
+_bulkheads = {
+    name: get_bulkhead(name, TTS_CONCURRENCY, ADMISSION_MAX_QUEUE)
+    for name, provider in PROVIDERS.items() if provider.network
+}
+
+# Health record per provider name
+provider_health = {
+    name: {
+        "ms_per_char": None,
+        "consecutive_failures": 0,
+        "open_until": 0.0,
+        "slow_until": 0.0,
+        "successes": 0,
+        "failures": 0,
+        "last_error": None,
+    }
+    for name in PROVIDERS
+}
+
+
+def _record_success(name: str, elapsed_ms: float, chars: int):
+    health = provider_health[name]
+    now = time.monotonic()
+    if chars >= TTS_LATENCY_MIN_CHARS:
+        sample = max(elapsed_ms - TTS_LATENCY_OVERHEAD_MS, 0.0) / chars
+        previous = health["ms_per_char"]
+        if previous is None or (previous > TTS_LATENCY_SLO_MS_PER_CHAR and health["slow_until"] <= now):
+            # First sample, or a probe after the slow period: start over
+            health["ms_per_char"] = sample
+        else:
+            health["ms_per_char"] = _EWMA_ALPHA * sample + (1 - _EWMA_ALPHA) * previous
+        if health["ms_per_char"] > TTS_LATENCY_SLO_MS_PER_CHAR:
+            health["slow_until"] = now + TTS_COOLDOWN_S
+    health["consecutive_failures"] = 0
+    health["open_until"] = 0.0
+    health["successes"] += 1
+
+
+def _record_failure(name: str, error: str):
+    health = provider_health[name]
+    health["consecutive_failures"] += 1
+    health["failures"] += 1
+    health["last_error"] = error
+    if health["consecutive_failures"] >= TTS_FAILURE_THRESHOLD:
+        health["open_until"] = time.monotonic() + TTS_COOLDOWN_S
+
+
+def _is_degraded(name: str) -> bool:
+    """
+    A provider is degraded while its circuit is open, or for TTS_COOLDOWN_S
+    after a measurement put it over the SLO
+    """
+    health = provider_health[name]
+    now = time.monotonic()
+    return health["open_until"] > now or health["slow_until"] > now
+
+
+def get_provider_order() -> list:
+    """Configured providers, healthy ones first, preserving configured order"""
+    configured = [
+        PROVIDERS[name] for name in TTS_PROVIDERS
+        if name in PROVIDERS and PROVIDERS[name].is_available()
+    ]
+    # sorted() is stable, so the configured order is kept within each group
+    return sorted(configured, key=lambda p: _is_degraded(p.name))
+
+
+def preferred_provider():
+    """Name of the provider that would be tried first now, or None"""
+    order = get_provider_order()
+    return order[0].name if order else None
+
+
+async def synthesize_with_failover(text: str, lang_config: dict, speed: float, audio_base_path: str):
+    """
+    Synthesize with the best available provider, failing over on error.
+
+    Args:
+        audio_base_path: Output path without extension (the provider adds it)
+
+    Returns:
+        (provider_name, audio_path, word_timings)
+    """
+    providers = get_provider_order()
+    if not providers:
+        raise RuntimeError("No TTS provider is available")
+
+    timeout = TTS_TIMEOUT_BASE_S + len(text) * TTS_TIMEOUT_PER_CHAR_S
+    errors = []
+    overloaded = None
+    for provider in providers:
+        audio_path = f"{audio_base_path}.{provider.audio_ext}"
+        bulkhead = _bulkheads.get(provider.name)
+        try:
+            async with bulkhead.slot() if bulkhead else contextlib.nullcontext():
+                # Queueing time does not count against the provider
+                start = time.perf_counter()
+                word_timings = await asyncio.wait_for(
+                    provider.synthesize(text, lang_config, speed, audio_path),
+                    timeout=timeout
+                )
+            if not (os.path.exists(audio_path) and os.path.getsize(audio_path) > 0):
+                raise RuntimeError("Generated audio file is empty")
+        except Overloaded as e:
+            overloaded = e
+            errors.append(f"{provider.name}: busy")
+            continue
+        except Exception as e:
+            message = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            _record_failure(provider.name, message)
+            errors.append(f"{provider.name}: {message}")
+            print(f"  ! TTS provider '{provider.name}' failed: {message}")
+            if os.path.exists(audio_path):
+                try:
+                    os.remove(audio_path)
+                except OSError:
+                    pass
+            continue
+
+        _record_success(provider.name, (time.perf_counter() - start) * 1000, len(text))
+        return provider.name, audio_path, word_timings
+
+    if overloaded is not None:
+        raise overloaded
+    raise RuntimeError("All TTS providers failed (" + "; ".join(errors) + ")")
+
+
+def get_provider_status() -> list:
+    """Health summary for each configured provider"""
+    now = time.monotonic()
+    status = []
+    for name in TTS_PROVIDERS:
+        if name not in PROVIDERS:
+            continue
+        health = provider_health[name]
+        status.append({
+            "name": name,
+            "available": PROVIDERS[name].is_available(),
+            "degraded": _is_degraded(name),
+            "circuit_open": health["open_until"] > now,
+            "ms_per_char": round(health["ms_per_char"], 2) if health["ms_per_char"] is not None else None,
+            "successes": health["successes"],
+            "failures": health["failures"],
+            "last_error": health["last_error"],
+        })
+    return status
@@ -0,0 +1,35 @@
+"""
+Background warm-up of heavy dependencies.
+
+Heavy libraries are imported on first use so the process can start serving
+quickly. When WARMUP_ON_START is enabled, they are loaded in a worker thread
+right after start-up instead, so the first real request does not pay for
+them either.
+"""
+import importlib
+import time
+
+from services.groq_client import get_client
+
+# Modules loaded lazily by the services, heaviest first
+HEAVY_MODULES = ("pdfplumber", "pypdfium2", "lxml.etree", "groq", "edge_tts", "numpy", "gtts")
+
+warmup_status = {"state": "idle", "elapsed_ms": None, "modules": {}}
+
+
+def warm_up():
+    """Import heavy modules and build shared clients (blocking)"""
+    warmup_status["state"] = "running"
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        module_start = time.perf_counter()
+        try:
+            # Attribute access forces modules registered by lazy_import to load
+            importlib.import_module(name).__name__
+            warmup_status["modules"][name] = round((time.perf_counter() - module_start) * 1000, 1)
+        except Exception as e:
+            warmup_status["modules"][name] = f"failed: {e}"
+    get_client()
+    warmup_status["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    warmup_status["state"] = "done"
+    print(f"✓ Warm-up finished in {warmup_status['elapsed_ms']}ms")
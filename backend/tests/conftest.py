@@ -0,0 +1,4 @@
+import os
+
+# Keep tests off data/state.db
+os.environ["STATE_BACKEND"] = "memory"
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from services import paragraph_simplify
+from services.admission import BULK, INTERACTIVE, Bulkhead, Overloaded, set_request_class
+
+
+async def queue_up(bulkhead, order, priority, session, name):
+    await bulkhead.acquire(priority, session)
+    order.append(name)
+    bulkhead.release()
+
+
+def test_interactive_goes_ahead_of_queued_bulk():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=1, max_queue=10)
+        order = []
+        await bulkhead.acquire(INTERACTIVE, "holder")
+        waiters = [
+            asyncio.create_task(queue_up(bulkhead, order, BULK, "job", "bulk 1")),
+            asyncio.create_task(queue_up(bulkhead, order, BULK, "job", "bulk 2")),
+        ]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.create_task(queue_up(bulkhead, order, INTERACTIVE, "reader", "interactive")))
+        await asyncio.sleep(0)
+        assert bulkhead.waiting == 3
+        bulkhead.release()
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk 1", "bulk 2"]
+
+
+def test_sessions_take_turns_within_a_class():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=1, max_queue=10)
+        order = []
+        await bulkhead.acquire(BULK, "holder")
+        waiters = []
+        for name, session in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")]:
+            waiters.append(asyncio.create_task(queue_up(bulkhead, order, BULK, session, name)))
+            await asyncio.sleep(0)
+        bulkhead.release()
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["a1", "b1", "a2", "a3"]
+
+
+def test_bulk_is_shed_before_interactive():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=1, max_queue=4)
+        await bulkhead.acquire(INTERACTIVE, "holder")
+        waiters = [
+            asyncio.create_task(bulkhead.acquire(BULK, "job")) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await bulkhead.acquire(BULK, "job")
+        # Interactive requests may still use the other half of the queue
+        waiters.append(asyncio.create_task(bulkhead.acquire(INTERACTIVE, "reader")))
+        await asyncio.sleep(0)
+        assert bulkhead.waiting == 3
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return bulkhead
+
+    bulkhead = asyncio.run(scenario())
+    assert bulkhead.waiting == 0
+    assert bulkhead.stats[BULK]["rejected"] == 1
+
+
+def test_interactive_simplify_overtakes_bulk_simplify(monkeypatch):
+    """Chunks of a long bulk text do not hold back a short interactive request"""
+    monkeypatch.setattr(paragraph_simplify, "SIMPLIFY_PREFILTER", False)
+    bulkhead = Bulkhead("groq", limit=1, max_queue=100)
+    order = []
+
+    async def fake_simplify(text, language, dyslexia_type):
+        async with bulkhead.slot():
+            order.append(text)
+            await asyncio.sleep(0.001)
+        return text
+
+    monkeypatch.setattr(paragraph_simplify, "simplify_text", fake_simplify)
+
+    async def bulk_request():
+        set_request_class(BULK, "teacher")
+        parts = [(f"bulk {i}", False) for i in range(8)]
+        return [output async for _, output, _ in paragraph_simplify.iter_simplified(parts)]
+
+    async def interactive_request():
+        set_request_class(INTERACTIVE, "student")
+        return await paragraph_simplify.simplify_chunked("interactive")
+
+    async def scenario():
+        bulk = asyncio.create_task(bulk_request())
+        # One bulk chunk holds the slot, the rest of its batch is queued
+        while bulkhead.waiting < paragraph_simplify.SIMPLIFY_CONCURRENCY - 1:
+            await asyncio.sleep(0.001)
+        await interactive_request()
+        await bulk
+
+    asyncio.run(scenario())
+    assert order.index("interactive") == 1
+    assert len(order) == 9
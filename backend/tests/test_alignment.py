@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from services import alignment_service
+from services.alignment_service import (
+    align_words, detect_silences, get_audio_duration_ms, load_envelope, read_mp3_frames
+)
+
+FRAME_MS = 10.0
+
+
+def envelope_of(*blocks):
+    """Envelope from (level, frames) blocks"""
+    return np.concatenate([np.full(frames, float(level)) for level, frames in blocks])
+
+
+def mp3_frame(big_values: list, mono: bool = True) -> bytes:
+    """One MPEG-1 Layer III frame (128 kbps, 44.1 kHz, no CRC) with the given big_values per granule"""
+    header = (0x7FF << 21) | (3 << 19) | (1 << 17) | (1 << 16) | (9 << 12) | ((3 if mono else 0) << 6)
+    side_bytes = 17 if mono else 32
+    header_bits = 18 if mono else 20
+    granule_bits = 59 if mono else 118
+    side = 0
+    for granule, value in enumerate(big_values):
+        side |= value << (side_bytes * 8 - (header_bits + granule * granule_bits + 21))
+    frame = header.to_bytes(4, "big") + side.to_bytes(side_bytes, "big")
+    return frame + bytes(144 * 128000 // 44100 - len(frame))
+
+
+@pytest.fixture
+def mp3_file(tmp_path):
+    values = [300, 280, 0, 0, 310, 5]
+    data = b"".join(mp3_frame(values[i:i + 2]) for i in range(0, len(values), 2))
+    # ID3v2 tag in front and junk between frames must be skipped
+    tag = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + bytes(10)
+    data = tag + data[:417] + b"\x00junk" + data[417:]
+    path = tmp_path / "speech.mp3"
+    path.write_bytes(data)
+    return str(path), values
+
+
+def test_detect_silences_keeps_long_gaps():
+    envelope = envelope_of((0, 10), (1, 20), (0, 3), (1, 10), (0, 12), (1, 5))
+    silences = detect_silences(envelope, FRAME_MS, min_silence_ms=80)
+    assert silences.tolist() == [[0, 10], [43, 55]]
+
+
+def test_detect_silences_without_silence():
+    assert detect_silences(np.ones(50), FRAME_MS).shape == (0, 2)
+
+
+def test_align_words_on_pauses():
+    envelope = envelope_of((0, 10), (1, 20), (0, 10), (1, 20), (0, 10), (1, 20), (0, 10))
+    timings = align_words(["one", "two", "six"], envelope, FRAME_MS)
+    assert [(t["start_ms"], t["end_ms"]) for t in timings] == [(100, 300), (400, 600), (700, 900)]
+    assert all(t["duration_ms"] == t["end_ms"] - t["start_ms"] for t in timings)
+
+
+def test_align_words_snaps_boundary_to_gap():
+    # By length the boundary would fall 4 voiced frames in; the pause is at 10
+    envelope = envelope_of((1, 10), (0, 10), (1, 10))
+    first, second = align_words(["a", "bbbbbbb"], envelope, FRAME_MS)
+    assert first["end_ms"] == 100
+    assert second["start_ms"] == 200
+    assert second["end_ms"] == 300
+
+
+def test_align_words_all_silent_falls_back_to_estimate():
+    timings = align_words(["a", "b"], np.zeros(40), FRAME_MS)
+    assert timings[0]["start_ms"] == 0
+    assert timings[-1]["end_ms"] == 400
+
+
+def test_align_words_without_words():
+    assert align_words([], np.ones(10), FRAME_MS) == []
+
+
+@pytest.mark.parametrize("mono", [True, False])
+def test_read_mp3_side_info(tmp_path, mono):
+    path = tmp_path / "frames.mp3"
+    path.write_bytes(mp3_frame([123, 456], mono) + mp3_frame([0, 511], mono))
+    values, granule_ms = read_mp3_frames(str(path))
+    assert values.tolist() == [123, 456, 0, 511]
+    assert granule_ms == pytest.approx(1000 * 576 / 44100)
+
+
+def test_read_mp3_skips_tag_and_junk(mp3_file):
+    path, expected = mp3_file
+    values, granule_ms = read_mp3_frames(path)
+    assert values.tolist() == expected
+    assert get_audio_duration_ms(path) == pytest.approx(len(expected) * granule_ms)
+
+
+def test_mp3_envelope_without_decoder(mp3_file, monkeypatch):
+    path, expected = mp3_file
+    monkeypatch.setattr(alignment_service, "FFMPEG_BINARY", "no-such-ffmpeg")
+    envelope, frame_ms = load_envelope(path)
+    assert len(envelope) == len(expected)
+    assert frame_ms == pytest.approx(1000 * 576 / 44100)
+    # The silent granules are the quietest part of the envelope
+    assert envelope[2] == envelope[3] == 0.0
+    assert envelope[0] > 0.5
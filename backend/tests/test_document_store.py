@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from services import document_store, state_store
+from services.document_store import (
+    BLOBS_NAMESPACE, DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE,
+    content_hash, delete_document, get_document, prune_blobs, save_document, storage_stats
+)
+
+HOLDERS = [DOCUMENTS_NAMESPACE, GENERATED_NAMESPACE]
+
+
+@pytest.fixture(autouse=True)
+def empty_store(monkeypatch):
+    monkeypatch.setattr(state_store, "_memory", {})
+    monkeypatch.setattr(state_store, "_memory_times", {})
+    monkeypatch.setattr(document_store, "_BLOB_GRACE_S", 0)
+
+
+def age(namespace, key, seconds):
+    state_store._memory_times[(namespace, key)] = time.time() - seconds
+
+
+def test_references_come_from_stored_holders():
+    upload = save_document("Shared handout", "handout.txt")
+    save_document("Shared handout", "copy.txt")
+    save_document("Shared handout", generated=True)
+
+    stats = storage_stats(HOLDERS)
+    assert (stats["documents"], stats["references"]) == (1, 3)
+
+    delete_document(upload)
+    assert storage_stats(HOLDERS)["references"] == 2
+
+
+def test_generated_results_expire_sooner_than_uploads():
+    upload = save_document("Uploaded text")
+    generated = save_document("Simplified text", generated=True)
+    age(DOCUMENTS_NAMESPACE, upload, 48 * 3600)
+    age(GENERATED_NAMESPACE, generated, 48 * 3600)
+
+    state_store.prune(DOCUMENTS_NAMESPACE, max_age_s=168 * 3600)
+    state_store.prune(GENERATED_NAMESPACE, max_age_s=24 * 3600)
+
+    assert get_document(upload) == "Uploaded text"
+    assert state_store.get(GENERATED_NAMESPACE, generated) is None
+
+
+def test_blobs_without_holders_are_pruned():
+    kept = save_document("Kept text")
+    dropped = save_document("Dropped text", generated=True)
+    delete_document(dropped)
+    for digest in state_store.keys(BLOBS_NAMESPACE):
+        age(BLOBS_NAMESPACE, digest, 60)
+
+    assert prune_blobs(HOLDERS) == 1
+    assert state_store.exists(BLOBS_NAMESPACE, content_hash("Kept text"))
+    assert not state_store.exists(BLOBS_NAMESPACE, content_hash("Dropped text"))
+    assert get_document(kept) == "Kept text"
@@ -0,0 +1,77 @@
+import zipfile
+
+from services.document_service import extract_from_docx, iter_docx_blocks
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def run(text):
+    return f"<w:r><w:t xml:space=\"preserve\">{text}</w:t></w:r>"
+
+
+def paragraph(*content):
+    return "<w:p>" + "".join(content) + "</w:p>"
+
+
+def table(*rows):
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(f"<w:tc>{cell}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    ) + "</w:tbl>"
+
+
+def write_docx(path, *blocks):
+    body = "".join(blocks)
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr(
+            "word/document.xml",
+            f'<?xml version="1.0" encoding="UTF-8"?><w:document {NS}><w:body>{body}</w:body></w:document>'
+        )
+    return str(path)
+
+
+def test_nested_runs(tmp_path):
+    path = write_docx(
+        tmp_path / "runs.docx",
+        paragraph(
+            run("Read "),
+            "<w:hyperlink><w:r><w:rPr><w:b/></w:rPr><w:t>this</w:t></w:r></w:hyperlink>",
+            "<w:smartTag>", run(" page"), "</w:smartTag>",
+            "<w:r><w:tab/><w:t>now</w:t><w:br/><w:t>later</w:t></w:r>",
+        ),
+        paragraph(),
+        "<w:sdt><w:sdtContent>", paragraph(run("In a content control")), "</w:sdtContent></w:sdt>",
+    )
+
+    assert list(iter_docx_blocks(path)) == ["Read this page\tnow\nlater", "In a content control"]
+
+
+def test_tables_in_document_order(tmp_path):
+    inner = table([paragraph(run("inner"))])
+    path = write_docx(
+        tmp_path / "tables.docx",
+        paragraph(run("Before")),
+        table(
+            [paragraph(run("Name")), paragraph(run("Score"))],
+            [paragraph(run("Ada")), paragraph(run("9")) + paragraph(run("of 10"))],
+            [paragraph(), paragraph()],
+            [paragraph(run("Nested")), inner],
+        ),
+        paragraph(run("After")),
+    )
+
+    assert extract_from_docx(path) == (
+        "Before\n\nName | Score\nAda | 9 of 10\nNested | inner\n\nAfter"
+    )
+
+
+def test_entities_are_not_expanded(tmp_path):
+    path = tmp_path / "entity.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            f'<?xml version="1.0"?><!DOCTYPE d [<!ENTITY x "expanded">]>'
+            f'<w:document {NS}><w:body>{paragraph(run("a &x; b"))}</w:body></w:document>'
+        )
+
+    assert "expanded" not in extract_from_docx(str(path))
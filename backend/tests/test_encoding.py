@@ -0,0 +1,45 @@
+import codecs
+
+from services.document_service import detect_encoding
+
+TEXT = "line one, café\r\n" * 5000
+
+
+def test_utf8_bom():
+    assert detect_encoding(codecs.BOM_UTF8 + TEXT.encode("utf-8")) == ("utf-8", 3)
+
+
+def test_utf16_bom():
+    assert detect_encoding(codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le")) == ("utf-16-le", 2)
+    assert detect_encoding(codecs.BOM_UTF16_BE + TEXT.encode("utf-16-be")) == ("utf-16-be", 2)
+
+
+def test_utf32_bom_is_not_taken_for_utf16():
+    assert detect_encoding(codecs.BOM_UTF32_LE + TEXT.encode("utf-32-le")) == ("utf-32-le", 4)
+
+
+def test_utf16_without_bom():
+    assert detect_encoding(TEXT.encode("utf-16-le")) == ("utf-16-le", 0)
+    assert detect_encoding(TEXT.encode("utf-16-be")) == ("utf-16-be", 0)
+
+
+def test_utf8_without_bom():
+    assert detect_encoding(TEXT.encode("utf-8")) == ("utf-8", 0)
+
+
+def test_utf8_sample_cut_inside_a_character():
+    # Middle and tail samples may start inside a multi-byte sequence
+    data = ("é" * 50001).encode("utf-8")
+    assert detect_encoding(data) == ("utf-8", 0)
+
+
+def test_short_text_ending_in_a_lead_byte_is_not_utf8():
+    assert detect_encoding("Hello world café".encode("cp1252"))[0] != "utf-8"
+
+
+def test_legacy_single_byte_text():
+    data = TEXT.encode("cp1252")
+    encoding, bom_length = detect_encoding(data)
+    assert encoding != "utf-8"
+    assert bom_length == 0
+    assert data.decode(encoding) == TEXT
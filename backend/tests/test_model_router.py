@@ -0,0 +1,68 @@
+from collections import deque
+
+import pytest
+
+from services import model_router
+from services.model_router import LARGE, SMALL, choose_tier
+
+
+@pytest.fixture(autouse=True)
+def router(monkeypatch):
+    monkeypatch.setattr(model_router, "LLM_TIER_POLICY", {"answer": "auto", "digest": SMALL, "summarize": LARGE})
+    monkeypatch.setattr(model_router, "LLM_SMALL_MAX_CHARS", 1000)
+    monkeypatch.setattr(model_router, "LLM_SLO_SMALL_MAX_CHARS", 4000)
+    monkeypatch.setattr(model_router, "LLM_LATENCY_SLO_MS", 5000)
+    for tier in model_router.TIER_MODELS:
+        monkeypatch.setitem(model_router.tier_health, tier, {
+            "requests": 0,
+            "errors": 0,
+            "ms_ewma": None,
+            "latencies": deque(maxlen=model_router._SAMPLES),
+            "operations": {},
+            "last_error": None,
+        })
+
+
+def test_fixed_policies():
+    assert choose_tier("digest", 100_000) == SMALL
+    assert choose_tier("summarize", 10) == LARGE
+
+
+def test_auto_policy_by_size():
+    assert choose_tier("answer", 1000) == SMALL
+    assert choose_tier("answer", 1001) == LARGE
+    # Operations without a policy are "auto"
+    assert choose_tier("unknown", 10) == SMALL
+
+
+def test_slow_large_model_moves_medium_inputs_to_small():
+    model_router.record_success(LARGE, "answer", 8000)
+    assert choose_tier("answer", 3000) == SMALL
+    assert choose_tier("answer", 5000) == LARGE
+
+
+def test_latency_moving_average():
+    model_router.record_success(LARGE, "answer", 1000)
+    model_router.record_success(LARGE, "answer", 2000)
+    assert model_router.tier_health[LARGE]["ms_ewma"] == pytest.approx(0.3 * 2000 + 0.7 * 1000)
+
+
+def test_latency_percentile_needs_samples():
+    for ms in range(1, model_router._MIN_SAMPLES):
+        model_router.record_success(SMALL, "answer", ms * 10)
+    assert model_router.latency_percentile(SMALL, 0.5) is None
+    model_router.record_success(SMALL, "answer", model_router._MIN_SAMPLES * 10)
+    assert model_router.latency_percentile(SMALL, 0.5) == 110
+    assert model_router.latency_percentile(SMALL, 0.95) == 200
+
+
+def test_model_status():
+    model_router.record_success(SMALL, "answer", 120)
+    model_router.record_failure(SMALL, "digest", "timeout")
+    status = model_router.get_model_status()[SMALL]
+    assert status["requests"] == 2
+    assert status["errors"] == 1
+    assert status["last_error"] == "timeout"
+    assert status["operations"] == {"answer": 1, "digest": 1}
+    assert status["p50_ms"] == 120
+    assert not status["over_slo"]
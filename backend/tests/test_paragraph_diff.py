@@ -0,0 +1,39 @@
+from services.paragraph_simplify import diff_paragraphs, match_paragraphs, paragraph_key
+
+PREVIOUS = ["a", "b", "c", "d"]
+
+
+def test_identical_versions():
+    assert diff_paragraphs(PREVIOUS, PREVIOUS) == []
+    assert match_paragraphs(PREVIOUS, PREVIOUS) == {0: 0, 1: 1, 2: 2, 3: 3}
+
+
+def test_edited_paragraph():
+    assert diff_paragraphs(PREVIOUS, ["a", "B", "c", "d"]) == [1]
+
+
+def test_inserted_paragraph_shifts_the_rest():
+    keys = ["a", "new", "b", "c", "d"]
+    assert diff_paragraphs(PREVIOUS, keys) == [1]
+    assert match_paragraphs(PREVIOUS, keys) == {0: 0, 2: 1, 3: 2, 4: 3}
+
+
+def test_deleted_paragraph():
+    keys = ["a", "c", "d"]
+    assert diff_paragraphs(PREVIOUS, keys) == []
+    assert match_paragraphs(PREVIOUS, keys) == {0: 0, 1: 2, 2: 3}
+
+
+def test_no_previous_version():
+    assert diff_paragraphs([], ["a", "b"]) == [0, 1]
+
+
+def test_moved_paragraph_counts_as_changed_once():
+    assert diff_paragraphs(PREVIOUS, ["b", "c", "d", "a"]) == [3]
+
+
+def test_paragraph_key_depends_on_reader():
+    key = paragraph_key("Some text.", "en", "general")
+    assert key == paragraph_key("Some text.", "en", "general")
+    assert key != paragraph_key("Some text.", "es", "general")
+    assert key != paragraph_key("Some text.", "en", "visual")
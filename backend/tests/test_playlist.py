@@ -0,0 +1,37 @@
+from services.speech_playlist import render_m3u8
+
+
+def manifest(*durations):
+    """JSON playlist with the given durations; None marks a segment not synthesized yet"""
+    return {"segments": [
+        {"index": index, "duration_ms": duration or 4000, "estimated": duration is None}
+        for index, duration in enumerate(durations)
+    ]}
+
+
+def test_lists_only_synthesized_prefix():
+    lines = render_m3u8(manifest(2500, 3100, None, 1200)).splitlines()
+
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in lines
+    assert [line for line in lines if not line.startswith("#")] == ["segments/0", "segments/1"]
+    assert "#EXTINF:3.100," in lines
+    assert "#EXT-X-ENDLIST" not in lines
+
+
+def test_target_duration_covers_segments_to_come():
+    assert "#EXT-X-TARGETDURATION:4" in render_m3u8(manifest(2500, None)).splitlines()
+    assert "#EXT-X-TARGETDURATION:6" in render_m3u8(manifest(5200, None)).splitlines()
+
+
+def test_ends_once_every_segment_is_synthesized():
+    lines = render_m3u8(manifest(2500, 3100)).splitlines()
+
+    assert lines[-1] == "#EXT-X-ENDLIST"
+    assert lines.count("#EXTINF:2.500,") == 1
+
+
+def test_nothing_synthesized_yet():
+    lines = render_m3u8(manifest(None, None)).splitlines()
+
+    assert not [line for line in lines if not line.startswith("#")]
+    assert "#EXT-X-ENDLIST" not in lines
@@ -0,0 +1,60 @@
+import pytest
+
+from services import readability
+from services.readability import analyze, check_readability
+
+
+@pytest.fixture(autouse=True)
+def english(monkeypatch):
+    monkeypatch.setattr(readability, "SIMPLIFY_PREFILTER_LANGUAGES", ["en"])
+
+
+def test_words_and_sentences():
+    metrics = analyze("The cat sat. The big dog ran home!")
+    assert metrics["words"] == 8
+    assert metrics["sentences"] == 2
+    assert metrics["max_sentence_words"] == 5
+    assert metrics["mean_sentence_words"] == 4.0
+
+
+def test_line_break_ends_a_sentence():
+    assert analyze("A short title\nThe text starts here.")["sentences"] == 2
+
+
+def test_dots_inside_numbers_do_not_end_sentences():
+    assert analyze("Install version 2.0.1 now. It costs 3.50 dollars.")["sentences"] == 2
+
+
+def test_dots_inside_abbreviations_do_not_end_sentences():
+    assert analyze("Pick a fruit, e.g.apples or pears.")["sentences"] == 1
+
+
+def test_syllables():
+    # "make" has a silent e, "table" does not
+    assert analyze("make")["mean_syllables"] == 1.0
+    assert analyze("table")["mean_syllables"] == 2.0
+    assert analyze("understanding")["polysyllable_share"] == 1.0
+
+
+def test_text_that_is_not_measured():
+    assert analyze("") is None
+    assert analyze("   \n ") is None
+    assert analyze("Привет, как дела?") is None
+
+
+def test_simple_text_passes():
+    ok, problems, _ = check_readability("The cat sat on the mat. It was warm.", "general")
+    assert ok
+    assert problems == []
+
+
+def test_long_sentence_fails():
+    text = "The cat sat on the mat and then it ran to the door and out into the big wide yard."
+    ok, problems, metrics = check_readability(text, "visual")
+    assert not ok
+    assert f"sentence of {metrics['max_sentence_words']} words" in problems
+
+
+def test_markup_and_languages_are_not_checked():
+    assert check_readability("A *bold* word.")[1] == ["contains markup or brackets"]
+    assert check_readability("El gato.", language="es")[1] == ["language not checked"]
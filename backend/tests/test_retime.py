@@ -0,0 +1,62 @@
+import pytest
+
+from services import speech_service
+from services.speech_service import load_timing_sidecar, retime_audio, save_timing_sidecar
+
+TEXT = "Hello there world"
+PROVIDER_TIMINGS = [
+    {"word": "Hello", "start_ms": 0, "duration_ms": 300, "end_ms": 300},
+    {"word": "there", "start_ms": 350, "duration_ms": 250, "end_ms": 600},
+    {"word": "world", "start_ms": 650, "duration_ms": 250, "end_ms": 900},
+]
+ALIGNED_TIMINGS = [
+    {"word": "Hello", "start_ms": 10, "duration_ms": 270, "end_ms": 280},
+    {"word": "there", "start_ms": 320, "duration_ms": 290, "end_ms": 610},
+    {"word": "world", "start_ms": 700, "duration_ms": 250, "end_ms": 950},
+]
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(speech_service, "AUDIO_DIR", str(tmp_path))
+    monkeypatch.setattr(speech_service, "align_audio", lambda path, text, speed: ALIGNED_TIMINGS)
+    (tmp_path / "clip.mp3").write_bytes(b"\xff\xfb")
+    return tmp_path
+
+
+def starts(audio_id):
+    return [timing["start_ms"] for timing in load_timing_sidecar(audio_id)["word_timings"]]
+
+
+def test_retime_keeps_provider_boundaries(audio_dir):
+    save_timing_sidecar("clip", TEXT, PROVIDER_TIMINGS, "en", "clip.mp3", "edge", boundaries=True)
+
+    result = retime_audio("clip", TEXT)
+
+    assert result["success"] and not result["saved"]
+    assert [timing["start_ms"] for timing in result["word_timings"]] == [10, 320, 700]
+    assert starts("clip") == [0, 350, 650]
+
+
+def test_retime_saves_aligned_timings(audio_dir):
+    save_timing_sidecar("clip", TEXT, PROVIDER_TIMINGS, "en", "clip.mp3", "gtts")
+
+    result = retime_audio("clip", TEXT)
+
+    assert result["saved"]
+    assert starts("clip") == [10, 320, 700]
+
+
+def test_retime_treats_legacy_edge_sidecars_as_boundaries(audio_dir):
+    save_timing_sidecar("clip", TEXT, PROVIDER_TIMINGS, "en", "clip.mp3", "edge")
+    sidecar = (audio_dir / "clip.json").read_text(encoding="utf-8").replace('"boundaries":false,', "")
+    (audio_dir / "clip.json").write_text(sidecar, encoding="utf-8")
+
+    assert not retime_audio("clip", TEXT)["saved"]
+    assert starts("clip") == [0, 350, 650]
+
+
+def test_retime_rejects_other_text(audio_dir):
+    save_timing_sidecar("clip", TEXT, PROVIDER_TIMINGS, "en", "clip.mp3", "gtts")
+
+    assert not retime_audio("clip", "Something else")["success"]
@@ -0,0 +1,39 @@
+import asyncio
+
+from services import paragraph_simplify
+
+LIMIT = paragraph_simplify.SIMPLIFY_CONCURRENCY
+
+
+def test_concurrency_is_limited_per_text(monkeypatch):
+    monkeypatch.setattr(paragraph_simplify, "SIMPLIFY_PREFILTER", False)
+    running = {"long": 0, "peak": 0}
+    events = {}
+
+    async def fake_simplify(text, language, dyslexia_type):
+        if text.startswith("long"):
+            running["long"] += 1
+            running["peak"] = max(running["peak"], running["long"])
+            await events["release"].wait()
+            running["long"] -= 1
+        return f"simple {text}"
+
+    monkeypatch.setattr(paragraph_simplify, "simplify_text", fake_simplify)
+
+    async def simplify_parts(parts):
+        return [output async for _, output, _ in paragraph_simplify.iter_simplified(parts)]
+
+    async def scenario():
+        events["release"] = asyncio.Event()
+        long_parts = [(f"long part {i}", False) for i in range(3 * LIMIT)]
+        long_job = asyncio.create_task(simplify_parts(long_parts))
+        await asyncio.sleep(0.01)
+        assert running["peak"] == LIMIT
+        # Another text gets its own limit instead of queueing behind the long one
+        short = await asyncio.wait_for(paragraph_simplify.simplify_chunked("A short one."), 1)
+        events["release"].set()
+        return short, await long_job
+
+    (short, _), outputs = asyncio.run(scenario())
+    assert short == "simple A short one."
+    assert outputs == [f"simple long part {i}" for i in range(3 * LIMIT)]
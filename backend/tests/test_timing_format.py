@@ -0,0 +1,57 @@
+from services.timing_format import from_compact, locate_words, to_binary, to_columnar
+
+TEXT = "The cat saw the cat."
+
+TIMINGS = [
+    {"word": "The", "start_ms": 0, "duration_ms": 200, "end_ms": 200},
+    {"word": "cat", "start_ms": 200, "duration_ms": 250, "end_ms": 450},
+    {"word": "saw", "start_ms": 450, "duration_ms": 300, "end_ms": 750},
+    {"word": "the", "start_ms": 750, "duration_ms": 150, "end_ms": 900},
+    {"word": "cat.", "start_ms": 900, "duration_ms": 400, "end_ms": 1300},
+]
+
+
+def test_locate_words_scans_forward():
+    offsets, lengths, missing = locate_words(["cat", "cat"], TEXT)
+    assert offsets == [4, 16]
+    assert lengths == [3, 3]
+    assert missing == {}
+
+
+def test_locate_words_reports_missing_words():
+    offsets, lengths, missing = locate_words(["The", "dog", "cat"], TEXT)
+    assert offsets == [0, -1, 4]
+    assert lengths == [3, 0, 3]
+    assert missing == {"1": "dog"}
+
+
+def test_columnar_round_trip():
+    payload = to_columnar(TIMINGS, TEXT)
+    assert payload["count"] == 5
+    assert payload["offsets"] == [0, 4, 8, 12, 16]
+    assert from_compact(payload, TEXT) == TIMINGS
+
+
+def test_binary_round_trip():
+    payload = to_binary(TIMINGS, TEXT)
+    assert payload["dtype"] == "int32le"
+    assert from_compact(payload, TEXT) == TIMINGS
+
+
+def test_missing_word_survives_binary_round_trip():
+    timings = [dict(TIMINGS[0]), {"word": "dog", "start_ms": 200, "duration_ms": 100, "end_ms": 300}]
+    payload = to_binary(timings, TEXT)
+    assert payload["missing_words"] == {"1": "dog"}
+    assert from_compact(payload, TEXT) == timings
+
+
+def test_fractional_milliseconds_are_rounded():
+    timings = [{"word": "The", "start_ms": 10.6, "duration_ms": 99.4, "end_ms": 110.0}]
+    payload = to_columnar(timings, TEXT)
+    assert payload["start_ms"] == [11]
+    assert payload["duration_ms"] == [99]
+
+
+def test_empty_payloads():
+    assert from_compact(to_binary([], ""), "") == []
+    assert from_compact(to_columnar([], ""), "") == []
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from services import tts_providers
+from services.speech_service import LANGUAGE_MAP
+from services.tts_providers import OfflineTTSProvider
+
+
+class FakeProcess:
+    returncode = 0
+
+    async def communicate(self, data):
+        return b"", b""
+
+
+@pytest.mark.parametrize("language, voice", [("zh", "cmn"), ("pt-PT", "pt"), ("en-GB", "en-gb")])
+def test_offline_provider_uses_espeak_voice(monkeypatch, language, voice):
+    calls = []
+
+    async def create_subprocess_exec(*args, **kwargs):
+        calls.append(args)
+        return FakeProcess()
+
+    monkeypatch.setattr(OfflineTTSProvider, "_binary", lambda self: "espeak-ng")
+    monkeypatch.setattr(tts_providers.asyncio, "create_subprocess_exec", create_subprocess_exec)
+
+    asyncio.run(OfflineTTSProvider().synthesize("Hello", LANGUAGE_MAP[language], 1.0, "out.wav"))
+
+    args = calls[0]
+    assert args[args.index("-v") + 1] == voice
+
+
+def test_every_language_has_an_espeak_voice():
+    assert all(config.get("espeak") for config in LANGUAGE_MAP.values())
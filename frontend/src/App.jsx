@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react'
 import api from './api'
+import useSpeechStream from './hooks/useSpeechStream'
 
 function App() {
     // Assessment state
@@ -20,6 +21,18 @@ function App() {
     const [text, setText] = useState('');
     const [processedText, setProcessedText] = useState('');
     const [inputMode, setInputMode] = useState('upload'); // 'upload' or 'type'
+    // Texts stored on the server (upload, simplify, summarize results) -> document_id,
+    // so they are sent by ID instead of being posted again
+    const documentIdsRef = useRef(new Map());
+    const sourceFor = (content) => {
+        const documentId = documentIdsRef.current.get(content);
+        return documentId ? { documentId } : content;
+    };
+    const rememberDocument = (content, documentId) => {
+        if (content && documentId) documentIdsRef.current.set(content, documentId);
+    };
+    // Successive Simplify clicks on typed text only re-simplify changed paragraphs
+    const simplifyKeyRef = useRef(Math.random().toString(36).slice(2));
 
     // Audio state
     const [isPlaying, setIsPlaying] = useState(false);
@@ -60,6 +73,7 @@ function App() {
     const [showChat, setShowChat] = useState(false);
     const [chatLoading, setChatLoading] = useState(false);
     const chatEndRef = useRef(null);
+    const speechStream = useSpeechStream();
 
     const audioRef = useRef(null);
     const fileInputRef = useRef(null);
@@ -199,10 +213,11 @@ function App() {
 
         setLoading(l => ({ ...l, upload: true }));
         try {
-            const res = await api.uploadDocument(file);
+            const res = await api.uploadDocument(file, { language: settings.language, speed: settings.speechSpeed });
             if (res.data.success) {
                 setText(res.data.text);
                 setProcessedText('');
+                rememberDocument(res.data.text, res.data.document_id);
 
                 // Initialize chat session for Q&A
                 try {
@@ -211,7 +226,7 @@ function App() {
                     setChatSessionId(newSessionId);
 
                     // Store document context for chat
-                    await api.setDocumentContext(res.data.text, newSessionId);
+                    await api.setDocumentContext(sourceFor(res.data.text), newSessionId);
                     setChatHistory([]);
                     setShowChat(true);
                 } catch (chatErr) {
@@ -233,8 +248,28 @@ function App() {
 
         setLoading(l => ({ ...l, simplify: true }));
         try {
-            const res = await api.simplifyText(content, settings.language, settings.dyslexiaType);
-            setProcessedText(res.data.simplified_text);
+            if (inputMode !== 'type') {
+                // Documents: show simplified chunks as they arrive
+                const chunks = [];
+                await api.simplifyTextStream(sourceFor(content), settings.language, settings.dyslexiaType, (line) => {
+                    if (line.status === 'chunk') {
+                        chunks[line.index] = line.text;
+                        setProcessedText(chunks.join('\n\n'));
+                    } else if (line.status === 'complete') {
+                        setProcessedText(line.simplified_text);
+                        rememberDocument(line.simplified_text, line.result_document_id);
+                    } else if (line.status === 'failed') {
+                        alert(line.error || 'Failed to simplify text');
+                    }
+                }, { speed: settings.speechSpeed });
+            } else {
+                const res = await api.simplifyText(
+                    sourceFor(content), settings.language, settings.dyslexiaType,
+                    { speed: settings.speechSpeed }, simplifyKeyRef.current
+                );
+                setProcessedText(res.data.simplified_text);
+                rememberDocument(res.data.simplified_text, res.data.result_document_id);
+            }
         } catch (err) {
             alert('Failed to simplify text');
         }
@@ -248,8 +283,9 @@ function App() {
 
         setLoading(l => ({ ...l, summarize: true }));
         try {
-            const res = await api.summarizeText(content, settings.language, settings.dyslexiaType);
+            const res = await api.summarizeText(sourceFor(content), settings.language, settings.dyslexiaType);
             setProcessedText(res.data.summary);
+            rememberDocument(res.data.summary, res.data.result_document_id);
         } catch (err) {
             alert('Failed to summarize text');
         }
@@ -273,7 +309,7 @@ function App() {
 
         try {
             // Call backend TTS API
-            const res = await api.textToSpeech(content, settings.language, settings.speechSpeed);
+            const res = await api.textToSpeech(sourceFor(content), settings.language, settings.speechSpeed);
 
             if (res.data.success) {
                 // Set audio source
@@ -281,9 +317,9 @@ function App() {
                 setAudioUrl(url);
                 setWordTimings(res.data.word_timings);
 
-                // Play audio
+                // Play audio (speed is applied by the player; timings follow currentTime)
                 audio.src = url;
-                audio.playbackRate = settings.speechSpeed;
+                audio.playbackRate = res.data.playback_rate ?? 1;
 
                 // Play with user interaction handling
                 try {
@@ -332,6 +368,31 @@ function App() {
         setChatLoading(false);
     };
 
+    // Ask and hear the answer while it is being written
+    const handleAskAndListen = () => {
+        if (!chatQuestion.trim() || !chatSessionId) return;
+
+        const question = chatQuestion;
+        setChatQuestion('');
+        setChatHistory(prev => [...prev, { question, answer: '' }]);
+
+        speechStream.start({
+            mode: 'answer',
+            question,
+            session_id: chatSessionId,
+            language: settings.language,
+            dyslexia_type: settings.dyslexiaType,
+            speed: settings.speechSpeed
+        }, {
+            onText: (delta) => setChatHistory(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, answer: last.answer + delta }];
+            }),
+            onDone: () => chatEndRef.current?.scrollIntoView({ behavior: 'smooth' }),
+            onError: (message) => alert(message || 'Failed to get answer')
+        });
+    };
+
     // Toggle play/pause
     const togglePlayPause = () => {
         const audio = audioRef.current;
@@ -826,6 +887,14 @@ function App() {
                             >
                                 {chatLoading ? '⏳' : '🔍'} Ask
                             </button>
+                            <button
+                                className="btn btn-secondary"
+                                onClick={speechStream.isPlaying || speechStream.isStreaming ? speechStream.stop : handleAskAndListen}
+                                disabled={!speechStream.isPlaying && !speechStream.isStreaming && (chatLoading || !chatQuestion.trim())}
+                                style={{ minWidth: '120px' }}
+                            >
+                                {speechStream.isPlaying || speechStream.isStreaming ? '⏹ Stop' : '🔊 Ask & Listen'}
+                            </button>
                         </div>
                     </div>
                 )}
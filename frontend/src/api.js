@@ -2,39 +2,132 @@ import axios from 'axios';
 
 const API_BASE = 'https://pad-new-project.onrender.com/api';
 
+// Text input for an endpoint: a plain string, or { documentId } for a
+// document already stored on the server (avoids re-posting large texts)
+const sourceBody = (source) =>
+    typeof source === 'string' ? { text: source } : { document_id: source.documentId };
+
+// Call onLine with each JSON line of a streamed NDJSON response
+const readNdjson = async (response, onLine) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        lines.filter(Boolean).forEach(line => onLine(JSON.parse(line)));
+    }
+    if (buffered.trim()) onLine(JSON.parse(buffered));
+};
+
 export const api = {
     // Profile
     getProfile: () => axios.get(`${API_BASE}/profile`),
     updateProfile: (data) => axios.post(`${API_BASE}/profile`, data),
 
     // Documents
-    uploadDocument: (file) => {
+    // prewarm: { language, speed } to pre-synthesize speech for the result
+    uploadDocument: (file, prewarm = null) => {
         const formData = new FormData();
         formData.append('file', file);
+        if (prewarm) {
+            formData.append('prewarm', 'true');
+            formData.append('language', prewarm.language);
+            formData.append('speed', prewarm.speed);
+        }
         return axios.post(`${API_BASE}/documents/upload`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' }
         });
     },
 
-    simplifyText: (text, language = 'en', dyslexiaType = 'general') =>
-        axios.post(`${API_BASE}/documents/simplify`, { text, language, dyslexia_type: dyslexiaType }),
+    // Many files and/or ZIP archives; onResult is called with each
+    // per-file status line as the server streams it
+    uploadDocumentsBulk: async (files, onResult) => {
+        const formData = new FormData();
+        for (const file of files) formData.append('files', file);
+        const response = await fetch(`${API_BASE}/documents/upload-bulk`, { method: 'POST', body: formData });
+        await readNdjson(response, onResult);
+    },
 
-    summarizeText: (text, language = 'en', dyslexiaType = 'general') =>
-        axios.post(`${API_BASE}/documents/summarize`, { text, language, dyslexia_type: dyslexiaType }),
+    // versionKey: re-simplify only the paragraphs changed since the last
+    // call with the same key (e.g. one per editor)
+    simplifyText: (source, language = 'en', dyslexiaType = 'general', prewarm = null, versionKey = null) =>
+        axios.post(`${API_BASE}/documents/simplify`, {
+            ...sourceBody(source), language, dyslexia_type: dyslexiaType,
+            ...(prewarm && { prewarm: true, speed: prewarm.speed }),
+            ...(versionKey && { incremental: true, version_key: versionKey })
+        }),
+
+    // Long texts: onLine is called with each simplified chunk, in order
+    // ({ status: 'chunk', index, total, text }), then the final
+    // { status: 'complete', simplified_text, result_document_id } or { status: 'failed', error }
+    simplifyTextStream: async (source, language = 'en', dyslexiaType = 'general', onLine, prewarm = null) => {
+        const response = await fetch(`${API_BASE}/documents/simplify-stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                ...sourceBody(source), language, dyslexia_type: dyslexiaType,
+                ...(prewarm && { prewarm: true, speed: prewarm.speed })
+            })
+        });
+        await readNdjson(response, onLine);
+    },
+
+    summarizeText: (source, language = 'en', dyslexiaType = 'general') =>
+        axios.post(`${API_BASE}/documents/summarize`, { ...sourceBody(source), language, dyslexia_type: dyslexiaType }),
 
     getDyslexiaTypes: () => axios.get(`${API_BASE}/documents/dyslexia-types`),
 
     // Speech
-    textToSpeech: (text, language = 'en', speed = 1.0) =>
-        axios.post(`${API_BASE}/speech/tts`, { text, language, speed }),
+    textToSpeech: (source, language = 'en', speed = 1.0) =>
+        axios.post(`${API_BASE}/speech/tts`, { ...sourceBody(source), language, speed }),
 
     getLanguages: () => axios.get(`${API_BASE}/speech/languages`),
 
+    // Long texts as a playlist of paragraph segments, each synthesized when
+    // first fetched; segment timings are relative to the segment
+    createSpeechPlaylist: (source, language = 'en', speed = 1.0) =>
+        axios.post(`${API_BASE}/speech/playlist`, { ...sourceBody(source), language, speed }),
+
+    getPlaylistSegment: (playlistId, index, timingFormat = 'objects') =>
+        axios.get(`${API_BASE}/speech/playlist/${playlistId}/segments/${index}/timings`, {
+            params: { timing_format: timingFormat }
+        }),
+
+    // Speak an answer ({ mode: 'answer', question, session_id }) or a
+    // simplification ({ mode: 'simplify', text or document_id }) while it is
+    // being generated. handlers: onText(delta), onSentence(event, audioBlob),
+    // onDone(event), onError(message). Returns the socket; close() stops it.
+    streamSpeech: (request, { onText, onSentence, onDone, onError } = {}) => {
+        const socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/speech/stream`);
+        let sentence = null;
+        socket.onopen = () => socket.send(JSON.stringify(request));
+        socket.onmessage = ({ data }) => {
+            // Each sentence message is followed by its audio as a binary message
+            if (typeof data !== 'string') {
+                onSentence?.(sentence, data);
+                return;
+            }
+            const event = JSON.parse(data);
+            if (event.type === 'text') onText?.(event.delta);
+            else if (event.type === 'sentence') sentence = event;
+            else if (event.type === 'done') onDone?.(event);
+            else if (event.type === 'error') onError?.(event.error);
+        };
+        socket.onerror = () => onError?.('Connection to the speech stream failed');
+        return socket;
+    },
+
     // Chat Q&A
     createChatSession: () => axios.get(`${API_BASE}/chat/new-session`),
 
-    setDocumentContext: (documentText, sessionId) =>
-        axios.post(`${API_BASE}/chat/set-context`, { document_text: documentText, session_id: sessionId }),
+    setDocumentContext: (source, sessionId) =>
+        axios.post(`${API_BASE}/chat/set-context`, typeof source === 'string'
+            ? { document_text: source, session_id: sessionId }
+            : { document_id: source.documentId, session_id: sessionId }),
 
     askQuestion: (question, sessionId, language = 'en', dyslexiaType = 'general') =>
         axios.post(`${API_BASE}/chat/ask`, { question, session_id: sessionId, language, dyslexia_type: dyslexiaType }),
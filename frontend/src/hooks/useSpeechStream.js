@@ -0,0 +1,102 @@
+/**
+ * Hook for speaking streamed answers sentence by sentence
+ * Each sentence's audio is played as soon as it arrives, in order,
+ * while the rest of the answer is still being generated
+ */
+
+import { useState, useRef, useEffect } from 'react';
+import { api } from '../api';
+
+export const useSpeechStream = () => {
+  const [isStreaming, setIsStreaming] = useState(false);
+  const [isPlaying, setIsPlaying] = useState(false);
+  const [error, setError] = useState(null);
+
+  const socketRef = useRef(null);
+  const audioRef = useRef(null);
+  const queueRef = useRef([]);
+  const playingRef = useRef(false);
+  const urlRef = useRef(null);
+
+  const releaseUrl = () => {
+    if (urlRef.current) {
+      URL.revokeObjectURL(urlRef.current);
+      urlRef.current = null;
+    }
+  };
+
+  const playNext = () => {
+    releaseUrl();
+    const next = queueRef.current.shift();
+    if (!next) {
+      playingRef.current = false;
+      setIsPlaying(false);
+      return;
+    }
+    playingRef.current = true;
+    setIsPlaying(true);
+    urlRef.current = URL.createObjectURL(next.audio);
+    audioRef.current.src = urlRef.current;
+    audioRef.current.playbackRate = next.playbackRate;
+    audioRef.current.play().catch((err) => {
+      console.error('Playback failed:', err);
+      playNext();
+    });
+  };
+
+  useEffect(() => {
+    const audio = new Audio();
+    audio.addEventListener('ended', playNext);
+    audioRef.current = audio;
+    return () => {
+      audio.removeEventListener('ended', playNext);
+      audio.pause();
+      socketRef.current?.close();
+      releaseUrl();
+    };
+  }, []);
+
+  /**
+   * Stop playback and close the stream
+   */
+  const stop = () => {
+    socketRef.current?.close();
+    socketRef.current = null;
+    queueRef.current = [];
+    audioRef.current?.pause();
+    releaseUrl();
+    playingRef.current = false;
+    setIsPlaying(false);
+    setIsStreaming(false);
+  };
+
+  /**
+   * Start a stream (see api.streamSpeech for the request fields)
+   * handlers: onText(delta) for the generated text, onDone(event), onError(message)
+   */
+  const start = (request, { onText, onDone, onError } = {}) => {
+    stop();
+    setError(null);
+    setIsStreaming(true);
+    socketRef.current = api.streamSpeech(request, {
+      onText,
+      onSentence: (sentence, audio) => {
+        queueRef.current.push({ audio, playbackRate: sentence.playback_rate ?? 1 });
+        if (!playingRef.current) playNext();
+      },
+      onDone: (event) => {
+        setIsStreaming(false);
+        onDone?.(event);
+      },
+      onError: (message) => {
+        setIsStreaming(false);
+        setError(message);
+        onError?.(message);
+      }
+    });
+  };
+
+  return { start, stop, isStreaming, isPlaying, error };
+};
+
+export default useSpeechStream;
@@ -6,10 +6,67 @@
 import { useState, useRef, useEffect } from 'react';
 import axios from 'axios';
 
+/**
+ * Decode a word_timings payload into parallel arrays.
+ * Accepts the object list, "columnar" or base64 "binary" formats.
+ */
+export const decodeTimeline = (payload, text = '') => {
+  if (Array.isArray(payload)) {
+    return {
+      words: payload.map((w) => w.word),
+      starts: Float64Array.from(payload, (w) => w.start_ms),
+      ends: Float64Array.from(payload, (w) => w.end_ms)
+    };
+  }
+
+  let { count, start_ms: startMs, duration_ms: durationMs, offsets, lengths } = payload;
+  if (payload.format === 'binary') {
+    const bytes = Uint8Array.from(atob(payload.data), (c) => c.charCodeAt(0));
+    const view = new DataView(bytes.buffer);
+    const column = (index) =>
+      Int32Array.from({ length: count }, (_, i) => view.getInt32((index * count + i) * 4, true));
+    [startMs, durationMs, offsets, lengths] = [0, 1, 2, 3].map(column);
+  }
+
+  // Offsets count Unicode code points; only split into code points when the
+  // text has characters outside the BMP
+  const chars = /[\uD800-\uDFFF]/.test(text) ? Array.from(text) : null;
+  const slice = (start, end) => (chars ? chars.slice(start, end).join('') : text.slice(start, end));
+  const missing = payload.missing_words || {};
+  const words = Array.from({ length: count }, (_, i) =>
+    offsets[i] < 0 ? missing[String(i)] : slice(offsets[i], offsets[i] + lengths[i])
+  );
+  const starts = Float64Array.from(startMs);
+  const ends = Float64Array.from(starts, (start, i) => start + durationMs[i]);
+  return { words, starts, ends };
+};
+
+/**
+ * Index of the word playing at timeMs, or -1 (binary search over starts)
+ */
+export const findWordIndex = (timeline, timeMs) => {
+  const { starts, ends } = timeline;
+  let lo = 0;
+  let hi = starts.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    if (starts[mid] <= timeMs) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found !== -1 && timeMs < ends[found] ? found : -1;
+};
+
+const EMPTY_TIMELINE = { words: [], starts: new Float64Array(0), ends: new Float64Array(0) };
+
 export const useTTSHighlight = () => {
   const [isPlaying, setIsPlaying] = useState(false);
   const [currentWordIndex, setCurrentWordIndex] = useState(-1);
-  const [wordTimings, setWordTimings] = useState([]);
+  const [timeline, setTimeline] = useState(EMPTY_TIMELINE);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
   
@@ -29,15 +86,17 @@ export const useTTSHighlight = () => {
         {
           text,
           language,
-          speed
+          speed,
+          timing_format: 'columnar'
         }
       );
 
       if (response.data.success) {
-        setWordTimings(response.data.word_timings);
+        setTimeline(decodeTimeline(response.data.word_timings, text));
         
         // Create audio element
         const audio = new Audio(response.data.audio_url);
+        audio.playbackRate = response.data.playback_rate ?? 1;
         audioRef.current = audio;
 
         // Setup audio event listeners
@@ -108,15 +167,9 @@ export const useTTSHighlight = () => {
       const currentTimeMs = audioRef.current.currentTime * 1000;
 
       // Find current word index
-      for (let i = 0; i < wordTimings.length; i++) {
-        const word = wordTimings[i];
-        if (
-          currentTimeMs >= word.start_ms &&
-          currentTimeMs < word.end_ms
-        ) {
-          setCurrentWordIndex(i);
-          break;
-        }
+      const index = findWordIndex(timeline, currentTimeMs);
+      if (index !== -1) {
+        setCurrentWordIndex(index);
       }
 
       animationFrameRef.current = requestAnimationFrame(updateHighlight);
@@ -140,14 +193,14 @@ export const useTTSHighlight = () => {
    * Get highlighted text with HTML markup
    */
   const getHighlightedHTML = () => {
-    return wordTimings
+    return timeline.words
       .map((word, index) => {
         const isHighlighted = index === currentWordIndex;
         const className = isHighlighted
           ? 'word highlighted'
           : 'word';
         
-        return `<span class="${className}" data-index="${index}">${word.word}</span>`;
+        return `<span class="${className}" data-index="${index}">${word}</span>`;
       })
       .join(' ');
   };
@@ -156,8 +209,11 @@ export const useTTSHighlight = () => {
    * Get array of word objects with highlighting status
    */
   const getWordsWithStatus = () => {
-    return wordTimings.map((word, index) => ({
-      ...word,
+    return timeline.words.map((word, index) => ({
+      word,
+      start_ms: timeline.starts[index],
+      end_ms: timeline.ends[index],
+      duration_ms: timeline.ends[index] - timeline.starts[index],
       isHighlighted: index === currentWordIndex,
       index
     }));
@@ -169,7 +225,8 @@ export const useTTSHighlight = () => {
     isLoading,
     error,
     currentWordIndex,
-    wordTimings,
+    wordTimings: timeline.words,
+    timeline,
     audioRef,
 
     // Methods